@@ -17,6 +17,72 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = './uploads'
     AI_SERVICE_API_KEY: Optional[str] = None
     AZURE_REDIRECT_URI: Optional[str] = None
+    # Defaults to https://login.microsoftonline.com/<AZURE_TENANT_ID>
+    AZURE_AUTHORITY: Optional[str] = None
+    # Files the MSAL token cache and discovery (HTTP) cache persist to across
+    # restarts; in-process only when unset
+    MSAL_TOKEN_CACHE_PATH: Optional[str] = None
+    MSAL_HTTP_CACHE_PATH: Optional[str] = None
+    # In-process cache of verified session tokens and /auth/profile users
+    AUTH_CACHE_TTL_SECONDS: int = 300
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    # MongoDB connection pool (shared by every request for the app lifetime)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 10000
+    MONGO_READ_PREFERENCE: str = "primary"
+    # Logging: level, json or text lines, runtime switch, and the share of
+    # requests whose DEBUG records are kept
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_ENABLED: bool = True
+    LOG_DEBUG_SAMPLE_RATE: float = 0.01
+    # List endpoints render documents straight from Mongo (projected to the
+    # response model's fields) instead of re-validating them through it
+    TRUSTED_DB_RESPONSES: bool = False
+    # Multi-document writes use transactions when the deployment supports them
+    MONGO_USE_TRANSACTIONS: bool = True
+    # Seconds a cached dashboard aggregate is served before it is recomputed
+    DASHBOARD_CACHE_TTL_SECONDS: int = 60
+    # Background job workers (jobs collection used as the queue)
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BASE_SECONDS: float = 5.0
+    JOB_LEASE_SECONDS: int = 600
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    # PDF/DOCX/XLSX text extraction: files parsed at once, each in its own
+    # process (0 = one per CPU), and the per-file time and memory caps
+    EXTRACTION_WORKERS: int = 0
+    EXTRACTION_TIMEOUT_SECONDS: int = 120
+    EXTRACTION_MEMORY_LIMIT_MB: int = 1024
+    # Characters of text kept per document for storage and AI analysis
+    EXTRACTION_MAX_CHARS: int = 1_000_000
+    # Extracted-text cache: in-process LRU budget and Mongo tier lifetime
+    EXTRACTION_CACHE_MEMORY_CHARS: int = 50_000_000
+    EXTRACTION_CACHE_TTL_DAYS: int = 30
+    # LLM gateway (any OpenAI-compatible chat completions endpoint)
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENAI_MODEL: str = "gpt-4o"
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_REQUESTS_PER_MINUTE: int = 60
+    LLM_MAX_RETRIES: int = 4
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    # Estimated tokens of document text per analysis request (map step)
+    LLM_CHUNK_TOKENS: int = 6000
+    # Model response cache (llm_cache collection plus an in-process tier)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_DAYS: int = 30
+    LLM_CACHE_MAX_ENTRIES: int = 100_000
+    LLM_CACHE_MEMORY_ENTRIES: int = 1024
+    LLM_CACHE_TRIM_EVERY: int = 100
+    # Bulk RYG recompute: engagements per bulk_write and batches in flight
+    RYG_RECOMPUTE_BATCH_SIZE: int = 500
+    RYG_RECOMPUTE_CONCURRENCY: int = 8
+    # Customer engagement counter reconciliation (0 disables the periodic run)
+    COUNTER_RECONCILE_INTERVAL_SECONDS: int = 3600
+    COUNTER_RECONCILE_BATCH_SIZE: int = 500
 
     model_config = SettingsConfigDict(
         env_file=os.path.abspath(os.path.join(os.path.dirname(__file__), '../.env')),
@@ -1,22 +1,126 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
 from beanie import init_beanie
 from app.models.user import User
 from app.models.customer import Customer
 from app.models.engagement import EngagementInDB as Engagement
 from app.models.document import DocumentInDB as Document
 from app.config import settings
-from typing import Optional
+from app.metrics import metrics
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
 
 client: Optional[AsyncIOMotorClient] = None
 db = None
+# False once the server has reported it cannot run transactions
+_transactions_supported: Optional[bool] = None
 
-async def init_db):
-    global client, db
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    # Always connect to the explicit database name from Settings to avoid inconsistencies
-    db = client[settings.DB_NAME]
+# Server error code for "Transaction numbers are only allowed on a replica set member or mongos"
+ILLEGAL_OPERATION = 20
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds connection pool checkout/wait statistics into the metrics registry."""
+
+    def pool_created(self, event):
+        metrics.incr("mongo_pool_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        metrics.incr("mongo_pool_cleared")
+
+    def pool_closed(self, event):
+        metrics.incr("mongo_pool_closed")
+
+    def connection_created(self, event):
+        metrics.incr("mongo_connections_created")
+        metrics.gauge_add("mongo_connections_open", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        metrics.incr("mongo_connections_closed")
+        metrics.gauge_add("mongo_connections_open", -1)
+
+    def connection_check_out_started(self, event):
+        metrics.gauge_add("mongo_checkouts_waiting", 1)
+
+    def connection_check_out_failed(self, event):
+        metrics.gauge_add("mongo_checkouts_waiting", -1)
+        metrics.incr("mongo_checkout_failures")
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            metrics.observe("mongo_checkout_wait_seconds", duration)
+
+    def connection_checked_out(self, event):
+        metrics.gauge_add("mongo_checkouts_waiting", -1)
+        metrics.gauge_add("mongo_connections_in_use", 1)
+        metrics.incr("mongo_checkouts")
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            metrics.observe("mongo_checkout_wait_seconds", duration)
+
+    def connection_checked_in(self, event):
+        metrics.gauge_add("mongo_connections_in_use", -1)
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Return the application-wide Motor client, creating it on first use."""
+    global client
+    if client is None:
+        client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            readPreference=settings.MONGO_READ_PREFERENCE,
+            event_listeners=[PoolMetricsListener()],
+        )
+    return client
+
+
+def get_database():
+    """Return the app database handle backed by the shared client."""
+    global db
+    if db is None:
+        # Always connect to the explicit database name from Settings to avoid inconsistencies
+        db = get_client()[settings.DB_NAME]
+    return db
+
+
+async def run_in_transaction(write: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    Run `write(session)` as one multi-document transaction, retried on
+    transient errors. Standalone servers cannot run transactions; there the
+    writes run once with session=None, still batched but not atomic.
+    """
+    global _transactions_supported
+    if settings.MONGO_USE_TRANSACTIONS and _transactions_supported is not False:
+        try:
+            async with await get_client().start_session() as session:
+                result = await session.with_transaction(write)
+            _transactions_supported = True
+            return result
+        except OperationFailure as e:
+            if e.code != ILLEGAL_OPERATION:
+                raise
+            _transactions_supported = False
+            metrics.incr("mongo_transactions_unsupported")
+            logger.warning("MongoDB deployment does not support transactions; multi-document writes are not atomic")
+    return await write(None)
+
+
+async def init_db():
+    database = get_database()
     await init_beanie(
-        database=db,
+        database=database,
         document_models=[
             User,
             Customer,
@@ -24,4 +128,12 @@ async def init_db):
             Document,
         ]
     )
-    print(f"Connected to MongoDB database: {db.name}")
+    logger.info("Connected to MongoDB database %s", database.name)
+
+
+def close_db():
+    global client, db
+    if client is not None:
+        client.close()
+    client = None
+    db = None
@@ -1,10 +1,10 @@
 from fastapi import Depends
 from app.config import settings
-from motor.motor_asyncio import AsyncIOMotorClient
+from app.database import get_database
 
 def get_db():
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    return client[settings.DB_NAME]
+    # Shared, pooled client created once for the application lifetime
+    return get_database()
 
 def get_settings():
     return settings
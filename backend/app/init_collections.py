@@ -1,4 +1,15 @@
-from app.database import db
+import logging
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import OperationFailure
+from app.config import settings
+from app.database import get_database
+from app.metrics import metrics
+from app.models.customer import build_customer_search
+from app.services.job_queue import ACTIVE_STATES
+from app.services.search_service import text_index_model
+
+logger = logging.getLogger(__name__)
 
 # List of required collections for the app
 REQUIRED_COLLECTIONS = [
@@ -6,18 +17,138 @@ REQUIRED_COLLECTIONS = [
     "customers",
     "engagements",
     "documents",
+    "blobs",
     "action_items",
-    "emails"
+    "emails",
+    "jobs",
+    "extraction_cache",
+    "llm_cache",
+    "ryg_recompute_runs"
 ]
 
 async def ensure_collections():
+    db = get_database()
     existing = await db.list_collection_names()
     for coll in REQUIRED_COLLECTIONS:
         if coll not in existing:
             await db.create_collection(coll)
 
+# Indexes for the collections queried through raw Motor, applied at startup.
+# Beanie models (users, customers) declare theirs in their Settings; weighted
+# text indexes come from search_service.TEXT_INDEXES. Every filter or sort the
+# routers and services issue should be served by one of these; see
+# app.utils.query_plans for the explain() check.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "engagements": [
+        # list_engagements filter and counter reconciliation
+        IndexModel("customerId"),
+        # Dashboard: active count, at-risk and recently updated engagements
+        IndexModel("status"),
+        IndexModel([("ryg_status", ASCENDING), ("updatedAt", DESCENDING)]),
+        IndexModel([("updatedAt", DESCENDING)]),
+        text_index_model("engagements"),
+    ],
+    "documents": [
+        # Batched MSA/SOW lookup in list_engagements and per-engagement listings
+        IndexModel([("engagementId", ASCENDING), ("fileType", ASCENDING)]),
+        # Blob reference counting and shared analysis lookups by content hash
+        IndexModel("sha256"),
+        IndexModel("filePath"),
+        # Dashboard: processed this month and recent uploads
+        IndexModel("processedAt"),
+        IndexModel([("uploadedAt", DESCENDING)]),
+        text_index_model("documents"),
+    ],
+    "action_items": [
+        # Per-engagement listings and RYG rebuilds of open items
+        IndexModel([("engagementId", ASCENDING), ("status", ASCENDING)]),
+        # Dashboard: overdue and recently created items
+        IndexModel("dueDate"),
+        IndexModel([("createdAt", DESCENDING)]),
+    ],
+    "emails": [
+        IndexModel("engagementId"),
+        IndexModel("threadId"),
+        text_index_model("emails"),
+    ],
+    "customers": [
+        text_index_model("customers"),
+    ],
+    "jobs": [
+        # Job claiming and per-document dedupe of unfinished jobs
+        IndexModel([("status", ASCENDING), ("runAfter", ASCENDING)]),
+        IndexModel([("kind", ASCENDING), ("dedupeKey", ASCENDING), ("status", ASCENDING)]),
+        # At most one unfinished job per dedupe key; JobQueue.enqueue relies
+        # on the duplicate key error to return the job already queued
+        IndexModel(
+            [("kind", ASCENDING), ("dedupeKey", ASCENDING)],
+            name="unfinished_job_dedupe",
+            unique=True,
+            partialFilterExpression={"dedupeKey": {"$type": "string"}, "status": {"$in": list(ACTIVE_STATES)}},
+        ),
+    ],
+    "extraction_cache": [
+        IndexModel("createdAt", expireAfterSeconds=settings.EXTRACTION_CACHE_TTL_DAYS * 86400),
+    ],
+    "llm_cache": [
+        # Expire cached model responses and find LRU rows to evict
+        IndexModel("createdAt", expireAfterSeconds=settings.LLM_CACHE_TTL_DAYS * 86400),
+        IndexModel("lastUsedAt"),
+    ],
+}
+
+# IndexOptionsConflict / IndexKeySpecsConflict: an index with the same name or
+# keys already exists with different options. DuplicateKey: existing rows
+# violate a unique index, e.g. duplicate unfinished jobs from before it
+INDEX_CONFLICT_CODES = (85, 86, 11000)
+
+async def ensure_indexes(db=None):
+    """
+    Create every index in INDEXES. Indexes that already exist as declared are
+    left alone, so this is safe on every startup. An existing index with
+    different options (e.g. a changed TTL) is reported rather than dropped;
+    drop it by hand to have it rebuilt.
+    """
+    db = db if db is not None else get_database()
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                if e.code not in INDEX_CONFLICT_CODES:
+                    raise
+                metrics.incr("mongo_index_conflicts")
+                logger.warning("Index %s on %s conflicts with an existing index: %s", model.document["name"], collection, e)
+
+async def backfill_customer_search(batch_size: int = 500):
+    """Populate search shadow fields on customers created before they existed."""
+    db = get_database()
+    batch = []
+    async for customer in db.customers.find({"search": {"$exists": False}}):
+        batch.append(UpdateOne({"_id": customer["_id"]}, {"$set": {"search": build_customer_search(customer)}}))
+        if len(batch) >= batch_size:
+            await db.customers.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.customers.bulk_write(batch, ordered=False)
+
+async def normalise_ryg_statuses():
+    """Lowercase ryg_status on engagements written before it was normalised."""
+    db = get_database()
+    await db.engagements.update_many(
+        {"ryg_status": {"$type": "string", "$regex": "[A-Z]"}},
+        [{"$set": {"ryg_status": {"$toLower": "$ryg_status"}}}],
+    )
+
 # For manual execution
 # Run with: python -m app.init_collections
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(ensure_collections())
+
+    async def main():
+        await ensure_collections()
+        await ensure_indexes()
+        await backfill_customer_search()
+        await normalise_ryg_statuses()
+
+    asyncio.run(main())
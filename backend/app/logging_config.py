@@ -0,0 +1,123 @@
+import logging
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+import orjson
+
+from app.config import settings
+
+# Correlation id of the request being handled, and whether its debug records are kept
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+debug_sampled_var: ContextVar[bool] = ContextVar("debug_sampled", default=True)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_state = {"enabled": settings.LOG_ENABLED, "level": settings.LOG_LEVEL.upper(), "debug_sample_rate": settings.LOG_DEBUG_SAMPLE_RATE}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request id and drop debug records of unsampled requests."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and not debug_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Install the app's handler on the root logger (LOG_LEVEL, LOG_FORMAT json|text)."""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(RequestContextFilter())
+    handler.setFormatter(JsonFormatter() if (fmt or settings.LOG_FORMAT) == "json" else logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if getattr(h, "_app_handler", False)]:
+        root.removeHandler(existing)
+    handler._app_handler = True
+    root.addHandler(handler)
+    set_logging(level=level or _state["level"], enabled=_state["enabled"])
+
+
+def set_logging(enabled: Optional[bool] = None, level: Optional[str] = None, debug_sample_rate: Optional[float] = None) -> dict:
+    """
+    Change logging at runtime. Disabling goes through logging.disable, so
+    every logger call returns at its first (cached) level check and no
+    message or `extra` is built.
+    """
+    if level is not None:
+        _state["level"] = level.upper()
+        logging.getLogger().setLevel(_state["level"])
+    if debug_sample_rate is not None:
+        _state["debug_sample_rate"] = min(max(debug_sample_rate, 0.0), 1.0)
+    if enabled is not None:
+        _state["enabled"] = enabled
+        logging.disable(logging.NOTSET if enabled else logging.CRITICAL)
+    return dict(_state)
+
+
+def logging_state() -> dict:
+    return dict(_state)
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware that gives every request a correlation id (taken from
+    X-Request-ID or generated), echoes it on the response and decides once
+    whether the request's debug records are sampled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        id_token = request_id_var.set(request_id)
+        sampled_token = debug_sampled_var.set(random.random() < _state["debug_sample_rate"])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(id_token)
+            debug_sampled_var.reset(sampled_token)
@@ -1,33 +1,74 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from app.routers import auth, customers, engagements, documents, action_items, dashboard, search, emails
-from app.database import init_db
+from app.routers import auth, customers, engagements, documents, action_items, dashboard, search, emails, jobs
+from app.database import init_db, close_db, get_client, get_database
+from app.init_collections import ensure_indexes
+from app.metrics import metrics
+from app.logging_config import REQUEST_ID_HEADER, RequestContextMiddleware, configure_logging, logging_state, set_logging
+from app.services.job_queue import job_queue
+from app.services.counter_reconciler import counter_reconciler
+from app.services.document_processor import MAX_FILE_SIZE, shutdown_extraction_pool
+from app.services.llm_gateway import llm_gateway
+from app.services.auth_service import azure_auth
+from app.utils.file_utils import UploadSizeLimitMiddleware
+from app.utils.pagination import NEXT_CURSOR_HEADER
 from beanie import PydanticObjectId
-from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
+from app.routers.auth import get_current_user
+from typing import Optional
 
-app = FastAPI()
+configure_logging()
+
+# Initialize Beanie and the shared Mongo client for the app lifetime
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    await ensure_indexes()
+    job_queue.start(get_database())
+    counter_reconciler.start(get_database())
+    yield
+    await counter_reconciler.stop()
+    await job_queue.stop()
+    await llm_gateway.close()
+    await azure_auth.close()
+    shutdown_extraction_pool()
+    close_db()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/", tags=["Root"])
 async def index() -> dict:
     return {"message": "Welcome to AppHelix Dashboard API!"}
 
-# Initialize Beanie on startup
-@app.on_event("startup")
-async def startup_db_client():
-    await init_db()
-
 @app.get("/health")
 async def health_check():
     try:
-        # Create a temporary client to ping the database
-        client = AsyncIOMotorClient(settings.MONGODB_URL)
-        await client.admin.command("ping")
+        # Ping through the shared client so health checks reuse the pool
+        await get_client().admin.command("ping")
         return {"status": "ok", "mongo": "connected"}
     except Exception as e:
         return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "error", "mongo": str(e)})
 
+@app.get("/metrics")
+async def get_metrics() -> dict:
+    return metrics.snapshot()
+
+@app.get("/logging")
+async def get_logging() -> dict:
+    return logging_state()
+
+@app.put("/logging")
+async def update_logging(
+    enabled: Optional[bool] = None,
+    level: Optional[str] = None,
+    debug_sample_rate: Optional[float] = None,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    # Runtime switch, e.g. PUT /logging?enabled=false during an incident
+    return set_logging(enabled=enabled, level=level, debug_sample_rate=debug_sample_rate)
+
 origins = [
     "http://localhost:3000",
     "http://127.0.0.1:3000"
@@ -39,7 +80,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER],
 )
+app.add_middleware(RequestContextMiddleware)
+# Refuse oversized uploads while they arrive, not after Starlette spooled them
+app.add_middleware(UploadSizeLimitMiddleware, limits={"/api/documents/upload": MAX_FILE_SIZE})
 
 app.include_router(auth.router)
 app.include_router(customers.router)
@@ -49,4 +94,5 @@ app.include_router(action_items.router)
 app.include_router(dashboard.router)
 app.include_router(search.router)
 app.include_router(emails.router)
+app.include_router(jobs.router)
 
@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field, EmailStr, HttpUrl
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
-from beanie import Document
+from beanie import Document, PydanticObjectId, before_event, Insert, Replace, Save, SaveChanges
 from enum import Enum
+import re
 
 
 # ----------- Enums -----------
@@ -26,6 +27,68 @@ class ContactInfo(BaseModel):
     website: Optional[HttpUrl] = None  # Validates as proper URL
 
 
+# Lowercase shadow fields and prefix tokens kept in sync with the customer
+# so search and autocomplete run as anchored prefix queries on an index.
+class CustomerSearch(BaseModel):
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    country: Optional[str] = None
+    tokens: List[str] = Field(default_factory=list)
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+MAX_TOKEN_PREFIX = 15
+MAX_DESCRIPTION_WORDS = 100
+
+
+def normalise_search_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    text = " ".join(str(value).lower().split())
+    return text or None
+
+
+def digits_only(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return re.sub(r"\D", "", str(value)) or None
+
+
+def search_words(value: Any) -> List[str]:
+    text = normalise_search_text(value)
+    return _WORD_RE.findall(text) if text else []
+
+
+def _prefixes(word: str) -> List[str]:
+    return [word[:i] for i in range(1, min(len(word), MAX_TOKEN_PREFIX) + 1)]
+
+
+def build_customer_search(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the search shadow fields from a customer dict."""
+    location = data.get("location") or {}
+    contact = data.get("contactInfo") or {}
+    words = search_words(data.get("name"))
+    for value in (contact.get("phone"), contact.get("email"), contact.get("website"), location.get("address")):
+        words += search_words(value)
+    words += search_words(data.get("description"))[:MAX_DESCRIPTION_WORDS]
+    phone = digits_only(contact.get("phone"))
+    if phone:
+        words.append(phone)
+    tokens = sorted({prefix for word in words for prefix in _prefixes(word)})
+    return {
+        "name": normalise_search_text(data.get("name")),
+        "phone": phone,
+        "address": normalise_search_text(location.get("address")),
+        "city": normalise_search_text(location.get("city")),
+        "state": normalise_search_text(location.get("state")),
+        "country": normalise_search_text(location.get("country")),
+        "tokens": tokens,
+    }
+
+
 # ----------- Main Document Model -----------
 class Customer(Document):
     name: str
@@ -40,12 +103,43 @@ class Customer(Document):
     description: Optional[str] = None
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: Optional[datetime] = Field(default_factory=datetime.utcnow)
+    search: Optional[CustomerSearch] = None
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def refresh_search_fields(self):
+        self.search = CustomerSearch(**build_customer_search(self.dict()))
 
     class Settings:
         name = "customers"
-        indexes = ["name", "status", "industry"]
+        indexes = [
+            "name",
+            "status",
+            "industry",
+            "search.name",
+            "search.phone",
+            "search.address",
+            "search.city",
+            "search.state",
+            "search.country",
+            "search.tokens",
+        ]
         use_state_management = True
 
+def new_customer_document(customer: "CustomerCreate") -> Dict[str, Any]:
+    """
+    Raw `customers` document for a validated create payload, with the same
+    defaults and search fields Customer.insert() would produce. Used by bulk
+    writes that bypass the ODM.
+    """
+    doc = {
+        name: field.get_default(call_default_factory=True)
+        for name, field in Customer.model_fields.items()
+        if name not in ("id", "revision_id") and not field.is_required()
+    }
+    doc.update(customer.model_dump(mode="json", exclude_none=True))
+    doc["search"] = build_customer_search(doc)
+    return doc
+
 # ----------- Create Schema -----------
 class CustomerCreate(BaseModel):
     name: str
@@ -72,3 +166,26 @@ class CustomerUpdate(BaseModel):
     logo: Optional[str] = None
     status: Optional[CustomerStatus] = None
     description: Optional[str] = None
+
+
+# ----------- Response Schema -----------
+class CustomerOut(BaseModel):
+    """Customer as returned by the API; the search shadow fields stay internal."""
+    id: Optional[PydanticObjectId] = Field(default=None, alias="_id")
+    name: str
+    industry: Optional[str] = None
+    industryColorClass: Optional[str] = None
+    engagements: Optional[int] = 0
+    engagementIds: List[str] = Field(default_factory=list)
+    location: Optional[Location] = None
+    contactInfo: Optional[ContactInfo] = None
+    logo: Optional[str] = None
+    status: CustomerStatus = CustomerStatus.active
+    description: Optional[str] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+
+    # Customer documents are read by attribute, as `id`
+    model_config = {
+        "populate_by_name": True,
+    }
@@ -4,10 +4,13 @@ from datetime import datetime
 from bson import ObjectId
 from beanie import Document
 
-classExtrated(BaseModel):
+class AIExtracted(BaseModel):
     text_content: Optional[str]
+    text_truncated: Optional[bool] = None
     action_items: Optional[List[Dict[str, Any]]]
     sentiment: Optional[str]
+    key_topics: Optional[List[Any]] = None
+    risk_factors: Optional[List[Any]] = None
     key_metrics: Optional[Dict[str, Any]]
 
 class DocumentBase(BaseModel):
@@ -23,6 +26,7 @@ class DocumentBase(BaseModel):
     fileType: str
     mimeType: str
     size: int
+    sha256: Optional[str] = None
     filePath: str
     uploadedBy: str
     uploadedAt: Optional[datetime] = None
@@ -44,6 +48,10 @@ class DocumentInDB(Document, DocumentBase):
         "json_encoders": {ObjectId: str},
     }
 
+    class Settings:
+        # Share the collection the routers query through Motor
+        name = "documents"
+
 # Alias for backward compatibility
 class DocumentModel(DocumentInDB):
     """Alias for DocumentInDB for backward compatibility."""
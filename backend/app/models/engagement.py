@@ -1,10 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 from bson import ObjectId
 from beanie import Document
  
-class MSABaseModel):
+class MSA(BaseModel):
     reference: Optional[str] = None
     value: Optional[float] = None
     startDate: Optional[datetime] = None
@@ -23,16 +23,25 @@ class AIInsights(BaseModel):
     key_topics: Optional[List[str]]
     risk_factors: Optional[List[str]]
  
+def normalise_ryg_status(value: Optional[str]) -> Optional[str]:
+    """RYG statuses are stored lowercase, so filters can match one value."""
+    if value is None:
+        return None
+    return str(value).strip().lower() or None
+
+
 class EngagementBase(BaseModel):
     customerId: str = Field(..., alias="customerId")
     name: str
     type: Optional[str] = Field(default="Other")
     typeColorClass: Optional[str] = Field(default="default-type-color")
     status: Optional[str] = Field(default="active")
-    ryg_status: Optional[str] = Field(default="Green")
+    ryg_status: Optional[str] = Field(default="green")
     msa: Optional[MSA] = Field(None, alias="msa")
     sow: Optional[SOW] = Field(None, alias="sow")
     description: Optional[str] = None
+
+    _normalise_ryg_status = field_validator("ryg_status")(normalise_ryg_status)
  
 class EngagementCreate(EngagementBase):
     pass
@@ -47,6 +56,8 @@ class EngagementUpdate(BaseModel):
     msa: Optional[MSA] = Field(None, alias="msa")
     sow: Optional[SOW] = Field(None, alias="sow")
     description: Optional[str] = None
+
+    _normalise_ryg_status = field_validator("ryg_status")(normalise_ryg_status)
  
 class EngagementOut(EngagementBase):
     id: str = Field(..., alias="_id")
@@ -67,6 +78,8 @@ class EngagementInDB(Document):
     updatedAt: Optional[datetime]
     lastAiAnalysis: Optional[datetime]
     aiInsights: Optional[dict]
+    # Rolling aggregates maintained by app.services.ryg_engine
+    rygSignals: Optional[dict] = None
  
     class Config:
         json_encoders = {ObjectId: str}
@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, Response, UploadFile
+from typing import List, Optional
+from pydantic import ValidationError
 from app.models.action_item import ActionItemCreate, ActionItemUpdate, ActionItemInDB
 from app.dependencies import get_db
+from app.services.dashboard_stats import dashboard_stats
+from app.services.ryg_engine import ryg_engine
+from app.utils.bulk_io import detect_format, ndjson_export, run_import, validation_message
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, page_response, response_projection
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 
 router = APIRouter(prefix="/api", tags=["action_items"])
 
 @router.get("/engagements/{id}/action-items", response_model=List[ActionItemInDB])
-async def list_action_items(id: str, db=Depends(get_db)):
-    items = await db.action_items.find({"engagementId": id}).to_list(100)
-    return items
+async def list_action_items(
+    id: str,
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None),
+    db=Depends(get_db),
+):
+    projection = response_projection(fields, ActionItemInDB)
+    items, next_cursor = await fetch_page(
+        db.action_items, {"engagementId": id}, cursor=cursor, limit=limit, projection=projection
+    )
+    return page_response(response, items, next_cursor, projection)
 
 @router.post("/engagements/{id}/action-items", response_model=ActionItemInDB)
 async def create_action_item(id: str, item: ActionItemCreate, db=Depends(get_db)):
@@ -20,24 +36,71 @@ async def create_action_item(id: str, item: ActionItemCreate, db=Depends(get_db)
     data["updatedAt"] = datetime.utcnow()
     result = await db.action_items.insert_one(data)
     data["_id"] = str(result.inserted_id)
+    await ryg_engine.action_item_changed(db, id, None, data)
+    dashboard_stats.mark_dirty("action_items")
     return data
 
+@router.post("/action-items/import")
+async def import_action_items(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="ndjson or csv; guessed from the file name when omitted"),
+    db=Depends(get_db),
+):
+    """Bulk create action items; each row names its engagementId."""
+    async def prepare(rows, report):
+        docs, numbers = [], []
+        now = datetime.utcnow()
+        for number, row in rows:
+            try:
+                data = ActionItemCreate(**row).dict(by_alias=True)
+            except ValidationError as e:
+                report.error(number, validation_message(e))
+                continue
+            data["createdAt"] = now
+            data["updatedAt"] = now
+            docs.append(data)
+            numbers.append(number)
+        return docs, numbers
+
+    async def after_insert(items):
+        await ryg_engine.action_items_added(db, items)
+
+    result = await run_import(file, detect_format(file, format), prepare, db.action_items, after_insert)
+    if result["inserted"]:
+        dashboard_stats.mark_dirty("action_items")
+    return result
+
+@router.get("/action-items/export")
+async def export_action_items(engagementId: Optional[str] = Query(None), db=Depends(get_db)):
+    query = {"engagementId": engagementId} if engagementId else {}
+    return ndjson_export(db.action_items.find(query).sort("_id", 1), "action_items.ndjson")
+
 @router.put("/action-items/{id}", response_model=ActionItemInDB)
 async def update_action_item(id: str, item: ActionItemUpdate, db=Depends(get_db)):
     data = item.dict(by_alias=True, exclude_unset=True)
     data["updatedAt"] = datetime.utcnow()
-    result = await db.action_items.find_one_and_update(
-        {"_id": ObjectId(id)}, {"$set": data}, return_document=True
+    # The previous version is needed to move the item between RYG buckets
+    previous = await db.action_items.find_one_and_update(
+        {"_id": ObjectId(id)}, {"$set": data}, return_document=ReturnDocument.BEFORE
     )
-    if not result:
+    if not previous:
         raise HTTPException(status_code=404, detail="Action item not found")
+    result = {**previous, **data}
+    if previous["engagementId"] == result["engagementId"]:
+        await ryg_engine.action_item_changed(db, result["engagementId"], previous, result)
+    else:
+        await ryg_engine.action_item_changed(db, previous["engagementId"], previous, None)
+        await ryg_engine.action_item_changed(db, result["engagementId"], None, result)
+    dashboard_stats.mark_dirty("action_items")
     return result
 
 @router.delete("/action-items/{id}")
 async def delete_action_item(id: str, db=Depends(get_db)):
-    result = await db.action_items.delete_one({"_id": ObjectId(id)})
-    if result.deleted_count == 0:
+    deleted = await db.action_items.find_one_and_delete({"_id": ObjectId(id)})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Action item not found")
+    await ryg_engine.action_item_changed(db, deleted["engagementId"], deleted, None)
+    dashboard_stats.mark_dirty("action_items")
     return {"msg": "Deleted"}
 
 @router.post("/action-items/external", response_model=ActionItemInDB)
@@ -48,6 +111,8 @@ async def create_external_action_item(item: ActionItemCreate, db=Depends(get_db)
     data["updatedAt"] = datetime.utcnow()
     result = await db.action_items.insert_one(data)
     data["_id"] = str(result.inserted_id)
+    await ryg_engine.action_item_changed(db, data["engagementId"], None, data)
+    dashboard_stats.mark_dirty("action_items")
     return data
 
 @router.post("/action-items/extract-from-email", response_model=List[ActionItemInDB])
@@ -1,25 +1,24 @@
 from fastapi import APIRouter, Request, Response, Depends, HTTPException, status, Cookie
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import RedirectResponse, JSONResponse
 from jose import jwt, JWTError
+from pymongo import ReturnDocument
 from datetime import datetime, timedelta
 from app.config import settings
-import msal
-import requests
 from typing import Optional
 import os
+import time
 from app.models.user import User
+from app.dependencies import get_db
+from app.services.auth_service import azure_auth, token_claims_cache, user_cache
 
 # Use the FRONTEND_URL environment variable
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-# Azure AD endpoints and config
-TENANT = settings.AZURE_TENANT_ID
-CLIENT_ID = settings.AZURE_CLIENT_ID
-CLIENT_SECRET = settings.AZURE_CLIENT_SECRET
+# Azure AD config; the MSAL client itself is shared (see auth_service)
 REDIRECT_URI = settings.AZURE_REDIRECT_URI
-AUTHORITY = f"https://login.microsoftonline.com/{TENANT}"
 SCOPE = ["User.Read"]  # Use only 'User.Read' to avoid reserved scope error
 
 # JWT config
@@ -37,14 +36,19 @@ def create_jwt_token(user: dict):
 
 # Util: verify JWT
 def verify_jwt_token(token: str):
+    claims = token_claims_cache.get(token)
+    if claims is not None:
+        return claims
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except JWTError:
         return None
+    # Never served from the cache past the token's own expiry
+    token_claims_cache.put(token, payload, payload["exp"] - time.time() if "exp" in payload else None)
+    return payload
 
-# Dependency for protected routes
-def get_current_user(token: Optional[str] = Cookie(None)):
+# Dependency for protected routes; async so the cached path stays on the loop
+async def get_current_user(token: Optional[str] = Cookie(None)):
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     user = verify_jwt_token(token)
@@ -53,24 +57,19 @@ def get_current_user(token: Optional[str] = Cookie(None)):
     return user
 
 @router.get("/login")
-def login():
+async def login():
     # Redirect user to Azure AD login
-    msal_app = msal.ConfidentialClientApplication(CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET)
-    auth_url = msal_app.get_authorization_request_url(SCOPE, redirect_uri=REDIRECT_URI, response_mode="query")
+    auth_url = await azure_auth.authorization_url(SCOPE, REDIRECT_URI)
     return RedirectResponse(auth_url)
 
 
 @router.get("/callback")
-async def callback(request: Request, code: Optional[str] = None):
+async def callback(request: Request, code: Optional[str] = None, db=Depends(get_db)):
     if not code:
         return JSONResponse({"error": "Missing code from Azure AD"}, status_code=400)
 
-    msal_app = msal.ConfidentialClientApplication(
-        CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET
-    )
-    result = msal_app.acquire_token_by_authorization_code(
-        code, scopes=SCOPE, redirect_uri=REDIRECT_URI
-    )
+    # One token round trip, run off the event loop
+    result = await azure_auth.acquire_token_by_code(code, SCOPE, REDIRECT_URI)
 
     if "id_token_claims" not in result:
         return JSONResponse({"error": "Could not authenticate with Azure AD"}, status_code=400)
@@ -79,22 +78,27 @@ async def callback(request: Request, code: Optional[str] = None):
     azure_id = user_claims.get("sub")
     email = user_claims.get("preferred_username", user_claims.get("email"))
 
-    # ✅ Create or update user in MongoDB
-    existing_user = await User.find_one(User.azure_id == azure_id)
-
-    if not existing_user:
-        new_user = User(
-            azure_id=azure_id,
-            username=email,
-            email=email,
-            full_name=user_claims.get("name"),
-            roles=["user"],
-            last_login=datetime.utcnow()
-        )
-        await new_user.insert()
-    else:
-        existing_user.last_login = datetime.utcnow()
-        await existing_user.save()
+    # ✅ Create or update user in MongoDB with a single upsert
+    now = datetime.utcnow()
+    new_user = User(
+        azure_id=azure_id,
+        username=email,
+        email=email,
+        full_name=user_claims.get("name"),
+        roles=["user"],
+        createdAt=now,
+    )
+    stored = await db.users.find_one_and_update(
+        {"azure_id": azure_id},
+        {
+            "$set": {"last_login": now},
+            "$setOnInsert": new_user.dict(exclude={"id", "revision_id", "last_login"}),
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    # The profile changed: the first /auth/profile after login is served from here
+    user_cache.put(azure_id, jsonable_encoder(User.model_validate(stored)))
 
     # ✅ Generate token and set cookie
     jwt_token = create_jwt_token({
@@ -113,15 +117,20 @@ async def callback(request: Request, code: Optional[str] = None):
 
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(response: Response, token: Optional[str] = Cookie(None)):
+    if token:
+        token_claims_cache.pop(token)
     response.delete_cookie(key="token")
     return JSONResponse({"msg": "User logged out"})
 
-from fastapi.encoders import jsonable_encoder
-
 @router.get("/profile")
 async def profile(user: dict = Depends(get_current_user)):
+    cached = user_cache.get(user["sub"])
+    if cached is not None:
+        return cached
     db_user = await User.find_one(User.azure_id == user["sub"])
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    return jsonable_encoder(db_user)
\ No newline at end of file
+    encoded = jsonable_encoder(db_user)
+    user_cache.put(user["sub"], encoded)
+    return encoded
\ No newline at end of file
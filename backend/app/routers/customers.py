@@ -1,21 +1,69 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
 from typing import List, Optional
-from app.models.customer import Customer, CustomerCreate, CustomerUpdate, CustomerStatus
+from pydantic import ValidationError
+from app.models.customer import (
+    Customer, CustomerCreate, CustomerOut, CustomerUpdate, CustomerStatus,
+    MAX_TOKEN_PREFIX, build_customer_search, digits_only, new_customer_document, normalise_search_text, search_words,
+)
+from app.dependencies import get_db
+from app.services.dashboard_stats import dashboard_stats
+from app.utils.bulk_io import detect_format, ndjson_export, run_import, validation_message
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, page_response, response_projection
 from beanie import PydanticObjectId
+import re
 
 router = APIRouter(prefix="/api/customers", tags=["customers"])
 
-@router.get("", response_model=List[Customer])
-async def list_customers():
-    return await Customer.find_all().to_list()
+# Autocomplete reads at most limit * this many matching customers
+AUTOCOMPLETE_SCAN_FACTOR = 10
 
-@router.post("", response_model=Customer)
+@router.get("", response_model=List[CustomerOut])
+async def list_customers(
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None),
+    db=Depends(get_db),
+):
+    # Read through the raw collection so pages are bounded and projectable
+    projection = response_projection(fields, CustomerOut)
+    docs, next_cursor = await fetch_page(db.customers, cursor=cursor, limit=limit, projection=projection)
+    return page_response(response, docs, next_cursor, projection)
+
+@router.post("", response_model=CustomerOut)
 async def create_customer(customer_data: CustomerCreate):
     new_customer = Customer(**customer_data.dict(exclude_none=True))
     await new_customer.insert()
+    dashboard_stats.mark_dirty("customers")
     return new_customer
 
-@router.get("/search", response_model=List[Customer])
+@router.post("/import")
+async def import_customers(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="ndjson or csv; guessed from the file name when omitted"),
+    db=Depends(get_db),
+):
+    """Bulk create customers from NDJSON or CSV (dotted columns such as location.city)."""
+    async def prepare(rows, report):
+        docs, numbers = [], []
+        for number, row in rows:
+            try:
+                docs.append(new_customer_document(CustomerCreate(**row)))
+                numbers.append(number)
+            except ValidationError as e:
+                report.error(number, validation_message(e))
+        return docs, numbers
+
+    result = await run_import(file, detect_format(file, format), prepare, db.customers)
+    if result["inserted"]:
+        dashboard_stats.mark_dirty("customers")
+    return result
+
+@router.get("/export")
+async def export_customers(db=Depends(get_db)):
+    return ndjson_export(db.customers.find({}, {"search": 0}).sort("_id", 1), "customers.ndjson")
+
+@router.get("/search", response_model=List[CustomerOut])
 async def search_customers(
     query: Optional[str] = None,
     name: Optional[str] = None,
@@ -28,6 +76,7 @@ async def search_customers(
     industry: Optional[str] = None,
     industryColorClass: Optional[str] = None,
     engagements: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ):
     """Flexible customer search supporting multiple optional filters. If no filters
     are provided, all customers will be returned.
@@ -35,16 +84,15 @@ async def search_customers(
 
     search_filter: dict = {}
 
+    def prefix(value: Optional[str]) -> dict:
+        # Anchored, escaped prefix on a lowercase shadow field so the index is used
+        return {"$regex": f"^{re.escape(value)}"}
+
     # Location filters
-    location_filters = []
-    if city:
-        location_filters.append({"location.city": {"$regex": city, "$options": "i"}})
-    if state:
-        location_filters.append({"location.state": {"$regex": state, "$options": "i"}})
-    if country:
-        location_filters.append({"location.country": {"$regex": country, "$options": "i"}})
-    if location_filters:
-        search_filter["$and"] = location_filters
+    for field, value in (("city", city), ("state", state), ("country", country)):
+        value = normalise_search_text(value)
+        if value:
+            search_filter[f"search.{field}"] = prefix(value)
 
     # Status filter
     if status:
@@ -54,25 +102,23 @@ async def search_customers(
     if industry:
         search_filter["industry"] = industry
 
-    # Generic query search across multiple fields
+    # Generic query: every word must prefix a token from name, contact,
+    # address or description
     if query:
-        regex = {"$regex": query, "$options": "i"}
-        search_filter["$or"] = [
-            {"name": regex},
-            {"contactInfo.phone": regex},
-            {"contactInfo.email": regex},
-            {"contactInfo.website": regex},
-            {"location.address": regex},
-            {"description": regex}
-        ]
+        words = [w[:MAX_TOKEN_PREFIX] for w in search_words(query)]
+        if words:
+            search_filter["search.tokens"] = {"$all": words}
 
     # Additional filters
+    name = normalise_search_text(name)
     if name:
-        search_filter["name"] = {"$regex": name, "$options": "i"}
+        search_filter["search.name"] = prefix(name)
+    phone = digits_only(phone)
     if phone:
-        search_filter["contactInfo.phone"] = {"$regex": phone, "$options": "i"}
+        search_filter["search.phone"] = prefix(phone)
+    address = normalise_search_text(address)
     if address:
-        search_filter["location.address"] = {"$regex": address, "$options": "i"}
+        search_filter["search.address"] = prefix(address)
     if industryColorClass:
         search_filter["industryColorClass"] = industryColorClass
     if engagements is not None:
@@ -81,39 +127,44 @@ async def search_customers(
         except (TypeError, ValueError):
             pass  # ignore invalid engagement values
 
-    return await Customer.find(search_filter).to_list()
+    return await Customer.find(search_filter).limit(limit).to_list()
 
 @router.get("/autocomplete/names", response_model=List[str])
-async def autocomplete_names(prefix: str):
+async def autocomplete_names(prefix: str, limit: int = Query(10, ge=1, le=50)):
+    prefix = normalise_search_text(prefix)
     if not prefix:
         raise HTTPException(status_code=400, detail="Prefix required")
 
-    regex = {"$regex": f"^{prefix}", "$options": "i"}
-    # Beanie distinct aggregation to fetch unique names only
-    names_cursor = Customer.find({"name": regex}).project({"name": 1})
-    names = [c.name async for c in names_cursor]
-    # remove duplicates while preserving order
-    seen = set()
-    unique_names: List[str] = []
-    for n in names:
-        if n not in seen:
-            seen.add(n)
-            unique_names.append(n)
-    return unique_names
-
-@router.get("/{id}", response_model=Customer)
+    # Walk the search.name index in order and stop after a bounded number of
+    # matches, so a short prefix never groups the whole collection. Names
+    # are grouped on their normalised form, so "Acme" and "ACME" are one
+    # suggestion shown with the first spelling in index order.
+    pipeline = [
+        {"$match": {"search.name": {"$regex": f"^{re.escape(prefix)}"}}},
+        {"$sort": {"search.name": 1, "name": 1}},
+        {"$limit": limit * AUTOCOMPLETE_SCAN_FACTOR},
+        {"$group": {"_id": "$search.name", "name": {"$first": "$name"}}},
+        {"$sort": {"_id": 1}},
+        {"$limit": limit},
+    ]
+    rows = await Customer.aggregate(pipeline).to_list()
+    return [row["name"] for row in rows]
+
+@router.get("/{id}", response_model=CustomerOut)
 async def get_customer(id: PydanticObjectId):
     customer = await Customer.get(id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
 
-@router.put("/{id}", response_model=Customer)
+@router.put("/{id}", response_model=CustomerOut)
 async def update_customer(id: PydanticObjectId, customer_update: CustomerUpdate):
     customer = await Customer.get(id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     update_data = customer_update.dict(exclude_unset=True)
+    # Keep the search shadow fields in step with the updated values
+    update_data["search"] = build_customer_search({**customer.dict(), **update_data})
     await customer.set(update_data)
     return customer
 
@@ -123,4 +174,5 @@ async def delete_customer(id: PydanticObjectId):
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     await customer.delete()
+    dashboard_stats.mark_dirty("customers")
     return {"message": "Customer deleted successfully"}
@@ -1,22 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
 from fastapi.responses import FileResponse
-from typing import List
-from app.models.document import DocumentModel
+from typing import List, Optional
+from app.models.document import DocumentInDB, DocumentModel
 from app.models.engagement import EngagementModel
-from app.services.document_processor import DocumentProcessor
-from app.services.ai_processor import EngagementAnalyzer
+from app.services.document_processor import MAX_FILE_SIZE
+from app.services.document_pipeline import PROCESS_DOCUMENT_JOB
+from app.services.blob_store import BlobStore
+from app.services.job_queue import job_queue
+from app.services.dashboard_stats import dashboard_stats
+from app.services.ryg_engine import ryg_engine
 from app.dependencies import get_db, get_settings
+from app.utils.file_utils import FileTooLargeError, safe_filename
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, page_response, response_projection
 from bson import ObjectId
 from datetime import datetime
 import os
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
-processor = DocumentProcessor()
-analyzer = EngagementAnalyzer()
+blob_store = BlobStore(os.path.join(get_settings().UPLOAD_DIR, "blobs"))
 
 @router.get("", response_model=List[DocumentModel])
-async def list_documents(db=Depends(get_db)):
-    return await db.documents.find().to_list(100)
+async def list_documents(
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None),
+    db=Depends(get_db),
+):
+    projection = response_projection(fields, DocumentModel)
+    docs, next_cursor = await fetch_page(db.documents, cursor=cursor, limit=limit, projection=projection)
+    return page_response(response, docs, next_cursor, projection)
 
 @router.get("/{id}", response_model=DocumentModel)
 async def get_document(id: str, db=Depends(get_db)):
@@ -33,25 +46,37 @@ async def upload_document(
     settings=Depends(get_settings),
     db = Depends(get_db)
 ):
-    upload_dir = settings.UPLOAD_DIR
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, file.filename)
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
-    # Create Beanie document instance
-    doc = DocumentModel(
-        engagementId=ObjectId(engagementId),
-        filename=file.filename,
-        originalName=file.filename,
-        fileType=fileType,
-        mimeType=file.content_type,
-        size=len(content),
-        filePath=file_path,
-        uploadedBy="system",
-        uploadedAt=datetime.utcnow(),
-    )
-    await doc.insert()
+    # Checked before streaming: put() takes a blob reference that only a
+    # stored document row can give back
+    if not ObjectId.is_valid(engagementId):
+        raise HTTPException(status_code=400, detail="Invalid engagementId")
+    engagement_oid = ObjectId(engagementId)
+    # Stream into the content-addressed store; identical files share one blob
+    try:
+        stored = await blob_store.put(db, file, MAX_FILE_SIZE)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    file_path = stored["path"]
+    # Without a stored row nothing points at the blob, so a failure from here
+    # on drops the reference put() took
+    try:
+        # Create Beanie document instance
+        doc = DocumentInDB(
+            engagementId=engagement_oid,
+            filename=safe_filename(file.filename),
+            originalName=file.filename,
+            fileType=fileType,
+            mimeType=file.content_type,
+            size=stored["size"],
+            sha256=stored["sha256"],
+            filePath=file_path,
+            uploadedBy="system",
+            uploadedAt=datetime.utcnow(),
+        )
+        await doc.insert()
+    except Exception:
+        await blob_store.release(db, stored["sha256"], file_path)
+        raise
 
     # If document is of type msa or sow, embed its path into engagement doc
     if fileType in {"msa", "sow"}:
@@ -65,7 +90,7 @@ async def upload_document(
         # 1) ensure msa/sow object exists and is an object (not null)
         await db.engagements.update_one(
             {
-                "_id": ObjectId(engagementId),
+                "_id": engagement_oid,
                 "$or": [
                     {fileType: {"$exists": False}},
                     {fileType: None}
@@ -75,15 +100,27 @@ async def upload_document(
         )
         # 2) push file path
         await db.engagements.update_one(
-            {"_id": ObjectId(engagementId)},
+            {"_id": engagement_oid},
             {"$addToSet": {f"{fileType}.documents": file_path}}
         )
 
+    dashboard_stats.mark_dirty("documents")
     return doc
 
 @router.get("/engagements/{id}/documents", response_model=List[DocumentModel])
-async def list_documents_for_engagement(id: str, db=Depends(get_db)):
-    return await db.documents.find({"engagementId": ObjectId(id)}).to_list(100)
+async def list_documents_for_engagement(
+    id: str,
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None),
+    db=Depends(get_db),
+):
+    projection = response_projection(fields, DocumentModel)
+    docs, next_cursor = await fetch_page(
+        db.documents, {"engagementId": ObjectId(id)}, cursor=cursor, limit=limit, projection=projection
+    )
+    return page_response(response, docs, next_cursor, projection)
 
 @router.get("/{id}/download")
 async def download_document(id: str, db=Depends(get_db)):
@@ -91,65 +128,29 @@ async def download_document(id: str, db=Depends(get_db)):
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     file_path = doc['filePath']
-    return FileResponse(file_path, media_type=doc['mimeType'], filename=doc['filename'])
+    return FileResponse(file_path, media_type=doc['mimeType'], filename=doc.get('originalName') or doc['filename'])
 
 @router.delete("/{id}")
 async def delete_document(id: str, db=Depends(get_db)):
     doc = await db.documents.find_one({"_id": ObjectId(id)})
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-    os.remove(doc['filePath'])
     await db.documents.delete_one({"_id": ObjectId(id)})
+    await ryg_engine.document_changed(db, doc['engagementId'], doc.get('aiExtracted'), None)
+    # Only unlinks the blob once no other document references it
+    await blob_store.release(db, doc.get("sha256"), doc['filePath'])
+    dashboard_stats.mark_dirty("documents")
     return {"msg": "Deleted"}
 
-@router.post("/{id}/process")
-async def process_document(id: str, db=Depends(get_db)):
-    doc = await db.documents.find_one({"_id": ObjectId(id)})
+@router.post("/{id}/process", status_code=202)
+async def process_document(id: str, response: Response, refresh: bool = Query(False), db=Depends(get_db)):
+    doc = await db.documents.find_one({"_id": ObjectId(id)}, {"_id": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-
-    # Step 1: Extract and analyze content
-    text = processor.extract_text(doc['filePath'])
-    sentiment = processor.analyze_sentiment(text)
-    action_items = processor.extract_action_items(text)
-
-    # Step 2: Save AI results in document
-    ai_data = {
-        "text_content": text,
-        "sentiment": sentiment.get("sentiment"),
-        "action_items": action_items,
-        "key_metrics": {}
-    }
-    await db.documents.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": {"aiExtracted": ai_data, "processedAt": datetime.utcnow()}}
-    )
-
-    # Step 3: Update engagement with AI insights
-    engagement = await db.engagements.find_one({"_id": doc['engagementId']})
-    ryg_status = None
-    if engagement:
-        ryg_status = analyzer.compute_ryg_status(str(engagement['_id']))
-        ai_insights = {
-            "sentiment_score": sentiment.get("score", 0),
-            "key_topics": [],  # Can be filled via GPT if needed
-            "risk_factors": []  # Can be filled via GPT if needed
-        }
-        await db.engagements.update_one(
-            {"_id": engagement['_id']},
-            {
-                "$set": {
-                    "ryg_status": ryg_status,
-                    "aiInsights": ai_insights,
-                    "lastAiAnalysis": datetime.utcnow()
-                }
-            }
-        )
-
-    # Step 4: Return response
-    return {
-        "msg": "Document processed",
-        "sentiment": sentiment,
-        "action_items": action_items,
-        "ryg_status": ryg_status
-    }
+    # Extraction and AI analysis run in the background job workers;
+    # poll /api/jobs/{jobId} or stream /api/jobs/{jobId}/events for progress.
+    # refresh=true bypasses cached model answers for this document.
+    job = await job_queue.enqueue(db, PROCESS_DOCUMENT_JOB, {"documentId": id, "refresh": refresh}, dedupe_key=id)
+    job_id = str(job["_id"])
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return {"msg": "Document processing queued", "jobId": job_id, "status": job["status"]}
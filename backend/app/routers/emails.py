@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
 from app.models.email import EmailBase
 from app.dependencies import get_db
+from app.services.ryg_engine import ryg_engine
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, page_response, response_projection
 from bson import ObjectId
 from datetime import datetime
 
 router = APIRouter(prefix="/api/emails", tags=["emails"])
 
 @router.get("", response_model=List[EmailBase])
-async def list_emails(db=Depends(get_db)):
-    return await db.emails.find().to_list(100)
+async def list_emails(
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None),
+    db=Depends(get_db),
+):
+    projection = response_projection(fields, EmailBase)
+    docs, next_cursor = await fetch_page(db.emails, cursor=cursor, limit=limit, projection=projection)
+    return page_response(response, docs, next_cursor, projection)
 
 @router.get("/{id}", response_model=EmailBase)
 async def get_email(id: str, db=Depends(get_db)):
@@ -24,4 +34,5 @@ async def create_email(email: EmailBase, db=Depends(get_db)):
     data["receivedAt"] = datetime.utcnow()
     result = await db.emails.insert_one(data)
     data["_id"] = str(result.inserted_id)
+    await ryg_engine.email_changed(db, data["engagementId"], None, data)
     return data
@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
+from typing import List, Optional
+from pydantic import ValidationError
+from pymongo import UpdateOne
 from app.models.engagement import EngagementBase, EngagementOut, EngagementUpdate
+from app.database import run_in_transaction
 from app.dependencies import get_db
+from app.services.dashboard_stats import dashboard_stats
+from app.services.job_queue import job_queue
+from app.services.ryg_recompute import RECOMPUTE_RYG_JOB
+from app.services.search_service import global_search as run_global_search
+from app.utils.bulk_io import detect_format, ndjson_export, run_import, validation_message
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, page_response, response_projection
 from bson import ObjectId
 from datetime import datetime
 
@@ -11,45 +20,162 @@ from fastapi import Query
 
 import logging
 
+logger = logging.getLogger(__name__)
+
+CONTRACT_DOC_TYPES = ("msa", "sow")
+
+def _contract_documents(engagement_id: ObjectId, data: dict) -> List[dict]:
+    """`documents` rows for the MSA / SOW file paths given on an engagement."""
+    import os
+    now = datetime.utcnow()
+    rows = []
+    for doc_type in CONTRACT_DOC_TYPES:
+        for p in (data.get(doc_type) or {}).get("documents") or []:
+            if not p:
+                continue
+            rows.append({
+                "engagementId": engagement_id,
+                "filename": os.path.basename(p),
+                "originalName": os.path.basename(p),
+                "fileType": doc_type,
+                "mimeType": "",  # not available
+                "size": 0,  # unknown
+                "filePath": p,
+                "uploadedBy": "system",
+                "uploadedAt": now,
+            })
+    return rows
+
+async def _link_customers(db, engagements: List[dict]) -> None:
+    """Add engagement counts and references to their customers in one bulk write."""
+    by_customer: dict = {}
+    for e in engagements:
+        by_customer.setdefault(e["customerId"], []).append(str(e["_id"]))
+    writes = [
+        UpdateOne(
+            {"_id": ObjectId(customer_id)},
+            {"$inc": {"engagements": len(ids)}, "$addToSet": {"engagementIds": {"$each": ids}}},
+        )
+        for customer_id, ids in by_customer.items()
+    ]
+    if writes:
+        await db.customers.bulk_write(writes, ordered=False)
+
+async def _attach_contract_documents(db, engagements: List[dict]) -> None:
+    """Fill msa/sow document paths for a page of engagements with one query."""
+    eng_ids = [str(doc["_id"]) for doc in engagements if doc.get("_id")]
+    if not eng_ids:
+        return
+    # Documents may reference the engagement by ObjectId (uploads) or by its
+    # string form (older records), so match both against the
+    # (engagementId, fileType) index.
+    id_values = [ObjectId(i) for i in eng_ids if ObjectId.is_valid(i)] + eng_ids
+    paths: dict = {}
+    cursor = db.documents.find(
+        {"engagementId": {"$in": id_values}, "fileType": {"$in": list(CONTRACT_DOC_TYPES)}},
+        {"_id": 0, "engagementId": 1, "fileType": 1, "filePath": 1},
+    )
+    async for d in cursor:
+        paths.setdefault((str(d["engagementId"]), d["fileType"]), []).append(d["filePath"])
+    for doc in engagements:
+        for doc_type in CONTRACT_DOC_TYPES:
+            found = paths.get((str(doc["_id"]), doc_type))
+            if not found:
+                continue
+            if not doc.get(doc_type):
+                doc[doc_type] = {"reference": None, "value": None, "startDate": None, "endDate": None, "documents": found}
+            else:
+                doc[doc_type]["documents"] = found
+
 @router.get("", response_model=List[EngagementOut])
-async def list_engagements(customerId: str = Query(None), db=Depends(get_db)):
-    def fix_id(doc):
-        if doc and "_id" in doc and not isinstance(doc["_id"], str):
+async def list_engagements(
+    response: Response,
+    customerId: str = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None),
+    db=Depends(get_db),
+):
+    projection = response_projection(fields, EngagementOut)
+    query = {"customerId": customerId} if customerId else {}
+    docs, next_cursor = await fetch_page(db.engagements, query, cursor=cursor, limit=limit, projection=projection)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Listed engagements", extra={"customerId": customerId, "count": len(docs), "hasMore": next_cursor is not None})
+    if projection is None:
+        # Validated through EngagementOut: ids as strings, timestamps present
+        for doc in docs:
             doc["_id"] = str(doc["_id"])
-        return doc
-    db_name = getattr(db, 'name', None)
-    collection_name = getattr(getattr(db, 'engagements', None), 'name', None)
-    if customerId:
-        docs = await db.engagements.find({"customerId": customerId}).to_list(100)
-        print(f"DEBUG: DB: {db_name}, Collection: {collection_name}, Query: {{'customerId': {customerId}}}, Found: {len(docs)} docs: {docs}")
-    else:
-        docs = await db.engagements.find().to_list(100)
-        print(f"DEBUG: DB: {db_name}, Collection: {collection_name}, Query: ALL, Found: {len(docs)} docs: {docs}")
-    enriched = []
-    for doc in docs:
-        # ensure _id as str
-        doc = fix_id(doc)
-        # Ensure timestamps are included and properly formatted
-        doc["createdAt"] = doc.get("createdAt")
-        doc["updatedAt"] = doc.get("updatedAt")
-        
-        eng_id_str = doc.get("_id")
-        if eng_id_str:
-            docs_cursor = await db.documents.find({"engagementId": eng_id_str}).to_list(100)
-            msa_docs = [d["filePath"] for d in docs_cursor if d.get("fileType") == "msa"]
-            sow_docs = [d["filePath"] for d in docs_cursor if d.get("fileType") == "sow"]
-            if msa_docs:
-                if not doc.get("msa"):
-                    doc["msa"] = {"reference": None, "value": None, "startDate": None, "endDate": None, "documents": msa_docs}
-                else:
-                    doc["msa"]["documents"] = msa_docs
-            if sow_docs:
-                if not doc.get("sow"):
-                    doc["sow"] = {"reference": None, "value": None, "startDate": None, "endDate": None, "documents": sow_docs}
-                else:
-                    doc["sow"]["documents"] = sow_docs
-        enriched.append(doc)
-    return enriched
+            doc.setdefault("createdAt", None)
+            doc.setdefault("updatedAt", None)
+    if projection is None or any(t in projection for t in CONTRACT_DOC_TYPES):
+        await _attach_contract_documents(db, docs)
+    return page_response(response, docs, next_cursor, projection)
+
+@router.get("/search")
+async def search_engagements(q: str, db=Depends(get_db)):
+    # Declared before /{id} so "search" is not parsed as an engagement id.
+    # Served by the weighted text index created at startup.
+    return await run_global_search(db, q, ["engagements"], limit=100)
+
+@router.post("/import")
+async def import_engagements(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="ndjson or csv; guessed from the file name when omitted"),
+    db=Depends(get_db),
+):
+    """Bulk create engagements; customers are checked and updated once per batch."""
+    async def prepare(rows, report):
+        candidates = []
+        for number, row in rows:
+            try:
+                data = EngagementBase(**row).dict(by_alias=True)
+            except ValidationError as e:
+                report.error(number, validation_message(e))
+                continue
+            data["customerId"] = str(data["customerId"])
+            if not ObjectId.is_valid(data["customerId"]):
+                report.error(number, "customerId: not a valid id")
+                continue
+            candidates.append((number, data))
+        customer_ids = {ObjectId(data["customerId"]) for _, data in candidates}
+        known = {str(c["_id"]) async for c in db.customers.find({"_id": {"$in": list(customer_ids)}}, {"_id": 1})}
+        docs, numbers = [], []
+        now = datetime.utcnow()
+        for number, data in candidates:
+            if data["customerId"] not in known:
+                report.error(number, "customerId: customer not found")
+                continue
+            data["createdAt"] = now
+            data["updatedAt"] = now
+            docs.append(data)
+            numbers.append(number)
+        return docs, numbers
+
+    async def after_insert(engagements):
+        await _link_customers(db, engagements)
+        contract_docs = [d for e in engagements for d in _contract_documents(e["_id"], e)]
+        if contract_docs:
+            await db.documents.insert_many(contract_docs, ordered=False)
+
+    result = await run_import(file, detect_format(file, format), prepare, db.engagements, after_insert)
+    if result["inserted"]:
+        for source in ("engagements", "customers", "documents"):
+            dashboard_stats.mark_dirty(source)
+    return result
+
+@router.get("/export")
+async def export_engagements(customerId: Optional[str] = Query(None), db=Depends(get_db)):
+    query = {"customerId": customerId} if customerId else {}
+    return ndjson_export(db.engagements.find(query).sort("_id", 1), "engagements.ndjson")
+
+@router.post("/recompute-ryg", status_code=202)
+async def recompute_ryg(response: Response, db=Depends(get_db)):
+    # Portfolio-wide refresh of ryg_status and aiInsights in the job workers;
+    # a run already queued or in progress is returned instead of a second one
+    job = await job_queue.enqueue(db, RECOMPUTE_RYG_JOB, {"runId": str(ObjectId())}, dedupe_key=RECOMPUTE_RYG_JOB)
+    job_id = str(job["_id"])
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return {"msg": "RYG recompute queued", "jobId": job_id, "status": job["status"]}
 
 @router.get("/{id}", response_model=EngagementOut)
 async def get_engagement(id: str, db=Depends(get_db)):
@@ -87,48 +213,30 @@ async def create_engagement(engagement: EngagementBase, db=Depends(get_db)):
         data["customerId"] = str(data["customerId"])
     data["createdAt"] = datetime.utcnow()
     data["updatedAt"] = datetime.utcnow()
-    result = await db.engagements.insert_one(data)
-    if result.inserted_id:
-        data["_id"] = str(result.inserted_id)
-        # Update the related customer document: increment engagement count and add reference
-        try:
-            update_res = await db.customers.update_one(
+    engagement_id = ObjectId()
+    data["_id"] = engagement_id
+    contract_docs = _contract_documents(engagement_id, data)
+
+    # Engagement, customer counter/reference and MSA / SOW document rows are
+    # written together, so the customer counters cannot drift from a
+    # half-finished create
+    async def write(session):
+        await db.engagements.insert_one(data, session=session)
+        if ObjectId.is_valid(data["customerId"]):
+            await db.customers.update_one(
                 {"_id": ObjectId(data["customerId"])},
-                {
-                    "$inc": {"engagements": 1},
-                    "$addToSet": {"engagementIds": str(result.inserted_id)}
-                }
+                {"$inc": {"engagements": 1}, "$addToSet": {"engagementIds": str(engagement_id)}},
+                session=session,
             )
-            logging.info("Customer update result: matched=%s, modified=%s", update_res.matched_count, update_res.modified_count)
-        except Exception as e:
-            # Log but don't fail creation if customer update fails
-            import logging
-            logging.exception("Failed to update customer with engagement reference: %s", e)
-        # Persist MSA / SOW document references into documents collection
-        import os, datetime as _dt
-        async def _persist_docs(doc_paths, doc_type):
-            for p in doc_paths:
-                if not p:
-                    continue
-                doc_record = {
-                    "engagementId": str(result.inserted_id),
-                    "filename": os.path.basename(p),
-                    "originalName": os.path.basename(p),
-                    "fileType": doc_type,
-                    "mimeType": "",  # not available
-                    "size": 0,  # unknown
-                    "filePath": p,
-                    "uploadedBy": "system",
-                    "uploadedAt": _dt.datetime.utcnow(),
-                }
-                await db.documents.insert_one(doc_record)
-        if data.get("msa") and data["msa"].get("documents"):
-            await _persist_docs(data["msa"]["documents"], "msa")
-        if data.get("sow") and data["sow"].get("documents"):
-            await _persist_docs(data["sow"]["documents"], "sow")
-        return data
-    else:
-        raise HTTPException(status_code=500, detail="Failed to create engagement")
+        if contract_docs:
+            await db.documents.insert_many(contract_docs, ordered=False, session=session)
+
+    await run_in_transaction(write)
+    data["_id"] = str(engagement_id)
+    dashboard_stats.mark_dirty("engagements")
+    if contract_docs:
+        dashboard_stats.mark_dirty("documents")
+    return data
 
 @router.put("/{id}", response_model=EngagementOut)
 async def update_engagement(id: str, engagement: EngagementUpdate, db=Depends(get_db)):
@@ -141,32 +249,26 @@ async def update_engagement(id: str, engagement: EngagementUpdate, db=Depends(ge
         result["_id"] = str(result["_id"])
     if not result:
         raise HTTPException(status_code=404, detail="Engagement not found")
+    dashboard_stats.mark_dirty("engagements")
     return result
 
 @router.delete("/{id}")
 async def delete_engagement(id: str, db=Depends(get_db)):
-    # Fetch engagement first to know associated customer
-    engagement_doc = await db.engagements.find_one({"_id": ObjectId(id)})
-    result = await db.engagements.delete_one({"_id": ObjectId(id)})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Engagement not found")
-    # Update customer document to remove reference and decrement count
-    try:
-        if engagement_doc:
-            update_res = await db.customers.update_one(
-                {"_id": ObjectId(engagement_doc.get("customerId"))},
-                {
-                    "$inc": {"engagements": -1},
-                    "$pull": {"engagementIds": str(id)}
-                }
+    # Delete and unlink from the customer in one transaction; the deleted
+    # document tells us which customer to update
+    async def write(session):
+        engagement_doc = await db.engagements.find_one_and_delete(
+            {"_id": ObjectId(id)}, projection={"customerId": 1}, session=session
+        )
+        if engagement_doc and ObjectId.is_valid(str(engagement_doc.get("customerId"))):
+            await db.customers.update_one(
+                {"_id": ObjectId(engagement_doc["customerId"])},
+                {"$inc": {"engagements": -1}, "$pull": {"engagementIds": str(id)}},
+                session=session,
             )
-            logging.info("Customer update result: matched=%s, modified=%s", update_res.matched_count, update_res.modified_count)
-    except Exception as e:
-        import logging
-        logging.exception("Failed to update customer after engagement deletion: %s", e)
-    return {"msg": "Deleted"}
+        return engagement_doc
 
-@router.get("/search")
-async def search_engagements(q: str, db=Depends(get_db)):
-    # Placeholder: Use MongoDB text index for search
-    return await db.engagements.find({"$text": {"$search": q}}).to_list(100)
+    if not await run_in_transaction(write):
+        raise HTTPException(status_code=404, detail="Engagement not found")
+    dashboard_stats.mark_dirty("engagements")
+    return {"msg": "Deleted"}
@@ -0,0 +1,62 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
+from app.dependencies import get_db
+from app.services.job_queue import TERMINAL_STATES, job_queue
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Seconds between job polls while streaming progress events
+EVENT_POLL_INTERVAL = 1.0
+
+def _job_out(job: dict) -> dict:
+    error = job.get("error")
+    return jsonable_encoder({
+        "id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "progress": job.get("progress"),
+        "result": job.get("result"),
+        "error": {"message": error["message"], "type": error["type"]} if error else None,
+        "createdAt": job.get("createdAt"),
+        "updatedAt": job.get("updatedAt"),
+        "finishedAt": job.get("finishedAt"),
+    }, custom_encoder={ObjectId: str})
+
+async def _get_job_or_404(db, id: str) -> dict:
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = await job_queue.get(db, id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{id}")
+async def get_job(id: str, db=Depends(get_db)):
+    return _job_out(await _get_job_or_404(db, id))
+
+@router.get("/{id}/events")
+async def job_events(id: str, db=Depends(get_db)):
+    # Server-sent events: one event per status/progress change until the job finishes
+    await _get_job_or_404(db, id)
+
+    async def stream():
+        last = None
+        while True:
+            job = await job_queue.get(db, id)
+            if not job:
+                return
+            out = _job_out(job)
+            marker = (out["status"], json.dumps(out["progress"]), out["attempts"])
+            if marker != last:
+                last = marker
+                yield f"event: {out['status']}\ndata: {json.dumps(out)}\n\n"
+            if out["status"] in TERMINAL_STATES:
+                return
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
@@ -1,18 +1,29 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Dict, Optional
+from app.dependencies import get_db
+from app.services.search_service import MAX_SEARCH_RESULTS, TEXT_INDEXES, global_search as run_global_search
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
 @router.get("")
-def global_search(q: str = Query(...), type: Optional[str] = Query("all")) -> List[Dict]:
-    # Placeholder: Perform search on customers and/or engagements
-    # Would use MongoDB text indexes in production
-    if type == "customers":
-        return [{"type": "customer", "name": "Acme Corp", "industry": "Tech"}]
-    elif type == "engagements":
-        return [{"type": "engagement", "name": "Project X", "status": "active"}]
+async def global_search(
+    q: str = Query(...),
+    type: Optional[str] = Query("all"),
+    offset: int = Query(0, ge=0, lt=MAX_SEARCH_RESULTS),
+    limit: int = Query(20, ge=1, le=100),
+    db=Depends(get_db),
+) -> List[Dict]:
+    # Ranked search over the weighted text indexes created at startup
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query required")
+    if offset + limit > MAX_SEARCH_RESULTS:
+        # Only the top MAX_SEARCH_RESULTS hits are ranked; say so instead of
+        # returning a short or empty page that looks like the end
+        raise HTTPException(status_code=400, detail=f"Search results are limited to the top {MAX_SEARCH_RESULTS} hits; narrow the query")
+    if type in (None, "all"):
+        collections = None
+    elif type in TEXT_INDEXES:
+        collections = [type]
     else:
-        return [
-            {"type": "customer", "name": "Acme Corp", "industry": "Tech"},
-            {"type": "engagement", "name": "Project X", "status": "active"}
-        ]
+        raise HTTPException(status_code=400, detail=f"Unsupported search type: {type}")
+    return await run_global_search(db, q, collections, offset=offset, limit=limit)
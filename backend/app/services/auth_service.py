@@ -1 +1,142 @@
+import asyncio
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Any, Dict, List, Optional
 
+import msal
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.metrics import metrics
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # The token cache holds refresh tokens: keep it private to the service user
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class AzureAuth:
+    """
+    Process-wide MSAL confidential client for the Azure AD login flow.
+    The client is built once, on first use, in the threadpool: building it
+    runs authority/OpenID discovery over HTTP, and the discovery responses are
+    kept in MSAL's HTTP cache (persisted to MSAL_HTTP_CACHE_PATH) so restarts
+    do not repeat them. Token redemption is a blocking HTTP call as well and
+    runs in the threadpool, leaving one token round trip per login. Tokens go
+    to a SerializableTokenCache persisted to MSAL_TOKEN_CACHE_PATH.
+    """
+
+    def __init__(
+        self,
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        authority: Optional[str] = None,
+        token_cache_path: Optional[str] = None,
+        http_cache_path: Optional[str] = None,
+        http_client: Any = None,
+    ):
+        self.client_id = client_id or settings.AZURE_CLIENT_ID
+        self.client_secret = client_secret or settings.AZURE_CLIENT_SECRET
+        self.authority = authority or settings.AZURE_AUTHORITY or f"https://login.microsoftonline.com/{settings.AZURE_TENANT_ID}"
+        self.token_cache_path = token_cache_path if token_cache_path is not None else settings.MSAL_TOKEN_CACHE_PATH
+        self.http_cache_path = http_cache_path if http_cache_path is not None else settings.MSAL_HTTP_CACHE_PATH
+        self._http_client = http_client
+        self.token_cache = msal.SerializableTokenCache()
+        self.http_cache: Dict[str, Any] = {}
+        self._app: Optional[msal.ConfidentialClientApplication] = None
+        self._build_lock: Optional[asyncio.Lock] = None
+        # Cache files are written from threadpool workers
+        self._persist_lock = threading.Lock()
+
+    def _load_caches(self) -> None:
+        if self.token_cache_path and os.path.exists(self.token_cache_path):
+            try:
+                with open(self.token_cache_path, "r", encoding="utf-8") as f:
+                    self.token_cache.deserialize(f.read())
+            except (OSError, ValueError):
+                logger.warning("Ignoring unreadable MSAL token cache at %s", self.token_cache_path)
+        if self.http_cache_path and os.path.exists(self.http_cache_path):
+            try:
+                with open(self.http_cache_path, "rb") as f:
+                    self.http_cache = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                logger.warning("Ignoring unreadable MSAL HTTP cache at %s", self.http_cache_path)
+
+    def _build(self) -> msal.ConfidentialClientApplication:
+        self._load_caches()
+        options: Dict[str, Any] = {}
+        if self._http_client is not None:
+            options["http_client"] = self._http_client
+        started = time.monotonic()
+        app = msal.ConfidentialClientApplication(
+            self.client_id,
+            authority=self.authority,
+            client_credential=self.client_secret,
+            token_cache=self.token_cache,
+            http_cache=self.http_cache,
+            **options,
+        )
+        metrics.observe("azure_discovery_seconds", time.monotonic() - started)
+        self.persist()
+        return app
+
+    async def app(self) -> msal.ConfidentialClientApplication:
+        if self._app is None:
+            if self._build_lock is None:
+                self._build_lock = asyncio.Lock()
+            async with self._build_lock:
+                if self._app is None:
+                    self._app = await run_in_threadpool(self._build)
+        return self._app
+
+    def persist(self) -> None:
+        """Write the token and HTTP caches to their files when they changed."""
+        with self._persist_lock:
+            if self.token_cache_path and self.token_cache.has_state_changed:
+                _write_atomic(self.token_cache_path, self.token_cache.serialize().encode("utf-8"))
+                self.token_cache.has_state_changed = False
+            if self.http_cache_path:
+                _write_atomic(self.http_cache_path, pickle.dumps(self.http_cache))
+
+    async def authorization_url(self, scopes: List[str], redirect_uri: Optional[str]) -> str:
+        app = await self.app()
+        return app.get_authorization_request_url(scopes, redirect_uri=redirect_uri, response_mode="query")
+
+    async def acquire_token_by_code(self, code: str, scopes: List[str], redirect_uri: Optional[str]) -> Dict[str, Any]:
+        app = await self.app()
+
+        def redeem() -> Dict[str, Any]:
+            result = app.acquire_token_by_authorization_code(code, scopes=scopes, redirect_uri=redirect_uri)
+            if self.token_cache_path and self.token_cache.has_state_changed:
+                self.persist()
+            return result
+
+        started = time.monotonic()
+        result = await run_in_threadpool(redeem)
+        metrics.observe("azure_token_seconds", time.monotonic() - started)
+        metrics.incr("azure_token_requests")
+        if "error" in result:
+            metrics.incr("azure_token_failures")
+        return result
+
+    async def close(self) -> None:
+        if self._app is not None:
+            await run_in_threadpool(self.persist)
+
+
+azure_auth = AzureAuth()
+
+# Verified session JWT claims by token, so most requests skip the HMAC check
+token_claims_cache: TTLCache[Dict[str, Any]] = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+# Encoded /auth/profile users by azure_id; dropped whenever the user is written
+user_cache: TTLCache[Dict[str, Any]] = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
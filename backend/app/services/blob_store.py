@@ -0,0 +1,126 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import UploadFile
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.file_utils import discard_file, stream_upload_to_temp
+
+# A deletion marker older than this belongs to a release() that died
+# between claiming the blob and unlinking it; uploads may take it over
+STALE_DELETE_AFTER = timedelta(seconds=60)
+DELETE_WAIT_SECONDS = 0.05
+
+
+class BlobStore:
+    """
+    Content-addressed file store.
+    Files are kept once per SHA-256 under sharded directories
+    (<root>/ab/cd/<sha256>). A row in the `blobs` collection counts the
+    `documents` rows that reference each blob. put() takes a reference before
+    the file is moved into place and release() unlinks the file once the count
+    drops to zero; both are atomic $inc updates, and the unlink runs under a
+    deletion marker that uploads of the same content wait for, so an upload
+    racing the delete of the last copy cannot lose its file.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def _commit(self, temp_path: str, sha256: str) -> bool:
+        """Move a finished temp file into place. Returns False if the blob already existed."""
+        final_path = self.path_for(sha256)
+        if os.path.exists(final_path):
+            discard_file(temp_path)
+            return False
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        return True
+
+    async def _acquire(self, db, sha256: str) -> None:
+        """Count one more reference, waiting out a release() that is unlinking the blob."""
+        while True:
+            try:
+                before = await db.blobs.find_one_and_update(
+                    {"_id": sha256, "deletingAt": None},
+                    {"$inc": {"refs": 1}},
+                    upsert=True,
+                )
+                break
+            except DuplicateKeyError:
+                await db.blobs.delete_one({"_id": sha256, "deletingAt": {"$lt": datetime.utcnow() - STALE_DELETE_AFTER}})
+                await asyncio.sleep(DELETE_WAIT_SECONDS)
+        if before is None:
+            # First counted reference; rows stored before reference counting
+            # existed still point at the blob
+            existing = await db.documents.count_documents({"sha256": sha256})
+            if existing:
+                await db.blobs.update_one({"_id": sha256}, {"$inc": {"refs": existing}})
+
+    async def put(self, db, upload: UploadFile, max_size: int) -> Dict[str, Any]:
+        stored = await stream_upload_to_temp(upload, self.tmp_dir, max_size)
+        await self._acquire(db, stored["sha256"])
+        try:
+            created = await run_in_threadpool(self._commit, stored["temp_path"], stored["sha256"])
+        except Exception:
+            await self.release(db, stored["sha256"], self.path_for(stored["sha256"]))
+            raise
+        return {
+            "path": self.path_for(stored["sha256"]),
+            "size": stored["size"],
+            "sha256": stored["sha256"],
+            "deduplicated": not created,
+        }
+
+    async def _claim_for_delete(self, db, sha256: str) -> bool:
+        """Mark an unreferenced blob as being deleted. False if it was referenced again."""
+        blob = await db.blobs.find_one_and_update(
+            {"_id": sha256, "deletingAt": None},
+            {"$inc": {"refs": -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if blob is not None:
+            if blob["refs"] > 0:
+                return False
+            claimed = await db.blobs.update_one(
+                {"_id": sha256, "refs": {"$lte": 0}, "deletingAt": None},
+                {"$set": {"deletingAt": datetime.utcnow()}},
+            )
+            return claimed.modified_count == 1
+        # Blob from before reference counting: hold a deletion marker while
+        # checking for other rows, so no upload can start counting meanwhile
+        try:
+            await db.blobs.insert_one({"_id": sha256, "refs": 0, "deletingAt": datetime.utcnow()})
+        except DuplicateKeyError:
+            return False
+        if await db.documents.count_documents({"sha256": sha256}, limit=1):
+            await db.blobs.delete_one({"_id": sha256})
+            return False
+        return True
+
+    async def release(self, db, sha256: Optional[str], file_path: str) -> bool:
+        """
+        Drop a reference after its document row was deleted.
+        The file is only removed when no other document still points at it.
+        Returns True when the file was unlinked.
+        """
+        if not sha256:
+            if await db.documents.count_documents({"filePath": file_path}, limit=1):
+                return False
+            await run_in_threadpool(discard_file, file_path)
+            return True
+        if not await self._claim_for_delete(db, sha256):
+            return False
+        try:
+            await run_in_threadpool(discard_file, self.path_for(sha256))
+        finally:
+            await db.blobs.delete_one({"_id": sha256, "deletingAt": {"$ne": None}})
+        return True
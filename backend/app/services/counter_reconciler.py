@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.metrics import metrics
+from app.services.dashboard_stats import dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+
+async def _reconcile_batch(db, customers: List[dict]) -> int:
+    """Compare a batch of customers with one aggregation over their engagements."""
+    actual: Dict[str, List[str]] = {str(c["_id"]): [] for c in customers}
+    pipeline = [
+        {"$match": {"customerId": {"$in": list(actual)}}},
+        {"$group": {"_id": "$customerId", "ids": {"$push": {"$toString": "$_id"}}}},
+    ]
+    async for group in db.engagements.aggregate(pipeline):
+        actual[group["_id"]] = group["ids"]
+
+    writes = []
+    for customer in customers:
+        ids = actual[str(customer["_id"])]
+        if customer.get("engagements") == len(ids) and sorted(customer.get("engagementIds") or []) == sorted(ids):
+            continue
+        writes.append(UpdateOne(
+            {"_id": customer["_id"]},
+            {"$set": {"engagements": len(ids), "engagementIds": ids}},
+        ))
+    if writes:
+        await db.customers.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def reconcile_counters(db, batch_size: int = settings.COUNTER_RECONCILE_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Reset each customer's `engagements` count and `engagementIds` to what the
+    engagements collection actually holds. Customers are streamed in batches
+    and only the ones that drifted are rewritten.
+    """
+    checked = fixed = 0
+    batch: List[dict] = []
+    cursor = db.customers.find({}, {"engagements": 1, "engagementIds": 1}).sort("_id", 1).batch_size(batch_size)
+    async for customer in cursor:
+        batch.append(customer)
+        if len(batch) >= batch_size:
+            fixed += await _reconcile_batch(db, batch)
+            checked, batch = checked + len(batch), []
+    if batch:
+        fixed += await _reconcile_batch(db, batch)
+        checked += len(batch)
+    metrics.incr("counter_reconcile_runs")
+    metrics.incr("counter_reconcile_fixed", fixed)
+    if fixed:
+        dashboard_stats.mark_dirty("customers")
+    return {"checked": checked, "fixed": fixed}
+
+
+class CounterReconciler:
+    """
+    Periodic safety net for the customer engagement counters. Creates and
+    deletes keep them in step inside a transaction, but imports, standalone
+    servers (no transactions) and manual edits can still leave them drifted.
+    """
+
+    def __init__(self, interval_seconds: Optional[float] = None):
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None else settings.COUNTER_RECONCILE_INTERVAL_SECONDS
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self, db) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await reconcile_counters(db)
+            except Exception:
+                logger.exception("Customer counter reconciliation failed")
+
+    def start(self, db) -> None:
+        if self._task is not None or self.interval_seconds <= 0:
+            return
+        self._task = asyncio.create_task(self._loop(db))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+counter_reconciler = CounterReconciler()
+
+
+# For one-off repairs outside the API process
+# Run with: python -m app.services.counter_reconciler
+if __name__ == "__main__":
+    from app.database import close_db, get_database
+
+    async def main():
+        result = await reconcile_counters(get_database())
+        print(f"checked {result['checked']} customers, fixed {result['fixed']}")
+
+    try:
+        asyncio.run(main())
+    finally:
+        close_db()
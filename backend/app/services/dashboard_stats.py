@@ -0,0 +1,199 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.database import get_database
+
+# Action item statuses that no longer count towards overdue work
+CLOSED_ACTION_ITEM_STATUSES = ["closed", "completed", "done", "cancelled"]
+
+# Number of rows kept for the at-risk table and the activity feed
+AT_RISK_LIMIT = 20
+RECENT_ACTIVITY_LIMIT = 10
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _first_count(rows: List[dict]) -> int:
+    return rows[0]["n"] if rows else 0
+
+
+async def _customer_stats(db) -> Dict[str, Any]:
+    return {"total_customers": await db.customers.estimated_document_count()}
+
+
+async def _engagement_stats(db) -> Dict[str, Any]:
+    pipeline = [{"$facet": {
+        "active": [{"$match": {"status": "active"}}, {"$count": "n"}],
+        "ryg": [{"$group": {"_id": {"$ifNull": ["$ryg_status", "green"]}, "n": {"$sum": 1}}}],
+        "at_risk": [
+            # ryg_status is stored lowercase (see normalise_ryg_status), so
+            # this is a single equality on the (ryg_status, updatedAt) index
+            {"$match": {"ryg_status": "red"}},
+            {"$sort": {"updatedAt": -1}},
+            {"$limit": AT_RISK_LIMIT},
+            {"$project": {"name": 1, "risk_factors": "$aiInsights.risk_factors"}},
+        ],
+        "recent": [
+            {"$sort": {"updatedAt": -1}},
+            {"$limit": RECENT_ACTIVITY_LIMIT},
+            {"$project": {"name": 1, "updatedAt": 1}},
+        ],
+    }}]
+    result = (await db.engagements.aggregate(pipeline).to_list(1))[0]
+    distribution = {"red": 0, "yellow": 0, "green": 0}
+    for row in result["ryg"]:
+        if row["_id"] in distribution:
+            distribution[row["_id"]] = row["n"]
+    return {
+        "active_engagements": _first_count(result["active"]),
+        "status_distribution": distribution,
+        "at_risk": [
+            {"engagement_id": str(e["_id"]), "name": e.get("name"), "risk_factors": e.get("risk_factors") or []}
+            for e in result["at_risk"]
+        ],
+        "recent": [
+            {"type": "status_change", "desc": f"Engagement {e.get('name')} updated", "timestamp": _iso(e.get("updatedAt"))}
+            for e in result["recent"]
+        ],
+    }
+
+
+async def _action_item_stats(db) -> Dict[str, Any]:
+    pipeline = [{"$facet": {
+        "overdue": [
+            {"$match": {"dueDate": {"$lt": datetime.utcnow()}, "status": {"$nin": CLOSED_ACTION_ITEM_STATUSES}}},
+            {"$count": "n"},
+        ],
+        "recent": [
+            {"$sort": {"createdAt": -1}},
+            {"$limit": RECENT_ACTIVITY_LIMIT},
+            {"$project": {"description": 1, "createdAt": 1}},
+        ],
+    }}]
+    result = (await db.action_items.aggregate(pipeline).to_list(1))[0]
+    return {
+        "overdue_action_items": _first_count(result["overdue"]),
+        "recent": [
+            {"type": "action_item", "desc": f"Action item created: {a.get('description')}", "timestamp": _iso(a.get("createdAt"))}
+            for a in result["recent"]
+        ],
+    }
+
+
+async def _document_stats(db) -> Dict[str, Any]:
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    pipeline = [{"$facet": {
+        "processed": [{"$match": {"processedAt": {"$gte": month_start}}}, {"$count": "n"}],
+        "recent": [
+            {"$sort": {"uploadedAt": -1}},
+            {"$limit": RECENT_ACTIVITY_LIMIT},
+            {"$project": {"originalName": 1, "uploadedAt": 1}},
+        ],
+    }}]
+    result = (await db.documents.aggregate(pipeline).to_list(1))[0]
+    return {
+        "documents_processed_this_month": _first_count(result["processed"]),
+        "recent": [
+            {"type": "upload", "desc": f"Document uploaded: {d.get('originalName')}", "timestamp": _iso(d.get("uploadedAt"))}
+            for d in result["recent"]
+        ],
+    }
+
+
+class DashboardStats:
+    """
+    In-process cache of the dashboard aggregates.
+    Each source collection has its own cached section. Writes mark a section
+    dirty and schedule a background refresh, so reads are served from memory
+    and only the changed collection is re-aggregated.
+    """
+
+    SOURCES = {
+        "customers": _customer_stats,
+        "engagements": _engagement_stats,
+        "action_items": _action_item_stats,
+        "documents": _document_stats,
+    }
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.DASHBOARD_CACHE_TTL_SECONDS
+        self._sections: Dict[str, Dict[str, Any]] = {}
+        self._computed_at: Dict[str, float] = {}
+        self._dirty: set = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def mark_dirty(self, source: str) -> None:
+        """Flag a source collection as changed and refresh it in the background."""
+        self._dirty.add(source)
+        self._schedule_refresh(source)
+
+    async def _refresh(self, source: str) -> Dict[str, Any]:
+        lock = self._locks.setdefault(source, asyncio.Lock())
+        async with lock:
+            # Another caller may have refreshed while we waited for the lock
+            if source in self._sections and not self._is_stale(source):
+                return self._sections[source]
+            self._dirty.discard(source)
+            section = await self.SOURCES[source](get_database())
+            self._sections[source] = section
+            self._computed_at[source] = time.monotonic()
+            return section
+
+    def _schedule_refresh(self, source: str) -> None:
+        task = self._pending.get(source)
+        if task is not None and not task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._pending[source] = loop.create_task(self._refresh(source))
+
+    def _is_stale(self, source: str) -> bool:
+        if source in self._dirty:
+            return True
+        return time.monotonic() - self._computed_at.get(source, 0) > self.ttl_seconds
+
+    async def section(self, source: str) -> Dict[str, Any]:
+        cached = self._sections.get(source)
+        if cached is None:
+            return await self._refresh(source)
+        if self._is_stale(source):
+            # Serve the previous value while a refresh runs in the background
+            self._schedule_refresh(source)
+        return cached
+
+    async def kpis(self) -> Dict[str, int]:
+        customers, engagements, action_items, documents = await asyncio.gather(
+            *(self.section(s) for s in ("customers", "engagements", "action_items", "documents"))
+        )
+        return {
+            "total_customers": customers["total_customers"],
+            "active_engagements": engagements["active_engagements"],
+            "overdue_action_items": action_items["overdue_action_items"],
+            "documents_processed_this_month": documents["documents_processed_this_month"],
+        }
+
+    async def status_distribution(self) -> Dict[str, int]:
+        return (await self.section("engagements"))["status_distribution"]
+
+    async def at_risk_engagements(self) -> List[Dict]:
+        return (await self.section("engagements"))["at_risk"]
+
+    async def recent_activity(self) -> List[Dict]:
+        engagements, action_items, documents = await asyncio.gather(
+            *(self.section(s) for s in ("engagements", "action_items", "documents"))
+        )
+        activity = engagements["recent"] + action_items["recent"] + documents["recent"]
+        activity.sort(key=lambda a: a["timestamp"] or "", reverse=True)
+        return activity[:RECENT_ACTIVITY_LIMIT]
+
+
+# Shared cache used by the dashboard router and invalidated by the write routes
+dashboard_stats = DashboardStats()
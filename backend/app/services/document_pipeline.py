@@ -0,0 +1,116 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.services.dashboard_stats import dashboard_stats
+from app.services.document_processor import DocumentProcessor
+from app.services.extraction_cache import extraction_cache
+from app.services.job_queue import PermanentJobError, ProgressCallback, job_queue
+from app.services.llm_gateway import LLMError
+from app.services.ryg_engine import average_sentiment, ryg_engine
+
+# Job kind for document extraction + AI analysis
+PROCESS_DOCUMENT_JOB = "process_document"
+
+processor = DocumentProcessor()
+
+
+async def _processed_twin(db, doc: dict) -> Optional[dict]:
+    """Find an already processed document with the same content hash."""
+    if not doc.get("sha256"):
+        return None
+    return await db.documents.find_one(
+        {"sha256": doc["sha256"], "_id": {"$ne": doc["_id"]}, "aiExtracted": {"$ne": None}},
+        {"aiExtracted": 1},
+    )
+
+
+async def process_document(db, payload: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    """
+    Extract, analyse and score one document.
+    Parsing runs in separate extraction processes and model calls go through
+    the async LLM gateway, so neither stalls the event loop.
+    """
+    doc_id = ObjectId(payload["documentId"])
+    doc = await db.documents.find_one({"_id": doc_id})
+    if not doc:
+        raise PermanentJobError("Document not found")
+
+    # Step 1: Extract and analyze content, reusing the results of an
+    # identical blob that was already processed unless a refresh was asked for
+    refresh = bool(payload.get("refresh"))
+    twin = None if refresh else await _processed_twin(db, doc)
+    if twin:
+        ai_data = twin["aiExtracted"]
+        sentiment = {"sentiment": ai_data.get("sentiment"), "score": (ai_data.get("key_metrics") or {}).get("sentiment_score", 0)}
+        action_items = ai_data.get("action_items") or []
+    else:
+        await progress("extracting", 10)
+        # Chunks are read up to EXTRACTION_MAX_CHARS, so a huge file never
+        # materialises in full in either process; unchanged content is
+        # served from the extraction cache instead of being parsed again.
+        # ExtractionAborted (timeout, crashed worker) is left to the job
+        # queue to retry; a file that cannot be parsed fails for good
+        extraction = await extraction_cache.extract(db, doc, settings.EXTRACTION_MAX_CHARS)
+        if not extraction.get("valid"):
+            raise PermanentJobError(extraction.get("error", "Could not extract text"))
+        text = "\n".join(extraction["chunks"])
+        if not text.strip():
+            raise PermanentJobError("No text could be extracted from the document")
+        await progress("analyzing", 30)
+        analysis = await processor.analyze_chunks(extraction["chunks"], refresh=refresh)
+        if not analysis["valid"]:
+            # Model API failures are transient; let the job queue retry
+            raise LLMError(analysis["error"])
+        sentiment = {"sentiment": analysis.get("sentiment"), "score": analysis.get("score", 0)}
+        action_items = analysis.get("action_items", [])
+
+        # Step 2: Save AI results in document
+        ai_data = {
+            "text_content": text,
+            "text_truncated": extraction["truncated"],
+            "sentiment": sentiment.get("sentiment"),
+            "action_items": action_items,
+            "key_topics": analysis.get("key_topics", []),
+            "risk_factors": analysis.get("risk_factors", []),
+            "key_metrics": {"sentiment_score": sentiment.get("score", 0)}
+        }
+    previous = await db.documents.find_one_and_update(
+        {"_id": doc_id},
+        {"$set": {"aiExtracted": ai_data, "processedAt": datetime.utcnow()}},
+        projection={"aiExtracted": 1},
+    )
+
+    # Step 3: Fold this document into the engagement's rolling RYG
+    # aggregates; the status is re-derived without further model calls
+    await progress("scoring_engagement", 80)
+    scored = await ryg_engine.document_changed(
+        db, doc['engagementId'], (previous or {}).get("aiExtracted"), ai_data
+    )
+    ryg_status = None
+    if scored:
+        ryg_status = scored["ryg_status"]
+        ai_insights = {
+            "sentiment_score": average_sentiment(scored["signals"]),
+            "key_topics": ai_data.get("key_topics", []),
+            "risk_factors": ai_data.get("risk_factors", [])
+        }
+        await db.engagements.update_one(
+            {"_id": ObjectId(str(doc['engagementId']))},
+            {"$set": {"aiInsights": ai_insights, "lastAiAnalysis": datetime.utcnow()}}
+        )
+
+    dashboard_stats.mark_dirty("documents")
+    dashboard_stats.mark_dirty("engagements")
+
+    return {
+        "msg": "Document processed",
+        "sentiment": sentiment,
+        "action_items": action_items,
+        "ryg_status": ryg_status
+    }
+
+
+job_queue.register(PROCESS_DOCUMENT_JOB, process_document)
@@ -1,36 +1,312 @@
 import os
-import openai
+import asyncio
 from app.config import settings
-from typing import List, Dict, Any
+from app.metrics import metrics
+from app.services.llm_cache import llm_cache
+from app.services.llm_gateway import LLMError, llm_gateway
+from app.utils.ai_utils import pack_chunks
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Set
+from concurrent.futures import ThreadPoolExecutor
 from PyPDF2 import PdfReader
 from docx import Document
 from openpyxl import load_workbook
 from pathlib import Path
-from datetimort datetime
+from datetime import datetime
+import math
 import mimetypes
+import multiprocessing
+import re
+import threading
+import zipfile
 
 # File size limit in bytes (50MB)
 MAX_FILE_SIZE = 50 * 1024 * 1024
 
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
 # Supported file types
 SUPPORTED_FILE_TYPES = {
-    "application/pdf": ".pdf",
-    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
-    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": ".xlsx"
+    PDF_MIME: ".pdf",
+    DOCX_MIME: ".docx",
+    XLSX_MIME: ".xlsx"
 }
 
+# Bump whenever extraction output changes, so cached text is re-extracted
+EXTRACTOR_VERSION = 2
+
+# Chunking used by iter_text_chunks: characters per chunk at most, and how
+# many DOCX paragraphs / spreadsheet rows are grouped into one chunk
+TEXT_CHUNK_SIZE = 16 * 1024
+DOCX_PARAGRAPHS_PER_CHUNK = 50
+XLSX_ROWS_PER_CHUNK = 500
+
+# Label used in "Invalid <type> file" errors
+FILE_TYPE_LABELS = {PDF_MIME: "PDF", DOCX_MIME: "DOCX", XLSX_MIME: "XLSX"}
+
 # MIME type to extension mapping
 MIME_TO_EXTENSION = {
     mime: ext for ext, mime in mimetypes.types_map.items()
 }
 
-# Prefer environment variable, fallback to settings from .env
-openai.api_key = os.getenv("OPENAI_API_KEY") or settings.OPENAI_API_KEY
+# Merged scores within +/- this band are reported as neutral
+SENTIMENT_NEUTRAL_BAND = 0.2
+
+ANALYSIS_SYSTEM_PROMPT = "You analyse business engagement documents. Reply with a single JSON object."
+
+# Combined prompt: one call returns everything the pipeline stores.
+# Bump the version whenever the prompt changes so cached answers are dropped.
+ANALYSIS_PROMPT_VERSION = "analysis-v1"
+ANALYSIS_PROMPT = """Analyze the following text and return a JSON object with these keys:
+- "sentiment": overall sentiment, one of "positive", "neutral", "negative"
+- "score": sentiment score between -1 (very negative) and 1 (very positive)
+- "key_topics": list of key topics mentioned
+- "risk_factors": list of risk factors identified
+- "business_impact": short business impact assessment
+- "action_items": list of objects with "description", "priority" (high, medium, low),
+  "responsible_party" (or null), "due_date" (YYYY-MM-DD or null),
+  "status" (pending, in_progress, completed), "dependencies" (list) and
+  "risk_level" (high, medium, low)
+
+Text:
+{text}"""
+
+# Extraction processes currently running, so shutdown can stop them
+_live_processes: Set[multiprocessing.Process] = set()
+_live_lock = threading.Lock()
+_stopping = threading.Event()
+
+# Threads that each supervise one extraction process; their count bounds
+# how many files are parsed at once. Created on first use.
+_extraction_pool: Optional[ThreadPoolExecutor] = None
+
+
+class ExtractionAborted(RuntimeError):
+    """
+    Extraction did not finish: it timed out or its process died. Unlike an
+    invalid file this is not a property of the content, so it is retryable.
+    """
+
+
+def _init_extraction_worker(memory_limit_mb: int) -> None:
+    """Cap the address space of each extraction process (POSIX only)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    if memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _extract_in_worker(file_path: str, mime_type: Optional[str] = None) -> Dict[str, Any]:
+    return DocumentProcessor().extract_text(file_path, mime_type)
+
+
+def _extract_chunks_in_worker(file_path: str, mime_type: Optional[str] = None, max_chars: Optional[int] = None) -> Dict[str, Any]:
+    return DocumentProcessor().extract_chunks(file_path, mime_type, max_chars)
+
+
+def _extraction_process_main(conn, memory_limit_mb: int, fn, args) -> None:
+    _init_extraction_worker(memory_limit_mb)
+    conn.send(fn(*args))
+    conn.close()
+
+
+def _run_in_process(fn, args, timeout: float) -> Dict[str, Any]:
+    """
+    Run fn(*args) in a process of its own and wait up to `timeout` seconds
+    for its result. Blocking; called from the extraction threads. A parse
+    that overruns is killed without touching any other extraction.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_extraction_process_main,
+        args=(sender, settings.EXTRACTION_MEMORY_LIMIT_MB, fn, args),
+        daemon=True,
+    )
+    with _live_lock:
+        if _stopping.is_set():
+            # Queued when shutdown_extraction_pool ran
+            raise ExtractionAborted("Extraction pool shut down before the file was processed")
+        process.start()
+        _live_processes.add(process)
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            metrics.incr("extraction_timeouts")
+            process.kill()
+            raise ExtractionAborted(f"Extraction timed out after {timeout} seconds")
+        try:
+            return receiver.recv()
+        except EOFError:
+            # The process died, e.g. killed by the OS for exceeding its memory cap
+            metrics.incr("extraction_worker_crashes")
+            raise ExtractionAborted("Extraction worker crashed while processing file")
+    finally:
+        receiver.close()
+        process.join()
+        with _live_lock:
+            _live_processes.discard(process)
+
+
+def get_extraction_pool() -> ThreadPoolExecutor:
+    global _extraction_pool
+    if _extraction_pool is None:
+        _stopping.clear()
+        _extraction_pool = ThreadPoolExecutor(
+            max_workers=settings.EXTRACTION_WORKERS or os.cpu_count() or 1,
+            thread_name_prefix="extraction",
+        )
+    return _extraction_pool
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop accepting extractions and kill the processes still parsing."""
+    global _extraction_pool
+    pool, _extraction_pool = _extraction_pool, None
+    if pool is None:
+        return
+    # Queued extractions still run, but fail fast instead of being
+    # cancelled, so their callers see ExtractionAborted
+    with _live_lock:
+        _stopping.set()
+        for process in _live_processes:
+            process.kill()
+    pool.shutdown(wait=False)
+
+class ExtractionError(ValueError):
+    """The file failed validation or could not be parsed."""
+
+
+def _batched_lines(lines: Iterable[str], size: int) -> Iterator[str]:
+    """Join consecutive lines into blocks of `size`, skipping blank blocks."""
+    batch: List[str] = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            block = "\n".join(batch).strip()
+            if block:
+                yield block
+            batch = []
+    block = "\n".join(batch).strip()
+    if block:
+        yield block
+
+
+def _bounded_chunks(text: str) -> Iterator[str]:
+    """Split text into pieces of at most TEXT_CHUNK_SIZE, preferring line breaks."""
+    while len(text) > TEXT_CHUNK_SIZE:
+        cut = text.rfind("\n", 0, TEXT_CHUNK_SIZE)
+        if cut <= 0:
+            cut = TEXT_CHUNK_SIZE
+        yield text[:cut]
+        text = text[cut:].lstrip("\n")
+    if text:
+        yield text
+
+
+_PRIORITY_RANK = {"high": 3, "medium": 2, "low": 1}
+
+
+def coerce_score(value: Any) -> Optional[float]:
+    """A sentiment score as a float, or None when the model returned something else."""
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return score if math.isfinite(score) else None
+
+
+def _sentiment_label(score: float) -> str:
+    if score <= -SENTIMENT_NEUTRAL_BAND:
+        return "negative"
+    if score >= SENTIMENT_NEUTRAL_BAND:
+        return "positive"
+    return "neutral"
+
+
+def _dedupe_key(value: Any) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", str(value).lower()))
+
+
+def _merge_unique(lists: Iterable[List[Any]]) -> List[Any]:
+    """Concatenate lists, dropping entries that only differ in case or punctuation."""
+    seen = set()
+    merged = []
+    for items in lists:
+        for item in items or []:
+            key = _dedupe_key(item)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
+
+
+def _merge_action_items(lists: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Dedupe action items by description, keeping the highest priority seen."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for items in lists:
+        for item in items or []:
+            key = _dedupe_key(item.get("description", ""))
+            if not key:
+                continue
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(item)
+            elif _PRIORITY_RANK.get(str(item.get("priority")).lower(), 0) > _PRIORITY_RANK.get(str(existing.get("priority")).lower(), 0):
+                existing["priority"] = item.get("priority")
+    return list(merged.values())
+
+
+def _reduce_analyses(partials: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """Merge per-window analyses: length-weighted score, deduped topics, risks and action items."""
+    total = sum(weights) or 1
+    score = sum((coerce_score(p.get("score")) or 0.0) * w for p, w in zip(partials, weights)) / total
+    impacts = _merge_unique([[p.get("business_impact")] for p in partials if p.get("business_impact")])
+    return {
+        "valid": True,
+        "sentiment": _sentiment_label(score),
+        "score": round(score, 3),
+        "key_topics": _merge_unique(p.get("key_topics") for p in partials),
+        "risk_factors": _merge_unique(p.get("risk_factors") for p in partials),
+        "business_impact": "\n".join(impacts),
+        "action_items": _merge_action_items(p.get("action_items") for p in partials),
+        "chunks_analyzed": len(partials),
+        "processed_at": datetime.utcnow().isoformat()
+    }
+
+
+def sniff_mime_type(file_path: str) -> Optional[str]:
+    """
+    Identify a supported document from its leading bytes.
+    OOXML files are ZIP archives, told apart by their main part name,
+    which only needs the archive's central directory.
+    """
+    with open(file_path, "rb") as f:
+        header = f.read(8)
+    if header.startswith(b"%PDF-"):
+        return PDF_MIME
+    if header.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return None
+        if "word/document.xml" in names:
+            return DOCX_MIME
+        if "xl/workbook.xml" in names:
+            return XLSX_MIME
+    return None
+
 
 class DocumentProcessor:
-    def validate_file(self, file_path: str) -> Dict[str, Any]:
+    def validate_file(self, file_path: str, mime_type: Optional[str] = None) -> Dict[str, Any]:
         """
         Validate file size and type before processing.
+        `mime_type` overrides the guess from the file name, which content
+        addressed blobs do not carry.
         Returns a dictionary with validation results.
         """
         try:
@@ -44,9 +320,16 @@ class DocumentProcessor:
                     "error": f"File size exceeds maximum limit of {MAX_FILE_SIZE / (1024*1024)} MB"
                 }
 
-            # Get MIME type using built-in mimetypes
-            mime_type, _ = mimetypes.guess_type(file_path)
-            
+            # Get MIME type using built-in mimetypes. Content sniffing reads
+            # only the header (and the ZIP directory for OOXML) instead of
+            # fully parsing the file; that happens once, during extraction.
+            if not mime_type:
+                mime_type, _ = mimetypes.guess_type(file_path)
+            sniffed = sniff_mime_type(file_path)
+            if sniffed and mime_type not in SUPPORTED_FILE_TYPES:
+                # Generic or missing client types, e.g. application/octet-stream
+                mime_type = sniffed
+
             if not mime_type:
                 return {
                     "valid": False,
@@ -60,33 +343,13 @@ class DocumentProcessor:
                     "error": f"Unsupported file type: {mime_type}"
                 }
 
-            # Additional validation for specific file types
-            if mime_type == "application/pdf":
-                try:
-                    PdfReader(file_path)
-                except Exception as e:
-                    return {
-                        "valid": False,
-                        "error": f"Invalid PDF file: {str(e)}"
-                    }
-            elif mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                try:
-                    Document(file_path)
-                except Exception as e:
-                    return {
-                        "valid": False,
-                        "error": f"Invalid DOCX file: {str(e)}"
-                    }
-            elif mime_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
-                try:
-                    load_workbook(file_path)
-                except Exception as e:
-                    return {
-                        "valid": False,
-                        "error": f"Invalid XLSX file: {str(e)}"
-                    }
-
-            retur
+            if sniffed != mime_type:
+                return {
+                    "valid": False,
+                    "error": f"Invalid {FILE_TYPE_LABELS[mime_type]} file: content does not match file type"
+                }
+
+            return {
                 "valid": True,
                 "mime_type": mime_type,
                 "size": file_size,
@@ -100,51 +363,146 @@ class DocumentProcessor:
                 "error": f"Error validating file: {str(e)}"
             }
 
-    def extract_text(self, file_path: str) -> Dict[str, Any]:
+    def iter_text_chunks(self, file_path: str, mime_type: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield the document text in chunks of at most TEXT_CHUNK_SIZE characters:
+        one PDF page, a block of DOCX paragraphs or a batch of sheet rows at a
+        time. Spreadsheets are read in openpyxl read-only mode, so memory stays
+        flat regardless of file size.
+        Raises ExtractionError if the file is invalid or cannot be parsed.
+        """
+        validation = self.validate_file(file_path, mime_type)
+        if not validation["valid"]:
+            raise ExtractionError(validation["error"])
+        yield from self._iter_validated(file_path, validation["mime_type"])
+
+    def _iter_validated(self, file_path: str, mime_type: str) -> Iterator[str]:
+        # Parsers get a stream rather than the path, so blobs without an
+        # extension are accepted
+        with open(file_path, "rb") as stream:
+            try:
+                handle = self._open(stream, mime_type)
+            except Exception as e:
+                raise ExtractionError(f"Invalid {FILE_TYPE_LABELS[mime_type]} file: {str(e)}")
+            try:
+                for block in self._iter_blocks(handle, mime_type):
+                    yield from _bounded_chunks(block)
+            finally:
+                if mime_type == XLSX_MIME:
+                    handle.close()
+
+    def extract_chunks(self, file_path: str, mime_type: Optional[str] = None, max_chars: Optional[int] = None) -> Dict[str, Any]:
         """
         Extract text from document after validation.
-        Returns a dictionary containing extracted text and validation info.
+        Returns a dictionary containing the text chunks and validation info.
+        With max_chars, reading stops once that much text was collected and
+        "truncated" is set, so memory is bounded however large the file is.
         """
-        validation = self.validate_file(file_path)
+        validation = self.validate_file(file_path, mime_type)
         if not validation["valid"]:
             return validation
 
+        chunks: List[str] = []
+        total = 0
+        truncated = False
         try:
-            if validation["mime_type"] == "application/pdf":
-                reader = PdfReader(file_path)
-                text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-            elif validation["mime_type"] == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                doc = Document(file_path)
-                text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
-            elif validation["mime_type"] == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
-                wb = load_workbook(file_path)
-                text = ""
-                for sheet in wb:
-                    for row in sheet.iter_rows(values_only=True):
-                        row_text = " ".join([str(cell) for cell in row if cell])
-                        text += row_text + "\n"
-                text = text.strip()
-            else:
-                raise ValueError(f"Unexpected MIME type: {validation['mime_type']}")
-
+            for chunk in self._iter_validated(file_path, validation["mime_type"]):
+                if max_chars is not None and total + len(chunk) > max_chars:
+                    if max_chars > total:
+                        chunks.append(chunk[:max_chars - total])
+                    truncated = True
+                    break
+                chunks.append(chunk)
+                total += len(chunk)
+        except ExtractionError as e:
             return {
-                "valid": True,
-                "text": text,
-                "mime_type": validation["mime_type"],
-                "size": validation["size"],
-                "processed_at": datetime.utcnow().isoformat()
+                "valid": False,
+                "error": str(e)
             }
-
         except Exception as e:
             return {
                 "valid": False,
                 "error": f"Error processing file: {str(e)}"
             }
 
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+        return {
+            "valid": True,
+            "chunks": chunks,
+            "truncated": truncated,
+            "mime_type": validation["mime_type"],
+            "size": validation["size"],
+            "processed_at": datetime.utcnow().isoformat()
+        }
+
+    def extract_text(self, file_path: str, mime_type: Optional[str] = None) -> Dict[str, Any]:
         """
-        Analyze text sentiment using OpenAI API.
-        Returns a structured sentiment analysis with score and categories.
+        Extract text from document after validation.
+        Returns a dictionary containing extracted text and validation info.
+        """
+        result = self.extract_chunks(file_path, mime_type)
+        if result["valid"]:
+            result["text"] = "\n".join(result.pop("chunks"))
+        return result
+
+    def _open(self, stream, mime_type: str):
+        """Parse the file once; the handle is reused for all text extraction."""
+        if mime_type == PDF_MIME:
+            return PdfReader(stream)
+        if mime_type == DOCX_MIME:
+            return Document(stream)
+        if mime_type == XLSX_MIME:
+            return load_workbook(stream, read_only=True)
+        raise ValueError(f"Unexpected MIME type: {mime_type}")
+
+    def _iter_blocks(self, handle, mime_type: str) -> Iterator[str]:
+        if mime_type == PDF_MIME:
+            for page in handle.pages:
+                # extract_text() once per page
+                text = page.extract_text()
+                if text:
+                    yield text
+        elif mime_type == DOCX_MIME:
+            paragraphs = (p.text for p in handle.paragraphs if p.text.strip())
+            yield from _batched_lines(paragraphs, DOCX_PARAGRAPHS_PER_CHUNK)
+        elif mime_type == XLSX_MIME:
+            for sheet in handle:
+                rows = (
+                    " ".join([str(cell) for cell in row if cell])
+                    for row in sheet.iter_rows(values_only=True)
+                )
+                yield from _batched_lines(rows, XLSX_ROWS_PER_CHUNK)
+        else:
+            raise ValueError(f"Unexpected MIME type: {mime_type}")
+
+    async def extract_text_async(self, file_path: str, mime_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run extract_text in a separate process so parsing neither holds the
+        GIL nor blocks the event loop. At most EXTRACTION_WORKERS files are
+        parsed at once, each with EXTRACTION_TIMEOUT_SECONDS of wall-clock
+        time from when its parse starts. Raises ExtractionAborted on timeout
+        or when the process dies; only that file's process is killed.
+        """
+        return await self._run_in_pool(_extract_in_worker, file_path, mime_type)
+
+    async def extract_chunks_async(self, file_path: str, mime_type: Optional[str] = None, max_chars: Optional[int] = None) -> Dict[str, Any]:
+        """Like extract_text_async, but returns the text chunks, read up to max_chars."""
+        return await self._run_in_pool(_extract_chunks_in_worker, file_path, mime_type, max_chars)
+
+    async def _run_in_pool(self, fn, *args) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            get_extraction_pool(), _run_in_process, fn, args, settings.EXTRACTION_TIMEOUT_SECONDS
+        )
+        metrics.incr("documents_extracted")
+        return result
+
+    async def analyze(self, text: str, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Analyse text with a single JSON-mode model call.
+        Returns sentiment, score, key topics, risk factors, business impact
+        and action items together, so callers never pay for the same text twice.
+        Responses are cached per model, prompt version and text; refresh=True
+        skips the cached answer and stores a fresh one.
         """
         if not text.strip():
             return {
@@ -152,107 +510,81 @@ class DocumentProcessor:
                 "error": "No text to analyze"
             }
 
-        try:
-            prompt = f"""
-            Analyze the following text and provide:
-            1. Overall sentiment (Positive, Neutral, Negative)
-            2. Sentiment score between -1 (very negative) and 1 (very positive)
-            3. Key topics mentioned
-            4. Risk factors identified
-            5. Business impact assessment
-
-            Text:
-            {text}
-            """
-
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7
-            )
-
-            # Parse the response into a structured format
-            result = response.choices[0].message.content.strip()
-            
-            # The model will return JSON-like text, parse it
+        cache_key = llm_cache.key(llm_gateway.model, ANALYSIS_PROMPT_VERSION, text)
+        response = None if refresh else await llm_cache.get(cache_key)
+        if response is None:
             try:
-                import json
-                data = json.loads(result)
-                return {
-                    "valid": True,
-                    "sentiment": data.get("sentiment", "neutral"),
-                    "score": data.get("score", 0.0),
-                    "key_topics": data.get("key_topics", []),
-                    "risk_factors": data.get("risk_factors", []),
-                    "business_impact": data.get("business_impact", ""),
-                    "processed_at": datetime.utcnow().isoformat()
-                }
-            except json.JSONDecodeError:
+                response = await llm_gateway.chat_json([
+                    {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                    {"role": "user", "content": ANALYSIS_PROMPT.format(text=text)},
+                ])
+            except LLMError as e:
                 return {
                     "valid": False,
-                    "error": "Failed to parse AI response"
+                    "error": f"Error analyzing text: {str(e)}"
                 }
+            await llm_cache.put(cache_key, response)
 
-        except Exception as e:
-            return {
-                "valid": False,
-                "error": f"Error analyzing sentiment: {str(e)}"
-            }
+        data = response["content"]
+        action_items = data.get("action_items")
+        if not isinstance(action_items, list):
+            action_items = []
+        return {
+            "valid": True,
+            "sentiment": data.get("sentiment", "neutral"),
+            "score": coerce_score(data.get("score")) or 0.0,
+            "key_topics": data.get("key_topics", []),
+            "risk_factors": data.get("risk_factors", []),
+            "business_impact": data.get("business_impact", ""),
+            "action_items": [item for item in action_items if isinstance(item, dict)],
+            "processed_at": datetime.utcnow().isoformat()
+        }
 
-    def extract_action_items(self, text: str) -> Dict[str, Any]:
+    async def analyze_chunks(self, chunks: List[str], refresh: bool = False) -> Dict[str, Any]:
         """
-        Extract actionable items from text using OpenAI API.
-        Returns a structured list of action items with metadata.
+        Map-reduce analysis for text that may exceed the model context.
+        Chunks are packed into windows of LLM_CHUNK_TOKENS on their page and
+        paragraph boundaries, each window is analysed concurrently (bounded by
+        the LLM gateway), and the partial results are merged, so latency
+        follows the largest window rather than the whole document.
         """
-        if not text.strip():
+        windows = pack_chunks(chunks, settings.LLM_CHUNK_TOKENS)
+        if not windows:
             return {
                 "valid": False,
                 "error": "No text to analyze"
             }
+        if len(windows) == 1:
+            return await self.analyze(windows[0], refresh=refresh)
 
-        try:
-            prompt = f"""
-            Extract all actionable items from this text. For each item, provide:
-            - description: A clear description of the action
-            - priority: high, medium, or low
-            - responsible_party: Who should do this (if mentioned)
-            - due_date: When it should be completed (if mentioned)
-            - status: pending, in_progress, completed
-            - dependencies: Other tasks this depends on (if any)
-            - risk_level: high, medium, low
-
-            Format the response as JSON array of objects.
-
-            Text:
-            {text}
-            """
-
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7
-            )
-
-            # Parse the response into a structured format
-            result = response.choices[0].message.content.strip()
-            
-            try:
-                import json
-                data = json.loads(result)
-                return {
-                    "valid": True,
-                    "action_items": data,
-                    "total_items": len(data),
-                    "processed_at": datetime.utcnow().isoformat()
-                }
-            except json.JSONDecodeError:
-                return {
-                    "valid": False,
-                    "error": "Failed to parse AI response"
-                }
+        metrics.incr("analysis_map_windows", len(windows))
+        partials = await asyncio.gather(*(self.analyze(window, refresh=refresh) for window in windows))
+        failed = next((partial for partial in partials if not partial["valid"]), None)
+        if failed:
+            return failed
+        return _reduce_analyses(partials, [len(window) for window in windows])
 
-        except Exception as e:
-            return {
-                "valid": False,
-                "error": f"Error extracting action items: {str(e)}"
-            }
+    async def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+        """
+        Analyze text sentiment.
+        Returns a structured sentiment analysis with score and categories.
+        """
+        result = await self.analyze(text)
+        if result["valid"]:
+            result.pop("action_items")
+        return result
+
+    async def extract_action_items(self, text: str) -> Dict[str, Any]:
+        """
+        Extract actionable items from text.
+        Returns a structured list of action items with metadata.
+        """
+        result = await self.analyze(text)
+        if not result["valid"]:
+            return result
+        return {
+            "valid": True,
+            "action_items": result["action_items"],
+            "total_items": len(result["action_items"]),
+            "processed_at": result["processed_at"]
+        }
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.metrics import metrics
+from app.services.document_processor import EXTRACTOR_VERSION, DocumentProcessor
+
+
+class ExtractionCache:
+    """
+    Two-tier cache of extracted document text.
+    Entries are keyed by the blob's SHA-256, EXTRACTOR_VERSION and the
+    character cap, so identical content is parsed once and bumping the
+    extractor version invalidates everything it produced. The first tier is an
+    in-process LRU bounded by total characters; the second is the
+    `extraction_cache` collection, shared between processes and expired by a
+    TTL index on createdAt.
+    Only successful extractions are stored: timeouts and worker crashes are
+    not a property of the content and are worth retrying.
+    """
+
+    def __init__(self, max_chars: int = settings.EXTRACTION_CACHE_MEMORY_CHARS):
+        self.max_chars = max_chars
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._memory_chars = 0
+        self._processor = DocumentProcessor()
+
+    @staticmethod
+    def key(sha256: str, max_chars: Optional[int]) -> str:
+        return f"{sha256}:{EXTRACTOR_VERSION}:{max_chars or 0}"
+
+    @staticmethod
+    def _size(result: Dict[str, Any]) -> int:
+        return sum(len(chunk) for chunk in result.get("chunks", []))
+
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        if key in self._memory:
+            self._memory_chars -= self._size(self._memory.pop(key))
+        self._memory[key] = result
+        self._memory_chars += self._size(result)
+        while self._memory_chars > self.max_chars and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_chars -= self._size(evicted)
+
+    async def get(self, db, key: str) -> Optional[Dict[str, Any]]:
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            metrics.incr("extraction_cache_hits_memory")
+            return result
+        entry = await db.extraction_cache.find_one({"_id": key})
+        if entry is not None:
+            result = entry["result"]
+            self._remember(key, result)
+            metrics.incr("extraction_cache_hits_db")
+            return result
+        metrics.incr("extraction_cache_misses")
+        return None
+
+    async def put(self, db, key: str, result: Dict[str, Any]) -> None:
+        self._remember(key, result)
+        await db.extraction_cache.replace_one(
+            {"_id": key},
+            {"_id": key, "result": result, "createdAt": datetime.utcnow()},
+            upsert=True,
+        )
+
+    async def extract(self, db, doc: dict, max_chars: Optional[int] = settings.EXTRACTION_MAX_CHARS) -> Dict[str, Any]:
+        """
+        Return the chunked extraction for a documents row, parsing the file in
+        an extraction process only on a cache miss. ExtractionAborted from a
+        timeout or crash propagates, and nothing is cached.
+        """
+        sha256 = doc.get("sha256")
+        if not sha256:
+            # Uploaded before content hashing; nothing stable to key on
+            metrics.incr("extraction_cache_uncacheable")
+            return await self._processor.extract_chunks_async(doc["filePath"], doc.get("mimeType"), max_chars)
+        key = self.key(sha256, max_chars)
+        result = await self.get(db, key)
+        if result is not None:
+            return result
+        result = await self._processor.extract_chunks_async(doc["filePath"], doc.get("mimeType"), max_chars)
+        if result.get("valid"):
+            await self.put(db, key, result)
+        return result
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._memory_chars = 0
+
+
+extraction_cache = ExtractionCache()
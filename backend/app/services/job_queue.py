@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import random
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle states stored in jobs.status
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL_STATES = (SUCCEEDED, FAILED)
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+ProgressCallback = Callable[[str, int], Awaitable[None]]
+JobHandler = Callable[[Any, Dict[str, Any], ProgressCallback], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed."""
+
+
+class JobQueue:
+    """
+    Durable job queue backed by the `jobs` collection.
+    Workers are asyncio tasks in the API process that claim jobs with an
+    atomic find_one_and_update and hold them under a lease, so jobs left
+    running by a crashed process are picked up again once the lease expires.
+    Failed jobs are retried with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+        retry_base_seconds: float = settings.JOB_RETRY_BASE_SECONDS,
+        lease_seconds: int = settings.JOB_LEASE_SECONDS,
+        poll_interval: float = settings.JOB_POLL_INTERVAL_SECONDS,
+    ):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._db = None
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    async def enqueue(self, db, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> dict:
+        """
+        Queue a job and return its document.
+        With a dedupe_key, an unfinished job with the same key is returned
+        instead of queueing a second one. The unique unfinished_job_dedupe
+        index settles concurrent enqueues: the loser gets the winner's job.
+        """
+        if dedupe_key:
+            existing = await self._unfinished(db, kind, dedupe_key)
+            if existing:
+                return existing
+        now = datetime.utcnow()
+        job = {
+            "kind": kind,
+            "payload": payload,
+            "dedupeKey": dedupe_key,
+            "status": QUEUED,
+            "attempts": 0,
+            "maxAttempts": self.max_attempts,
+            "runAfter": now,
+            "lockedUntil": None,
+            "progress": {"step": "queued", "percent": 0},
+            "result": None,
+            "error": None,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        try:
+            result = await db.jobs.insert_one(job)
+        except DuplicateKeyError:
+            existing = await self._unfinished(db, kind, dedupe_key)
+            if existing is None:
+                # The other job finished in the meantime
+                return await self.enqueue(db, kind, payload, dedupe_key)
+            return existing
+        job["_id"] = result.inserted_id
+        metrics.incr("jobs_enqueued")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def _unfinished(self, db, kind: str, dedupe_key: str) -> Optional[dict]:
+        return await db.jobs.find_one({"kind": kind, "dedupeKey": dedupe_key, "status": {"$in": list(ACTIVE_STATES)}})
+
+    async def get(self, db, job_id: str) -> Optional[dict]:
+        return await db.jobs.find_one({"_id": ObjectId(job_id)})
+
+    async def _claim(self, db) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await db.jobs.find_one_and_update(
+            {
+                "kind": {"$in": list(self._handlers)},
+                "$or": [
+                    {"status": QUEUED, "runAfter": {"$lte": now}},
+                    # Lease expired: the worker that held it is gone
+                    {"status": RUNNING, "lockedUntil": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "lockedUntil": now + timedelta(seconds=self.lease_seconds),
+                    "startedAt": now,
+                    "updatedAt": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("runAfter", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _backoff(self, attempts: int) -> float:
+        delay = self.retry_base_seconds * (2 ** max(attempts - 1, 0))
+        return delay + random.uniform(0, delay / 2)
+
+    async def _run(self, db, job: dict) -> None:
+        job_id = job["_id"]
+
+        async def progress(step: str, percent: int) -> None:
+            await db.jobs.update_one(
+                {"_id": job_id},
+                {"$set": {
+                    "progress": {"step": step, "percent": percent},
+                    "lockedUntil": datetime.utcnow() + timedelta(seconds=self.lease_seconds),
+                    "updatedAt": datetime.utcnow(),
+                }},
+            )
+
+        handler = self._handlers[job["kind"]]
+        try:
+            result = await handler(db, job["payload"], progress)
+        except Exception as e:
+            retry = not isinstance(e, PermanentJobError) and job["attempts"] < job.get("maxAttempts", self.max_attempts)
+            update = {
+                "error": {"message": str(e), "type": type(e).__name__, "traceback": traceback.format_exc()},
+                "lockedUntil": None,
+                "updatedAt": datetime.utcnow(),
+            }
+            if retry:
+                update["status"] = QUEUED
+                update["runAfter"] = datetime.utcnow() + timedelta(seconds=self._backoff(job["attempts"]))
+                metrics.incr("jobs_retried")
+            else:
+                update["status"] = FAILED
+                update["finishedAt"] = datetime.utcnow()
+                metrics.incr("jobs_failed")
+            logger.exception("Job %s (%s) failed on attempt %s", job_id, job["kind"], job["attempts"])
+            await db.jobs.update_one({"_id": job_id}, {"$set": update})
+            return
+        now = datetime.utcnow()
+        await db.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "status": SUCCEEDED,
+                "result": result,
+                "error": None,
+                "progress": {"step": "done", "percent": 100},
+                "lockedUntil": None,
+                "finishedAt": now,
+                "updatedAt": now,
+            }},
+        )
+        metrics.incr("jobs_succeeded")
+        metrics.observe("job_run_seconds", (now - job["startedAt"]).total_seconds())
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await self._claim(self._db)
+            except Exception:
+                logger.exception("Failed to claim job")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(self._db, job)
+            except Exception:
+                # Leave the job to be reclaimed when its lease expires
+                logger.exception("Failed to record outcome of job %s", job["_id"])
+
+    def start(self, db) -> None:
+        if self._workers:
+            return
+        self._db = db
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Shared queue; handlers are registered by the services that own each job kind
+job_queue = JobQueue()
@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.database import get_database
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalise_prompt_text(text: str) -> str:
+    """Collapse whitespace so re-exported copies of the same text share a key."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class LLMCache:
+    """
+    Two-tier cache of model responses.
+    Keys are (model, prompt template version, hash of the normalised input
+    text), so a prompt change only needs a version bump to stop serving old
+    answers. The first tier is an in-process LRU; the second is the `llm_cache`
+    collection, expired by a TTL index on createdAt and trimmed to
+    LLM_CACHE_MAX_ENTRIES by evicting the least recently used rows.
+    Cache errors are logged and treated as misses; they never fail analysis.
+    """
+
+    def __init__(
+        self,
+        memory_entries: int = settings.LLM_CACHE_MEMORY_ENTRIES,
+        max_entries: int = settings.LLM_CACHE_MAX_ENTRIES,
+        enabled: bool = settings.LLM_CACHE_ENABLED,
+    ):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._puts_since_trim = 0
+
+    @staticmethod
+    def key(model: str, template_version: str, text: str) -> str:
+        digest = hashlib.sha256(normalise_prompt_text(text).encode("utf-8")).hexdigest()
+        return f"{model}:{template_version}:{digest}"
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, tier: str, entry: Dict[str, Any]) -> None:
+        metrics.incr(f"llm_cache_hits_{tier}")
+        usage = entry.get("usage") or {}
+        metrics.incr("llm_cache_tokens_saved", usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached {"content", "usage", "model"} for key, or None."""
+        if not self.enabled:
+            return None
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self._record_hit("memory", entry)
+            return entry
+        try:
+            row = await get_database().llm_cache.find_one_and_update(
+                {"_id": key},
+                {"$set": {"lastUsedAt": datetime.utcnow()}, "$inc": {"hits": 1}},
+                projection={"response": 1},
+            )
+        except Exception:
+            logger.exception("LLM cache lookup failed")
+            row = None
+        if row is None:
+            metrics.incr("llm_cache_misses")
+            return None
+        entry = row["response"]
+        self._remember(key, entry)
+        self._record_hit("db", entry)
+        return entry
+
+    async def put(self, key: str, response: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._remember(key, response)
+        now = datetime.utcnow()
+        try:
+            collection = get_database().llm_cache
+            await collection.replace_one(
+                {"_id": key},
+                {"_id": key, "response": response, "createdAt": now, "lastUsedAt": now, "hits": 0},
+                upsert=True,
+            )
+            # Check the size bound every few writes rather than on each one
+            self._puts_since_trim += 1
+            if self._puts_since_trim >= settings.LLM_CACHE_TRIM_EVERY:
+                self._puts_since_trim = 0
+                await self._trim(collection)
+        except Exception:
+            logger.exception("LLM cache write failed")
+
+    async def _trim(self, collection) -> None:
+        excess = await collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = [row["_id"] async for row in collection.find({}, {"_id": 1}).sort("lastUsedAt", 1).limit(excess)]
+        if stale:
+            result = await collection.delete_many({"_id": {"$in": stale}})
+            metrics.incr("llm_cache_evictions", result.deleted_count)
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from app.config import settings
+from app.metrics import metrics
+
+# Responses worth retrying: throttling, timeouts and server-side failures
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The model API failed or returned a response that could not be used."""
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LLMGateway:
+    """
+    Async client for OpenAI-compatible chat completions.
+    One aiohttp session (and connection pool) is shared by every caller.
+    Requests go through a token bucket for the account's rate limit and a
+    semaphore for concurrency, and are retried with exponential backoff and
+    full jitter, honouring Retry-After. Identical requests already in flight
+    are coalesced into one HTTP call. base_url can point at any compatible
+    server, which is how the tests run against a local fake.
+    """
+
+    def __init__(
+        self,
+        base_url: str = settings.OPENAI_BASE_URL,
+        api_key: str = settings.OPENAI_API_KEY,
+        model: str = settings.OPENAI_MODEL,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        requests_per_minute: int = settings.LLM_REQUESTS_PER_MINUTE,
+        max_retries: int = settings.LLM_MAX_RETRIES,
+        retry_base_seconds: float = settings.LLM_RETRY_BASE_SECONDS,
+        timeout_seconds: float = settings.LLM_TIMEOUT_SECONDS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.timeout_seconds = timeout_seconds
+        self._bucket = TokenBucket(requests_per_minute / 60.0, max(1, max_concurrency))
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def chat_json(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+    ) -> Dict[str, Any]:
+        """
+        Run a JSON-mode chat completion.
+        Returns {"content": <parsed JSON object>, "usage": {...}, "model": ...}.
+        Raises LLMError once retries are exhausted or the reply is not JSON.
+        """
+        body = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "response_format": {"type": "json_object"},
+        }
+        key = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+        while key in self._inflight:
+            pending = self._inflight[key]
+            metrics.incr("llm_requests_coalesced")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller making the request was cancelled, not this
+                # one; make the request instead (or join whoever did first)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._post_with_retry(body)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark as retrieved so an unshared failure is not logged twice
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, self.retry_base_seconds * (2 ** attempt))
+
+    async def _post_with_retry(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        url = f"{self.base_url}/chat/completions"
+        last_error = "no attempt made"
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                metrics.incr("llm_retries")
+            retry_after = None
+            await self._bucket.acquire()
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    async with self._get_session().post(url, json=body) as resp:
+                        if resp.status == 200:
+                            data = await resp.json(content_type=None)
+                            metrics.observe("llm_request_seconds", time.perf_counter() - started)
+                            return self._parse(data)
+                        detail = (await resp.text())[:500]
+                        last_error = f"HTTP {resp.status}: {detail}"
+                        if resp.status not in RETRYABLE_STATUSES:
+                            metrics.incr("llm_errors")
+                            raise LLMError(last_error)
+                        retry_after = resp.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    last_error = f"{type(e).__name__}: {e}"
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        metrics.incr("llm_errors")
+        raise LLMError(f"Giving up after {self.max_retries + 1} attempts ({last_error})")
+
+    def _parse(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        usage = data.get("usage") or {}
+        metrics.incr("llm_requests")
+        metrics.incr("llm_prompt_tokens", usage.get("prompt_tokens", 0))
+        metrics.incr("llm_completion_tokens", usage.get("completion_tokens", 0))
+        try:
+            content = json.loads(data["choices"][0]["message"]["content"])
+        except (KeyError, IndexError, TypeError, json.JSONDecodeError) as e:
+            raise LLMError(f"Failed to parse AI response: {e}")
+        if not isinstance(content, dict):
+            raise LLMError("Failed to parse AI response: expected a JSON object")
+        return {"content": content, "usage": usage, "model": data.get("model")}
+
+
+# Shared gateway; closed from the app lifespan
+llm_gateway = LLMGateway()
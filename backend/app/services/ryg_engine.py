@@ -0,0 +1,242 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from app.metrics import metrics
+from app.services.dashboard_stats import CLOSED_ACTION_ITEM_STATUSES, dashboard_stats
+from app.services.document_processor import SENTIMENT_NEUTRAL_BAND, coerce_score
+
+# Field on each engagement that holds its rolling RYG aggregates
+SIGNALS_FIELD = "rygSignals"
+
+# Histogram bucket for open action items without a due date
+NO_DUE_DATE = "none"
+
+# Risk factors copied into aiInsights by a full rebuild
+MAX_INSIGHT_RISK_FACTORS = 20
+
+Signal = Dict[str, float]
+
+
+def document_signal(ai_data: Optional[dict]) -> Optional[Signal]:
+    """What one analysed document contributes to the aggregates."""
+    if not ai_data:
+        return None
+    score = (ai_data.get("key_metrics") or {}).get("sentiment_score")
+    if score is None:
+        score = ai_data.get("score")
+    score = coerce_score(score)
+    if score is None:
+        return None
+    sentiment = str(ai_data.get("sentiment") or "").lower()
+    return {
+        "score": score,
+        "negative": 1 if "negative" in sentiment or score <= -SENTIMENT_NEUTRAL_BAND else 0,
+        "risks": len(ai_data.get("risk_factors") or []),
+    }
+
+
+def email_signal(email: Optional[dict]) -> Optional[Signal]:
+    """What one email with a sentiment score contributes to the aggregates."""
+    sentiment = (email or {}).get("sentiment") or {}
+    if sentiment.get("score") is None:
+        return None
+    return document_signal({"score": sentiment["score"], "sentiment": sentiment.get("classification")})
+
+
+def action_item_bucket(item: Optional[dict]) -> Optional[str]:
+    """Due-date bucket of an open action item; None when closed or absent."""
+    if not item or str(item.get("status") or "open").lower() in CLOSED_ACTION_ITEM_STATUSES:
+        return None
+    due = item.get("dueDate")
+    if isinstance(due, datetime):
+        return due.date().isoformat()
+    if isinstance(due, date):
+        return due.isoformat()
+    if isinstance(due, str) and due:
+        return due[:10]
+    return NO_DUE_DATE
+
+
+def signal_increments(old: Optional[Signal], new: Optional[Signal]) -> Dict[str, float]:
+    """$inc document that replaces one source's old contribution with its new one."""
+    inc: Dict[str, float] = {}
+    for key, field in (("score", "sentimentSum"), ("negative", "negativeSources"), ("risks", "riskFactors")):
+        inc[f"{SIGNALS_FIELD}.{field}"] = (new or {}).get(key, 0) - (old or {}).get(key, 0)
+    inc[f"{SIGNALS_FIELD}.sentimentCount"] = (1 if new else 0) - (1 if old else 0)
+    return inc
+
+
+def bucket_increments(old: Optional[str], new: Optional[str]) -> Dict[str, float]:
+    """$inc document that moves one action item between due-date buckets."""
+    inc: Dict[str, float] = {}
+    if old == new:
+        return inc
+    if old:
+        inc[f"{SIGNALS_FIELD}.openDue.{old}"] = -1
+    if new:
+        inc[f"{SIGNALS_FIELD}.openDue.{new}"] = 1
+    return inc
+
+
+def average_sentiment(signals: Optional[dict]) -> Optional[float]:
+    signals = signals or {}
+    count = signals.get("sentimentCount") or 0
+    if count <= 0:
+        return None
+    return round(signals.get("sentimentSum", 0) / count, 3)
+
+
+def overdue_count(signals: Optional[dict], today: Optional[date] = None) -> int:
+    cutoff = (today or date.today()).isoformat()
+    return sum(
+        count for day, count in ((signals or {}).get("openDue") or {}).items()
+        if day != NO_DUE_DATE and day < cutoff and count > 0
+    )
+
+
+def score_ryg(signals: Optional[dict], today: Optional[date] = None) -> str:
+    """
+    RYG status from an engagement's aggregates: red when sentiment is
+    negative on average or any open action item is overdue, yellow when it is
+    neutral or any source reads negative, green otherwise (including when
+    there is nothing to score yet).
+    """
+    average = average_sentiment(signals)
+    if (average is not None and average <= -SENTIMENT_NEUTRAL_BAND) or overdue_count(signals, today):
+        return "red"
+    if (average is not None and average < SENTIMENT_NEUTRAL_BAND) or (signals or {}).get("negativeSources", 0) > 0:
+        return "yellow"
+    return "green"
+
+
+def _engagement_oid(engagement_id: Any) -> Optional[ObjectId]:
+    engagement_id = str(engagement_id)
+    return ObjectId(engagement_id) if ObjectId.is_valid(engagement_id) else None
+
+
+class RygEngine:
+    """
+    Incremental RYG scoring.
+    Each engagement keeps rolling aggregates under `rygSignals`: the sum and
+    count of sentiment scores from analysed documents and emails, how many of
+    those read negative, the number of risk factors, and a histogram of open
+    action items by due date. Every change applies an O(1) $inc and the status
+    is re-derived from the aggregates, so no model call is needed. Items that
+    become overdue merely with time are picked up on the engagement's next
+    change or by the bulk recompute.
+    """
+
+    async def _apply(self, db, engagement_id: Any, inc: Dict[str, float]) -> Optional[dict]:
+        oid = _engagement_oid(engagement_id)
+        inc = {field: value for field, value in inc.items() if value}
+        if oid is None or not inc:
+            return None
+        inc[f"{SIGNALS_FIELD}.version"] = 1
+        engagement = await db.engagements.find_one_and_update(
+            {"_id": oid},
+            {"$inc": inc},
+            projection={SIGNALS_FIELD: 1, "ryg_status": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if engagement is None:
+            return None
+        signals = engagement[SIGNALS_FIELD]
+        status = score_ryg(signals)
+        metrics.incr("ryg_signal_updates")
+        if status != engagement.get("ryg_status"):
+            # Only the writer holding the latest version sets the status
+            result = await db.engagements.update_one(
+                {"_id": oid, f"{SIGNALS_FIELD}.version": signals["version"]},
+                {"$set": {"ryg_status": status, "rygUpdatedAt": datetime.utcnow()}},
+            )
+            if result.modified_count:
+                metrics.incr("ryg_status_changes")
+                dashboard_stats.mark_dirty("engagements")
+        return {"ryg_status": status, "signals": signals}
+
+    async def document_changed(self, db, engagement_id: Any, old_ai: Optional[dict], new_ai: Optional[dict]) -> Optional[dict]:
+        """A document was analysed, re-analysed (old_ai set) or deleted (new_ai None)."""
+        return await self._apply(db, engagement_id, signal_increments(document_signal(old_ai), document_signal(new_ai)))
+
+    async def email_changed(self, db, engagement_id: Any, old_email: Optional[dict], new_email: Optional[dict]) -> Optional[dict]:
+        return await self._apply(db, engagement_id, signal_increments(email_signal(old_email), email_signal(new_email)))
+
+    async def action_item_changed(self, db, engagement_id: Any, old_item: Optional[dict], new_item: Optional[dict]) -> Optional[dict]:
+        return await self._apply(db, engagement_id, bucket_increments(action_item_bucket(old_item), action_item_bucket(new_item)))
+
+    async def action_items_added(self, db, items: List[dict]) -> None:
+        """Fold a batch of new action items in with one update per engagement."""
+        by_engagement: Dict[str, Dict[str, float]] = {}
+        for item in items:
+            inc = by_engagement.setdefault(str(item["engagementId"]), {})
+            for field, value in bucket_increments(None, action_item_bucket(item)).items():
+                inc[field] = inc.get(field, 0) + value
+        for engagement_id, inc in by_engagement.items():
+            await self._apply(db, engagement_id, inc)
+
+    async def rebuild(self, db, engagement_ids: List[ObjectId]) -> List[UpdateOne]:
+        """
+        Recompute the aggregates of a batch of engagements from their
+        documents, emails and action items (one query per collection for the
+        whole batch) and return the write for each engagement.
+        """
+        keys = [str(oid) for oid in engagement_ids]
+        signals = {key: {"sentimentSum": 0.0, "sentimentCount": 0, "negativeSources": 0, "riskFactors": 0, "openDue": {}} for key in keys}
+        risks: Dict[str, List[Any]] = {key: [] for key in keys}
+
+        def add(key: str, signal: Optional[Signal]) -> None:
+            if signal:
+                for field, value in signal_increments(None, signal).items():
+                    signals[key][field.split(".", 1)[1]] += value
+
+        async for doc in db.documents.find(
+            {"engagementId": {"$in": engagement_ids + keys}, "aiExtracted": {"$ne": None}},
+            {"engagementId": 1, "aiExtracted.key_metrics": 1, "aiExtracted.sentiment": 1, "aiExtracted.risk_factors": 1},
+        ):
+            key = str(doc["engagementId"])
+            add(key, document_signal(doc["aiExtracted"]))
+            for risk in doc["aiExtracted"].get("risk_factors") or []:
+                if risk not in risks[key] and len(risks[key]) < MAX_INSIGHT_RISK_FACTORS:
+                    risks[key].append(risk)
+        async for email in db.emails.find(
+            {"engagementId": {"$in": keys}, "sentiment.score": {"$ne": None}},
+            {"engagementId": 1, "sentiment": 1},
+        ):
+            add(email["engagementId"], email_signal(email))
+        async for item in db.action_items.find(
+            {"engagementId": {"$in": keys}, "status": {"$nin": CLOSED_ACTION_ITEM_STATUSES}},
+            {"engagementId": 1, "status": 1, "dueDate": 1},
+        ):
+            bucket = action_item_bucket(item)
+            if bucket:
+                open_due = signals[item["engagementId"]]["openDue"]
+                open_due[bucket] = open_due.get(bucket, 0) + 1
+
+        now = datetime.utcnow()
+        writes = []
+        for oid, key in zip(engagement_ids, keys):
+            rebuilt = signals[key]
+            # Pipeline update: keeps the version moving and merges into
+            # aiInsights, which may not exist yet. The rebuilt aggregates go
+            # in as one $literal value: a plain object in a pipeline $set
+            # would be merged into the stored one, keeping stale openDue
+            # buckets the rebuild is meant to drop.
+            writes.append(UpdateOne({"_id": oid}, [{"$set": {
+                SIGNALS_FIELD: {"$mergeObjects": [
+                    {"$literal": rebuilt},
+                    {"version": {"$add": [{"$ifNull": [f"${SIGNALS_FIELD}.version", 0]}, 1]}},
+                ]},
+                "ryg_status": score_ryg(rebuilt),
+                "rygUpdatedAt": now,
+                "aiInsights": {"$mergeObjects": [
+                    {"$ifNull": ["$aiInsights", {}]},
+                    {"sentiment_score": average_sentiment(rebuilt), "risk_factors": {"$literal": risks[key]}},
+                ]},
+            }}]))
+        return writes
+
+
+ryg_engine = RygEngine()
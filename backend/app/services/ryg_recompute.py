@@ -0,0 +1,157 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.metrics import metrics
+from app.services.dashboard_stats import dashboard_stats
+from app.services.job_queue import ProgressCallback, job_queue
+from app.services.ryg_engine import ryg_engine
+
+# Job kind for the portfolio-wide RYG / aiInsights refresh
+RECOMPUTE_RYG_JOB = "recompute_ryg"
+
+
+class _Watermark:
+    """
+    Highest engagement _id below which every batch has been written.
+    Batches finish out of order, so the checkpoint only advances over a
+    contiguous prefix of completed batches.
+    """
+
+    def __init__(self, start: Optional[ObjectId]):
+        self.value = start
+        self._pending: List[int] = []
+        self._done: Dict[int, ObjectId] = {}
+
+    def started(self, seq: int) -> None:
+        self._pending.append(seq)
+
+    def finished(self, seq: int, last_id: ObjectId) -> bool:
+        self._done[seq] = last_id
+        advanced = False
+        while self._pending and self._pending[0] in self._done:
+            self.value = self._done.pop(self._pending.pop(0))
+            advanced = True
+        return advanced
+
+
+async def _write_batch(db, engagement_ids: List[ObjectId]) -> int:
+    writes = await ryg_engine.rebuild(db, engagement_ids)
+    if writes:
+        await db.engagements.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def recompute_all(
+    db,
+    run_id: str,
+    progress: Optional[ProgressCallback] = None,
+    batch_size: int = settings.RYG_RECOMPUTE_BATCH_SIZE,
+    concurrency: int = settings.RYG_RECOMPUTE_CONCURRENCY,
+) -> Dict[str, Any]:
+    """
+    Rebuild rygSignals, ryg_status and aiInsights for every engagement.
+    Engagements are streamed by _id, rebuilt in batches with up to
+    `concurrency` batches in flight, and written back with one unordered
+    bulk_write per batch. The last fully written _id is checkpointed under
+    run_id in `ryg_recompute_runs`, so rerunning with the same run_id resumes
+    where an interrupted run stopped.
+    """
+    checkpoint = await db.ryg_recompute_runs.find_one({"_id": run_id}) or {}
+    if checkpoint.get("finishedAt"):
+        return {"runId": run_id, "processed": checkpoint.get("processed", 0), "resumed": False}
+    watermark = _Watermark(checkpoint.get("lastId"))
+    processed = checkpoint.get("processed", 0)
+    query = {"_id": {"$gt": watermark.value}} if watermark.value else {}
+    total = processed + await db.engagements.count_documents(query)
+    await db.ryg_recompute_runs.update_one(
+        {"_id": run_id},
+        {"$setOnInsert": {"startedAt": datetime.utcnow(), "processed": 0}},
+        upsert=True,
+    )
+
+    slots = asyncio.Semaphore(concurrency)
+    tasks: List[asyncio.Task] = []
+
+    async def run_batch(seq: int, ids: List[ObjectId]) -> None:
+        nonlocal processed
+        try:
+            written = await _write_batch(db, ids)
+        finally:
+            slots.release()
+        processed += written
+        metrics.incr("ryg_recomputed", written)
+        if watermark.finished(seq, ids[-1]):
+            await db.ryg_recompute_runs.update_one(
+                {"_id": run_id},
+                {"$set": {"lastId": watermark.value, "processed": processed, "updatedAt": datetime.utcnow()}},
+            )
+            if progress:
+                await progress("recomputing", min(99, int(processed * 100 / total)) if total else 99)
+
+    async def dispatch(seq: int, ids: List[ObjectId]) -> None:
+        await slots.acquire()
+        watermark.started(seq)
+        tasks.append(asyncio.create_task(run_batch(seq, ids)))
+        # Surface failures early instead of streaming the whole collection
+        for task in [t for t in tasks if t.done()]:
+            tasks.remove(task)
+            task.result()
+
+    seq = 0
+    batch: List[ObjectId] = []
+    try:
+        async for engagement in db.engagements.find(query, {"_id": 1}).sort("_id", 1).batch_size(batch_size):
+            batch.append(engagement["_id"])
+            if len(batch) >= batch_size:
+                await dispatch(seq, batch)
+                seq, batch = seq + 1, []
+        if batch:
+            await dispatch(seq, batch)
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    await db.ryg_recompute_runs.update_one(
+        {"_id": run_id},
+        {"$set": {"processed": processed, "finishedAt": datetime.utcnow()}},
+    )
+    dashboard_stats.mark_dirty("engagements")
+    return {"runId": run_id, "processed": processed, "resumed": bool(checkpoint)}
+
+
+async def recompute_ryg_job(db, payload: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    # Retries of the job reuse the same runId and so resume from its checkpoint
+    return await recompute_all(db, payload["runId"], progress)
+
+
+job_queue.register(RECOMPUTE_RYG_JOB, recompute_ryg_job)
+
+
+# For nightly runs outside the API process
+# Run with: python -m app.services.ryg_recompute [--run-id ID]
+if __name__ == "__main__":
+    import argparse
+
+    from app.database import close_db, get_database
+
+    parser = argparse.ArgumentParser(description="Recompute RYG status and aiInsights for all engagements")
+    parser.add_argument("--run-id", default=None, help="resume the run with this id")
+    args = parser.parse_args()
+
+    async def main():
+        run_id = args.run_id or str(ObjectId())
+        print(f"run id: {run_id}")
+        result = await recompute_all(get_database(), run_id)
+        print(f"recomputed {result['processed']} engagements")
+
+    try:
+        asyncio.run(main())
+    finally:
+        close_db()
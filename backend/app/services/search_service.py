@@ -0,0 +1,103 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from pymongo import TEXT, IndexModel
+
+# Weighted text index per searchable collection. Mongo allows a single text
+# index per collection, so every searchable field lives in this one index.
+TEXT_INDEX_NAME = "search_text"
+TEXT_INDEXES: Dict[str, Dict[str, int]] = {
+    "customers": {
+        "name": 10,
+        "industry": 4,
+        "description": 2,
+        "location.city": 2,
+        "location.country": 1,
+    },
+    "engagements": {
+        "name": 10,
+        "type": 4,
+        "description": 2,
+    },
+    "documents": {
+        "originalName": 10,
+        "fileType": 3,
+        "aiExtracted.text_content": 1,
+    },
+    "emails": {
+        "subject": 10,
+        "sender": 3,
+        "content": 1,
+    },
+}
+
+# Search result type for each collection and the fields returned with a hit
+RESULT_TYPES = {
+    "customers": "customer",
+    "engagements": "engagement",
+    "documents": "document",
+    "emails": "email",
+}
+RESULT_FIELDS = {
+    "customers": ["name", "industry", "status"],
+    "engagements": ["name", "customerId", "status", "ryg_status"],
+    "documents": ["originalName", "fileType", "engagementId"],
+    "emails": ["subject", "sender", "engagementId", "receivedAt"],
+}
+
+# Deepest hit a search can page to (offset + limit)
+MAX_SEARCH_RESULTS = 200
+
+
+def text_index_model(collection: str) -> IndexModel:
+    """The weighted text index searched for one collection."""
+    weights = TEXT_INDEXES[collection]
+    return IndexModel(
+        [(field, TEXT) for field in weights],
+        weights=weights,
+        name=TEXT_INDEX_NAME,
+        default_language="english",
+    )
+
+
+def _to_result(collection: str, doc: dict) -> Dict[str, Any]:
+    result = {"type": RESULT_TYPES[collection], "id": str(doc["_id"]), "score": doc.get("score", 0.0)}
+    for field in RESULT_FIELDS[collection]:
+        value = doc.get(field)
+        result[field] = str(value) if field.endswith("Id") and value is not None else value
+    return result
+
+
+async def _search_collection(db, collection: str, q: str, limit: int) -> List[Dict[str, Any]]:
+    projection = {field: 1 for field in RESULT_FIELDS[collection]}
+    projection["score"] = {"$meta": "textScore"}
+    cursor = (
+        db[collection]
+        .find({"$text": {"$search": q}}, projection)
+        .sort([("score", {"$meta": "textScore"})])
+        .limit(limit)
+    )
+    return [_to_result(collection, doc) async for doc in cursor]
+
+
+async def global_search(
+    db,
+    q: str,
+    collections: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Rank matches across collections by text score.
+    Each collection only returns its top offset + limit hits from the text
+    index, so the merged page never depends on the collection size. Pages
+    end at MAX_SEARCH_RESULTS; the router rejects requests beyond it.
+    """
+    collections = collections or list(TEXT_INDEXES)
+    window = min(offset + limit, MAX_SEARCH_RESULTS)
+    per_collection = await asyncio.gather(
+        *(_search_collection(db, c, q, window) for c in collections)
+    )
+    merged = [hit for hits in per_collection for hit in hits]
+    merged.sort(key=lambda hit: hit["score"], reverse=True)
+    return merged[offset:offset + limit]
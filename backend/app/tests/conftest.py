@@ -0,0 +1,5 @@
+import os
+
+# Settings requires these; give the test run placeholders before app modules are imported
+for name in ("AZURE_CLIENT_ID", "AZURE_CLIENT_SECRET", "AZURE_TENANT_ID", "OPENAI_API_KEY", "JWT_SECRET_KEY"):
+    os.environ.setdefault(name, "test")
@@ -1 +1,236 @@
+import asyncio
+import json
 
+import pytest
+from aiohttp import web
+
+from app.services import document_processor, llm_cache as llm_cache_module
+from app.services.llm_cache import LLMCache
+from app.services.llm_gateway import LLMError, LLMGateway
+
+ANALYSIS = {
+    "sentiment": "negative",
+    "score": -0.4,
+    "key_topics": ["timeline"],
+    "risk_factors": ["late delivery"],
+    "business_impact": "Renewal at risk",
+    "action_items": [{"description": "Send revised plan", "priority": "high", "due_date": "2030-01-01"}],
+}
+
+
+class FakeOpenAI:
+    """Local stand-in for the chat completions endpoint."""
+
+    def __init__(self, failures=0, status=429, delay=0.0):
+        self.failures = failures
+        self.status = status
+        self.delay = delay
+        self.requests = []
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            return web.json_response({"error": {"message": "slow down"}}, status=self.status, headers={"Retry-After": "0"})
+        return web.json_response({
+            "model": body["model"],
+            "choices": [{"message": {"role": "assistant", "content": json.dumps(ANALYSIS)}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20},
+        })
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the llm_cache tier."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def find_one_and_update(self, query, update, projection=None):
+        row = self.rows.get(query["_id"])
+        if row is not None:
+            row.update(update["$set"])
+        return row
+
+    async def replace_one(self, query, row, upsert=False):
+        self.rows[query["_id"]] = dict(row)
+
+    async def estimated_document_count(self):
+        return len(self.rows)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.llm_cache = FakeCollection()
+
+
+async def _run_with_server(fake, scenario):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    gateway = LLMGateway(
+        base_url=f"http://127.0.0.1:{port}/v1",
+        api_key="test",
+        model="test-model",
+        max_concurrency=4,
+        requests_per_minute=6000,
+        max_retries=2,
+        retry_base_seconds=0.01,
+        timeout_seconds=5,
+    )
+    try:
+        return await scenario(gateway)
+    finally:
+        await gateway.close()
+        await runner.cleanup()
+
+
+def test_combined_analysis_uses_one_json_mode_call(monkeypatch):
+    fake = FakeOpenAI()
+
+    async def scenario(gateway):
+        monkeypatch.setattr(document_processor, "llm_gateway", gateway)
+        monkeypatch.setattr(document_processor, "llm_cache", LLMCache(enabled=False))
+        return await document_processor.DocumentProcessor().analyze("The customer is worried about the timeline.")
+
+    result = asyncio.run(_run_with_server(fake, scenario))
+
+    assert result["valid"]
+    assert result["sentiment"] == "negative"
+    assert result["risk_factors"] == ["late delivery"]
+    assert result["action_items"][0]["description"] == "Send revised plan"
+    assert len(fake.requests) == 1
+    assert fake.requests[0]["response_format"] == {"type": "json_object"}
+
+
+def test_throttled_requests_are_retried():
+    fake = FakeOpenAI(failures=2, status=429)
+
+    async def scenario(gateway):
+        return await gateway.chat_json([{"role": "user", "content": "hi"}])
+
+    result = asyncio.run(_run_with_server(fake, scenario))
+
+    assert result["content"]["sentiment"] == "negative"
+    assert len(fake.requests) == 3
+
+
+def test_client_errors_are_not_retried():
+    fake = FakeOpenAI(failures=5, status=400)
+
+    async def scenario(gateway):
+        with pytest.raises(LLMError):
+            await gateway.chat_json([{"role": "user", "content": "hi"}])
+
+    asyncio.run(_run_with_server(fake, scenario))
+
+    assert len(fake.requests) == 1
+
+
+def test_identical_inflight_requests_are_coalesced():
+    fake = FakeOpenAI(delay=0.1)
+
+    async def scenario(gateway):
+        messages = [{"role": "user", "content": "same text"}]
+        return await asyncio.gather(*(gateway.chat_json(messages) for _ in range(5)))
+
+    results = asyncio.run(_run_with_server(fake, scenario))
+
+    assert len(results) == 5
+    assert len(fake.requests) == 1
+
+
+def test_waiters_take_over_when_the_coalesced_caller_is_cancelled():
+    fake = FakeOpenAI(delay=0.2)
+
+    async def scenario(gateway):
+        messages = [{"role": "user", "content": "same text"}]
+        leader = asyncio.ensure_future(gateway.chat_json(messages))
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.ensure_future(gateway.chat_json(messages)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(_run_with_server(fake, scenario))
+
+    assert [r["content"]["sentiment"] for r in results] == ["negative"] * 3
+    # The cancelled request and one made by a waiter that took over
+    assert len(fake.requests) == 2
+
+
+def test_repeated_text_is_served_from_cache(monkeypatch):
+    fake = FakeOpenAI()
+    db = FakeDatabase()
+    monkeypatch.setattr(llm_cache_module, "get_database", lambda: db)
+
+    async def scenario(gateway):
+        monkeypatch.setattr(document_processor, "llm_gateway", gateway)
+        monkeypatch.setattr(document_processor, "llm_cache", LLMCache(memory_entries=10, max_entries=10))
+        processor = document_processor.DocumentProcessor()
+        first = await processor.analyze("Delivery is  late.")
+        # Whitespace differences normalise to the same key
+        second = await processor.analyze("Delivery is late.\n")
+        document_processor.llm_cache.clear()
+        from_db = await processor.analyze("Delivery is late.")
+        refreshed = await processor.analyze("Delivery is late.", refresh=True)
+        return first, second, from_db, refreshed
+
+    results = asyncio.run(_run_with_server(fake, scenario))
+
+    assert all(result["valid"] for result in results)
+    assert len(fake.requests) == 2
+    assert len(db.llm_cache.rows) == 1
+
+
+def test_large_documents_are_map_reduced(monkeypatch):
+    fake = FakeOpenAI()
+    monkeypatch.setattr(document_processor.settings, "LLM_CHUNK_TOKENS", 50)
+
+    async def scenario(gateway):
+        monkeypatch.setattr(document_processor, "llm_gateway", gateway)
+        monkeypatch.setattr(document_processor, "llm_cache", LLMCache(enabled=False))
+        pages = [f"Page {n}: " + "status update " * 10 for n in range(4)]
+        return await document_processor.DocumentProcessor().analyze_chunks(pages)
+
+    result = asyncio.run(_run_with_server(fake, scenario))
+
+    assert len(fake.requests) == 4
+    assert result["chunks_analyzed"] == 4
+    assert result["sentiment"] == "negative"
+    # The same action item reported by every window is kept once
+    assert len(result["action_items"]) == 1
+    assert result["risk_factors"] == ["late delivery"]
+
+
+def test_reduce_weights_scores_and_merges_findings():
+    partials = [
+        {"score": 0.8, "key_topics": ["Budget"], "risk_factors": [], "business_impact": "Good",
+         "action_items": [{"description": "Sign SOW", "priority": "low"}]},
+        {"score": -0.4, "key_topics": ["budget", "Staffing"], "risk_factors": ["Attrition"], "business_impact": "Good",
+         "action_items": [{"description": "sign SOW.", "priority": "high"}]},
+    ]
+
+    result = document_processor._reduce_analyses(partials, [100, 300])
+
+    assert result["score"] == -0.1
+    assert result["sentiment"] == "neutral"
+    assert result["key_topics"] == ["Budget", "Staffing"]
+    assert result["business_impact"] == "Good"
+    assert result["action_items"] == [{"description": "Sign SOW", "priority": "high"}]
+
+
+def test_non_numeric_scores_from_the_model_are_ignored():
+    from app.services.ryg_engine import document_signal
+
+    partials = [{"score": "very negative"}, {"score": "-0.5"}]
+
+    assert document_processor._reduce_analyses(partials, [1, 1])["score"] == -0.25
+    assert document_signal({"score": "n/a"}) is None
+    assert document_signal({"key_metrics": {"sentiment_score": "0.4"}})["score"] == 0.4
@@ -0,0 +1,148 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+from app.services.auth_service import AzureAuth
+
+AUTHORITY = "https://login.microsoftonline.com/stub-tenant"
+SCOPE = ["User.Read"]
+REDIRECT_URI = "http://localhost:8000/auth/callback"
+
+
+def _b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+class StubResponse:
+    def __init__(self, body: dict):
+        self.status_code = 200
+        self.text = json.dumps(body)
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class StubIdentityProvider:
+    """In-process stand-in for Azure AD, used as MSAL's http_client."""
+
+    def __init__(self, token_delay: float = 0.0):
+        self.token_delay = token_delay
+        self.discovery_requests = 0
+        self.token_requests = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.discovery_requests += 1
+        return StubResponse({
+            "authorization_endpoint": f"{AUTHORITY}/oauth2/v2.0/authorize",
+            "token_endpoint": f"{AUTHORITY}/oauth2/v2.0/token",
+            "issuer": f"{AUTHORITY}/v2.0",
+        })
+
+    def post(self, url, **kwargs):
+        with self._lock:
+            self.token_requests += 1
+            user = f"user-{self.token_requests}"
+        time.sleep(self.token_delay)
+        now = int(time.time())
+        claims = {
+            "sub": user, "oid": user, "tid": "stub-tenant", "aud": "test", "iss": f"{AUTHORITY}/v2.0",
+            "iat": now, "exp": now + 3600, "name": user, "preferred_username": f"{user}@example.com",
+        }
+        return StubResponse({
+            "access_token": "access", "token_type": "Bearer", "expires_in": 3600, "scope": "User.Read",
+            "id_token": f"{_b64({'alg': 'none'})}.{_b64(claims)}.",
+            "client_info": _b64({"uid": user, "utid": "stub-tenant"}),
+        })
+
+    def close(self):
+        pass
+
+
+def _auth(idp, tmp_path):
+    return AzureAuth(
+        client_id="test",
+        client_secret="secret",
+        authority=AUTHORITY,
+        token_cache_path=str(tmp_path / "msal_tokens.json"),
+        http_cache_path=str(tmp_path / "msal_http.pickle"),
+        http_client=idp,
+    )
+
+
+def test_concurrent_logins_share_discovery_and_do_not_block_the_loop(tmp_path):
+    idp = StubIdentityProvider(token_delay=0.2)
+    auth = _auth(idp, tmp_path)
+
+    async def run():
+        url = await auth.authorization_url(SCOPE, REDIRECT_URI)
+        started = time.monotonic()
+        results = await asyncio.gather(*(auth.acquire_token_by_code(f"code-{i}", SCOPE, REDIRECT_URI) for i in range(5)))
+        return url, results, time.monotonic() - started
+
+    url, results, elapsed = asyncio.run(run())
+
+    assert url.startswith(f"{AUTHORITY}/oauth2/v2.0/authorize")
+    assert sorted(r["id_token_claims"]["sub"] for r in results) == [f"user-{i}" for i in range(1, 6)]
+    assert idp.discovery_requests == 1
+    assert idp.token_requests == 5
+    # Redeemed side by side in the threadpool, not one after another on the loop
+    assert elapsed < 5 * 0.2
+
+
+def test_caches_survive_a_restart(tmp_path):
+    first = StubIdentityProvider()
+    asyncio.run(_auth(first, tmp_path).acquire_token_by_code("code", SCOPE, REDIRECT_URI))
+
+    second = StubIdentityProvider()
+    restarted = _auth(second, tmp_path)
+    asyncio.run(restarted.authorization_url(SCOPE, REDIRECT_URI))
+
+    assert second.discovery_requests == 0
+    assert [a["username"] for a in restarted._app.get_accounts()] == ["user-1@example.com"]
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired_entries(monkeypatch):
+    from app.utils import ttl_cache
+    from app.utils.ttl_cache import TTLCache
+
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    cache.put("short", 4, ttl_seconds=5)
+    now[0] += 10
+    assert cache.get("short") is None
+    now[0] += 60
+    assert cache.get("a") is None
+
+
+def test_verified_tokens_are_served_from_cache_until_they_expire(monkeypatch):
+    from app.routers import auth
+    from app.services.auth_service import token_claims_cache
+
+    token_claims_cache.clear()
+    token = auth.create_jwt_token({"sub": "user-1", "role": "user"})
+    claims = auth.verify_jwt_token(token)
+    assert claims["sub"] == "user-1"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("token decoded again")
+
+    monkeypatch.setattr(auth.jwt, "decode", fail)
+    assert auth.verify_jwt_token(token) is claims
+
+    # Expired tokens are rejected and never cached
+    token_claims_cache.clear()
+    monkeypatch.undo()
+    expired = auth.jwt.encode({"sub": "user-1", "exp": int(time.time()) - 1}, auth.JWT_SECRET, algorithm=auth.JWT_ALGORITHM)
+    assert auth.verify_jwt_token(expired) is None
+    assert len(token_claims_cache) == 0
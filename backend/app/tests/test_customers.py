@@ -1 +1,83 @@
+import asyncio
+import io
 
+from fastapi import UploadFile
+
+from app.models.customer import CustomerCreate, CustomerOut, new_customer_document
+from app.utils.bulk_io import iter_row_batches
+from app.utils.responses import model_projection
+
+
+def _read_all(content: bytes, fmt: str):
+    async def collect():
+        upload = UploadFile(file=io.BytesIO(content), filename=f"rows.{fmt}")
+        return [row async for batch in iter_row_batches(upload, fmt, batch_size=2) for row in batch]
+    return asyncio.run(collect())
+
+
+def test_bulk_customer_documents_get_defaults_and_search_fields():
+    doc = new_customer_document(CustomerCreate(name="Acme Corp", contactInfo={"phone": "+1 (555) 010"}))
+
+    assert doc["industry"] == "Other"
+    assert doc["engagementIds"] == []
+    assert doc["status"] == "active"
+    assert doc["search"]["name"] == "acme corp"
+    assert doc["search"]["phone"] == "1555010"
+    assert "acm" in doc["search"]["tokens"]
+
+
+def test_search_fields_stay_out_of_responses():
+    doc = new_customer_document(CustomerCreate(name="Acme Corp"))
+    doc["_id"] = "6650f0c2a1b2c3d4e5f60718"
+
+    body = CustomerOut.model_validate(doc).model_dump(by_alias=True)
+    assert str(body["_id"]) == doc["_id"]
+    assert "search" not in body
+    assert "search" not in model_projection(CustomerOut)
+
+
+def test_csv_rows_are_unflattened_and_numbered():
+    rows = _read_all(b"name,location.city,description\nAcme,Paris,\n\"Beta, Inc\",Rome,\"multi\nline\"\n", "csv")
+
+    assert rows == [
+        (1, {"name": "Acme", "location": {"city": "Paris"}}),
+        (2, {"name": "Beta, Inc", "location": {"city": "Rome"}, "description": "multi\nline"}),
+    ]
+
+
+def test_ndjson_rows_report_parse_errors_by_line():
+    rows = _read_all(b'{"name": "Acme"}\n\nnot json\n[1]\n', "ndjson")
+
+    assert rows[0] == (1, {"name": "Acme"})
+    assert rows[1][0] == 3 and rows[1][1].startswith("Invalid JSON")
+    assert rows[2] == (4, "Expected a JSON object")
+
+
+def test_autocomplete_scans_a_bounded_prefix_range_and_folds_case(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models.customer import Customer
+    from app.routers.customers import AUTOCOMPLETE_SCAN_FACTOR
+
+    pipelines = []
+
+    class Rows:
+        async def to_list(self):
+            return [{"_id": "acme", "name": "ACME"}, {"_id": "acme corp", "name": "Acme Corp"}]
+
+    def aggregate(pipeline):
+        pipelines.append(pipeline)
+        return Rows()
+
+    monkeypatch.setattr(Customer, "aggregate", aggregate)
+    response = TestClient(app).get("/api/customers/autocomplete/names", params={"prefix": " ACme", "limit": 5})
+
+    assert response.status_code == 200
+    assert response.json() == ["ACME", "Acme Corp"]
+    [pipeline] = pipelines
+    assert pipeline[0] == {"$match": {"search.name": {"$regex": "^acme"}}}
+    stages = [next(iter(stage)) for stage in pipeline]
+    # Sorted and capped on the index before anything is grouped
+    assert stages[:4] == ["$match", "$sort", "$limit", "$group"]
+    assert pipeline[2] == {"$limit": 5 * AUTOCOMPLETE_SCAN_FACTOR}
+    assert pipeline[3]["$group"]["_id"] == "$search.name"
@@ -0,0 +1,74 @@
+import asyncio
+
+from app.models.engagement import EngagementBase, EngagementUpdate
+from app.services import dashboard_stats as dashboard_module
+from app.services.dashboard_stats import DashboardStats
+
+
+class FakeCustomers:
+    def __init__(self, count):
+        self.count = count
+        self.reads = 0
+
+    async def estimated_document_count(self):
+        self.reads += 1
+        return self.count
+
+
+class FakeAggregate:
+    def __init__(self, result):
+        self.result = result
+
+    async def to_list(self, length):
+        return [self.result]
+
+
+class FakeEngagements:
+    def __init__(self):
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeAggregate({"active": [{"n": 2}], "ryg": [{"_id": "red", "n": 1}], "at_risk": [], "recent": []})
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        for name, collection in collections.items():
+            setattr(self, name, collection)
+
+
+def test_dirty_section_is_served_stale_then_refreshed(monkeypatch):
+    customers = FakeCustomers(1)
+    monkeypatch.setattr(dashboard_module, "get_database", lambda: FakeDB(customers=customers))
+    stats = DashboardStats(ttl_seconds=60)
+
+    async def scenario():
+        assert (await stats.section("customers"))["total_customers"] == 1
+        customers.count = 2
+        # Fresh within the TTL: served from memory
+        assert (await stats.section("customers"))["total_customers"] == 1
+        assert customers.reads == 1
+
+        stats.mark_dirty("customers")
+        # The previous value is returned while the refresh runs
+        assert (await stats.section("customers"))["total_customers"] == 1
+        await stats._pending["customers"]
+        assert (await stats.section("customers"))["total_customers"] == 2
+        assert customers.reads == 2
+
+    asyncio.run(scenario())
+
+
+def test_at_risk_matches_the_normalised_status(monkeypatch):
+    engagements = FakeEngagements()
+    monkeypatch.setattr(dashboard_module, "get_database", lambda: FakeDB(engagements=engagements))
+
+    distribution = asyncio.run(DashboardStats().status_distribution())
+
+    assert distribution == {"red": 1, "yellow": 0, "green": 0}
+    at_risk = engagements.pipelines[0][0]["$facet"]["at_risk"]
+    assert at_risk[0] == {"$match": {"ryg_status": "red"}}
+    assert EngagementBase(customerId="c1", name="Renewal", ryg_status=" RED ").ryg_status == "red"
+    assert EngagementBase(customerId="c1", name="Renewal").ryg_status == "green"
+    assert EngagementUpdate(ryg_status="Yellow").ryg_status == "yellow"
@@ -0,0 +1,25 @@
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+from app import database
+
+
+def test_transactions_fall_back_to_plain_writes_on_standalone_servers(monkeypatch):
+    class StandaloneClient:
+        async def start_session(self):
+            raise OperationFailure("Transaction numbers are only allowed on a replica set member or mongos", code=20)
+
+    sessions = []
+
+    async def write(session):
+        sessions.append(session)
+        return "written"
+
+    monkeypatch.setattr(database, "get_client", lambda: StandaloneClient())
+    monkeypatch.setattr(database, "_transactions_supported", None)
+
+    assert asyncio.run(database.run_in_transaction(write)) == "written"
+    assert asyncio.run(database.run_in_transaction(write)) == "written"
+    assert sessions == [None, None]
+    assert database._transactions_supported is False
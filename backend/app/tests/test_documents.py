@@ -0,0 +1,221 @@
+import asyncio
+import time
+
+from docx import Document
+from openpyxl import Workbook
+
+from app.services import document_processor
+from app.services import extraction_cache as extraction_cache_module
+from app.services.document_processor import DOCX_MIME, DocumentProcessor, sniff_mime_type
+from app.services.extraction_cache import ExtractionCache
+
+
+def _docx(path, paragraphs):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+    return str(path)
+
+
+def test_content_is_sniffed_regardless_of_the_file_name(tmp_path):
+    docx = _docx(tmp_path / "notes.docx", ["Kick-off notes"])
+    (tmp_path / "plain.pdf").write_bytes(b"just some text")
+
+    assert sniff_mime_type(docx) == DOCX_MIME
+    assert sniff_mime_type(str(tmp_path / "plain.pdf")) is None
+
+
+def test_spoofed_extensions_are_rejected(tmp_path):
+    processor = DocumentProcessor()
+    spoofed = _docx(tmp_path / "invoice.pdf", ["Not a PDF at all"])
+    (tmp_path / "fake.xlsx").write_bytes(b"%PDF-1.4\n")
+
+    result = processor.validate_file(spoofed)
+    assert not result["valid"]
+    assert result["error"] == "Invalid PDF file: content does not match file type"
+    assert not processor.validate_file(str(tmp_path / "fake.xlsx"))["valid"]
+
+
+def test_generic_client_types_fall_back_to_the_sniffed_type(tmp_path):
+    blob = _docx(tmp_path / "3f2a9c", ["Stored without an extension"])
+
+    result = DocumentProcessor().validate_file(blob, "application/octet-stream")
+
+    assert result["valid"]
+    assert result["mime_type"] == DOCX_MIME
+
+
+def test_docx_paragraphs_are_grouped_into_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_processor, "DOCX_PARAGRAPHS_PER_CHUNK", 2)
+    path = _docx(tmp_path / "minutes.docx", ["one", "", "two", "three", "four", "five"])
+
+    chunks = list(DocumentProcessor().iter_text_chunks(path))
+
+    # Blank paragraphs are skipped before grouping
+    assert chunks == ["one\ntwo", "three\nfour", "five"]
+
+
+def test_long_blocks_are_split_on_line_breaks(monkeypatch):
+    monkeypatch.setattr(document_processor, "TEXT_CHUNK_SIZE", 10)
+
+    assert list(document_processor._bounded_chunks("aaaa\nbbbb\ncccc")) == ["aaaa\nbbbb", "cccc"]
+    # No line break within the limit: cut at the limit
+    assert list(document_processor._bounded_chunks("x" * 25)) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_sheet_rows_are_batched_per_sheet_and_reading_stops_at_max_chars(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_processor, "XLSX_ROWS_PER_CHUNK", 2)
+    wb = Workbook()
+    for i in range(3):
+        wb.active.append([f"row{i}", i + 1])
+    wb.create_sheet("Risks").append(["late", "delivery"])
+    path = str(tmp_path / "tracker.xlsx")
+    wb.save(path)
+    processor = DocumentProcessor()
+
+    assert list(processor.iter_text_chunks(path)) == ["row0 1\nrow1 2", "row2 3", "late delivery"]
+    result = processor.extract_chunks(path, max_chars=16)
+    assert result["chunks"] == ["row0 1\nrow1 2", "row"]
+    assert result["truncated"]
+
+
+def _hang(seconds):
+    time.sleep(seconds)
+    return {"valid": True}
+
+
+def test_timed_out_extraction_does_not_disturb_others(monkeypatch):
+    monkeypatch.setattr(document_processor.settings, "EXTRACTION_WORKERS", 2)
+    monkeypatch.setattr(document_processor.settings, "EXTRACTION_TIMEOUT_SECONDS", 1)
+    processor = document_processor.DocumentProcessor()
+
+    async def scenario():
+        return await asyncio.gather(
+            processor._run_in_pool(_hang, 30),
+            processor._run_in_pool(_hang, 0.5),
+            return_exceptions=True,
+        )
+
+    document_processor.shutdown_extraction_pool()
+    try:
+        hung, bystander = asyncio.run(scenario())
+    finally:
+        document_processor.shutdown_extraction_pool()
+    assert isinstance(hung, document_processor.ExtractionAborted)
+    assert "timed out" in str(hung)
+    assert bystander == {"valid": True}
+
+
+class FakeCacheCollection:
+    def __init__(self):
+        self.rows = {}
+
+    async def find_one(self, query):
+        return self.rows.get(query["_id"])
+
+    async def replace_one(self, query, row, upsert=False):
+        self.rows[query["_id"]] = row
+
+
+class FakeCacheDB:
+    def __init__(self):
+        self.extraction_cache = FakeCacheCollection()
+
+
+class CountingProcessor:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    async def extract_chunks_async(self, file_path, mime_type=None, max_chars=None):
+        self.calls.append((file_path, max_chars))
+        return self.result
+
+
+def _cache(result, max_chars=1000):
+    cache = ExtractionCache(max_chars=max_chars)
+    cache._processor = CountingProcessor(result)
+    return cache
+
+
+def _extracted(*chunks):
+    return {"valid": True, "chunks": list(chunks)}
+
+
+def test_extraction_cache_parses_each_blob_once():
+    db = FakeCacheDB()
+    doc = {"sha256": "a" * 64, "filePath": "blobs/a", "mimeType": DOCX_MIME}
+    cache = _cache(_extracted("kick-off notes"))
+
+    async def scenario():
+        first = await cache.extract(db, doc, max_chars=100)
+        second = await cache.extract(db, doc, max_chars=100)
+        # Another process: empty memory tier, shared collection
+        other = _cache(_extracted("never parsed"))
+        third = await other.extract(db, doc, max_chars=100)
+        return first, second, third, other
+
+    first, second, third, other = asyncio.run(scenario())
+
+    assert first == second == third == _extracted("kick-off notes")
+    assert cache._processor.calls == [("blobs/a", 100)]
+    assert other._processor.calls == []
+    assert list(db.extraction_cache.rows) == [ExtractionCache.key("a" * 64, 100)]
+
+
+def test_extraction_cache_skips_failures_and_unhashed_rows():
+    db = FakeCacheDB()
+    cache = _cache({"valid": False, "error": "Could not parse"})
+
+    async def scenario():
+        for _ in range(2):
+            await cache.extract(db, {"sha256": "b" * 64, "filePath": "blobs/b"}, max_chars=100)
+            await cache.extract(db, {"filePath": "uploads/legacy.pdf"}, max_chars=100)
+
+    asyncio.run(scenario())
+
+    assert len(cache._processor.calls) == 4
+    assert db.extraction_cache.rows == {}
+
+
+def test_extraction_cache_key_tracks_extractor_version_and_max_chars(monkeypatch):
+    db = FakeCacheDB()
+    doc = {"sha256": "c" * 64, "filePath": "blobs/c"}
+    cache = _cache(_extracted("row"))
+
+    async def extract(max_chars):
+        return await cache.extract(db, doc, max_chars=max_chars)
+
+    asyncio.run(extract(100))
+    asyncio.run(extract(200))
+    monkeypatch.setattr(extraction_cache_module, "EXTRACTOR_VERSION", document_processor.EXTRACTOR_VERSION + 1)
+    asyncio.run(extract(100))
+
+    assert [max_chars for _, max_chars in cache._processor.calls] == [100, 200, 100]
+    assert len(set(db.extraction_cache.rows)) == 3
+    assert ExtractionCache.key("c" * 64, None) == ExtractionCache.key("c" * 64, 0)
+
+
+def test_memory_tier_evicts_least_recently_used_entries_by_size():
+    db = FakeCacheDB()
+    cache = ExtractionCache(max_chars=10)
+
+    async def scenario():
+        await cache.put(db, "a", _extracted("aaaa"))
+        await cache.put(db, "b", _extracted("bbbb"))
+        assert await cache.get(db, "a") is not None
+        await cache.put(db, "c", _extracted("cccc"))
+
+    asyncio.run(scenario())
+
+    # "b" was the least recently used once "a" was read again
+    assert list(cache._memory) == ["a", "c"]
+    assert cache._memory_chars == 8
+    # Still served from the collection tier
+    assert "b" in db.extraction_cache.rows
+
+    asyncio.run(cache.put(db, "big", _extracted("x" * 50)))
+    # An entry larger than the cap is kept on its own rather than dropped
+    assert list(cache._memory) == ["big"]
+    assert cache._memory_chars == 50
@@ -1 +1,111 @@
+from datetime import date, datetime
 
+from app.services.ryg_engine import (
+    NO_DUE_DATE,
+    action_item_bucket,
+    bucket_increments,
+    document_signal,
+    score_ryg,
+    signal_increments,
+)
+
+TODAY = date(2026, 6, 1)
+
+
+def _apply(signals, inc):
+    for path, value in inc.items():
+        target = signals
+        *parents, leaf = path.split(".")[1:]
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = target.get(leaf, 0) + value
+    return signals
+
+
+def test_reanalysed_document_replaces_its_contribution():
+    signals = {}
+    first = {"sentiment": "negative", "key_metrics": {"sentiment_score": -0.6}, "risk_factors": ["scope"]}
+    second = {"sentiment": "positive", "key_metrics": {"sentiment_score": 0.8}, "risk_factors": []}
+
+    _apply(signals, signal_increments(None, document_signal(first)))
+    assert score_ryg(signals, TODAY) == "red"
+
+    _apply(signals, signal_increments(document_signal(first), document_signal(second)))
+    assert signals["sentimentCount"] == 1
+    assert signals["negativeSources"] == 0
+    assert signals["riskFactors"] == 0
+    assert score_ryg(signals, TODAY) == "green"
+
+    _apply(signals, signal_increments(document_signal(second), None))
+    assert signals["sentimentCount"] == 0
+    assert score_ryg(signals, TODAY) == "green"
+    assert score_ryg({"sentimentSum": 0.1, "sentimentCount": 1}, TODAY) == "yellow"
+
+
+def test_overdue_open_action_items_turn_engagement_red():
+    signals = {"sentimentSum": 0.9, "sentimentCount": 1}
+    item = {"status": "open", "dueDate": datetime(2026, 5, 1)}
+
+    _apply(signals, bucket_increments(None, action_item_bucket(item)))
+    assert score_ryg(signals, TODAY) == "red"
+
+    closed = {**item, "status": "completed"}
+    _apply(signals, bucket_increments(action_item_bucket(item), action_item_bucket(closed)))
+    assert score_ryg(signals, TODAY) == "green"
+
+
+def test_action_items_without_due_date_never_count_as_overdue():
+    assert action_item_bucket({"status": "open"}) == NO_DUE_DATE
+    signals = _apply({"sentimentSum": 0.5, "sentimentCount": 1}, bucket_increments(None, NO_DUE_DATE))
+    assert score_ryg(signals, TODAY) == "green"
+
+
+def test_recompute_checkpoint_only_advances_over_finished_prefix():
+    from bson import ObjectId
+    from app.services.ryg_recompute import _Watermark
+
+    ids = [ObjectId() for _ in range(3)]
+    watermark = _Watermark(None)
+    for seq in range(3):
+        watermark.started(seq)
+
+    assert not watermark.finished(1, ids[1])
+    assert watermark.value is None
+    assert watermark.finished(0, ids[0])
+    assert watermark.value == ids[1]
+    assert watermark.finished(2, ids[2])
+    assert watermark.value == ids[2]
+
+
+def test_rebuild_replaces_the_stored_aggregates_wholesale():
+    import asyncio
+    from bson import ObjectId
+    from app.services.ryg_engine import SIGNALS_FIELD, ryg_engine
+
+    class Rows:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def find(self, query, projection):
+            async def iterate():
+                for row in self.rows:
+                    yield row
+            return iterate()
+
+    oid = ObjectId()
+    db = type("DB", (), {
+        "documents": Rows([]),
+        "emails": Rows([]),
+        "action_items": Rows([{"engagementId": str(oid), "status": "open", "dueDate": "2030-01-01"}]),
+    })()
+
+    [write] = asyncio.run(ryg_engine.rebuild(db, [oid]))
+    signals = write._doc[0]["$set"][SIGNALS_FIELD]
+
+    # An expression, so the stored subdocument (and any stale openDue
+    # bucket in it) is replaced rather than merged field by field
+    assert list(signals) == ["$mergeObjects"]
+    assert signals["$mergeObjects"][0] == {"$literal": {
+        "sentimentSum": 0.0, "sentimentCount": 0, "negativeSources": 0, "riskFactors": 0, "openDue": {"2030-01-01": 1},
+    }}
+    assert write._doc[0]["$set"]["ryg_status"] == "green"
@@ -0,0 +1,35 @@
+import asyncio
+
+from pymongo.errors import DuplicateKeyError
+
+from app.services.job_queue import JobQueue
+
+
+class RacingJobs:
+    """A jobs collection where another process enqueued the same key between our lookup and insert."""
+
+    def __init__(self, winner):
+        self.winner = winner
+        self.lookups = 0
+
+    async def find_one(self, query):
+        self.lookups += 1
+        return None if self.lookups == 1 else self.winner
+
+    async def insert_one(self, job):
+        raise DuplicateKeyError("E11000 duplicate key error index: unfinished_job_dedupe")
+
+
+class FakeDB:
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+
+def test_concurrent_enqueue_returns_the_job_that_won():
+    winner = {"_id": "job-1", "kind": "process_document", "dedupeKey": "doc-1", "status": "queued"}
+    jobs = RacingJobs(winner)
+
+    job = asyncio.run(JobQueue().enqueue(FakeDB(jobs), "process_document", {"documentId": "doc-1"}, dedupe_key="doc-1"))
+
+    assert job is winner
+    assert jobs.lookups == 2
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import logging
+
+from app import logging_config
+from app.logging_config import (
+    JsonFormatter,
+    RequestContextFilter,
+    RequestContextMiddleware,
+    debug_sampled_var,
+    request_id_var,
+    set_logging,
+)
+
+
+def _call(app, headers=()):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": list(headers)}
+    asyncio.run(RequestContextMiddleware(app)(scope, receive, send))
+    return sent
+
+
+def test_requests_get_a_correlation_id_in_logs_and_headers(monkeypatch):
+    monkeypatch.setitem(logging_config._state, "debug_sample_rate", 0.0)
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["request_id"] = request_id_var.get()
+        seen["sampled"] = debug_sampled_var.get()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = _call(app, headers=[(b"x-request-id", b"abc123")])
+    assert seen == {"request_id": "abc123", "sampled": False}
+    assert (b"x-request-id", b"abc123") in sent[0]["headers"]
+    assert request_id_var.get() is None
+
+    sent = _call(app)
+    assert len(seen["request_id"]) == 32
+    assert (b"x-request-id", seen["request_id"].encode()) in sent[0]["headers"]
+
+
+def test_json_lines_carry_extra_fields_and_unsampled_debug_is_dropped():
+    record = logging.LogRecord("app.routers.engagements", logging.INFO, __file__, 1, "Listed %s", ("engagements",), None)
+    record.count = 3
+    token = request_id_var.set("req-1")
+    try:
+        assert RequestContextFilter().filter(record)
+        line = json.loads(JsonFormatter().format(record))
+    finally:
+        request_id_var.reset(token)
+    assert line["msg"] == "Listed engagements"
+    assert line["request_id"] == "req-1"
+    assert line["count"] == 3
+
+    debug = logging.LogRecord("app", logging.DEBUG, __file__, 1, "noise", None, None)
+    token = debug_sampled_var.set(False)
+    try:
+        assert not RequestContextFilter().filter(debug)
+    finally:
+        debug_sampled_var.reset(token)
+
+
+def test_logging_can_be_switched_off_at_runtime():
+    logger = logging.getLogger("app.tests.switch")
+    try:
+        set_logging(enabled=False)
+        assert not logger.isEnabledFor(logging.CRITICAL)
+    finally:
+        set_logging(enabled=True)
+    assert logger.isEnabledFor(logging.WARNING)
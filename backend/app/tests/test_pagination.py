@@ -0,0 +1,113 @@
+import json
+from datetime import datetime
+from typing import List
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from app.dependencies import get_db
+from app.main import app
+from app.models.customer import CustomerCreate, CustomerOut, new_customer_document
+from app.models.engagement import EngagementOut
+from app.utils.pagination import decode_cursor, encode_cursor, parse_fields
+from app.utils.responses import FastJSONResponse, model_projection
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for fetch_page."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        docs = [dict(doc) for doc in self.docs]
+        if projection:
+            docs = [{k: v for k, v in doc.items() if k in projection or k == "_id"} for doc in docs]
+        return FakeCursor(docs)
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        for name, docs in collections.items():
+            setattr(self, name, FakeCollection(docs))
+
+
+def test_cursors_round_trip_object_ids_and_plain_ids():
+    oid = ObjectId()
+
+    assert decode_cursor(encode_cursor(oid)) == oid
+    assert decode_cursor(encode_cursor("run-42")) == "run-42"
+    assert "=" not in encode_cursor(oid)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor!", "e30", encode_cursor("x")[:-3], "eyJpZCI6ICJ4IiwgIm9pZCI6IHRydWV9"])
+def test_malformed_cursors_are_rejected_with_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+
+    assert exc.value.status_code == 400
+
+
+def test_fields_become_a_projection_of_response_model_fields():
+    assert parse_fields("name, status,,", CustomerOut) == {"name": 1, "status": 1}
+    assert parse_fields("id,name", CustomerOut) == {"_id": 1, "name": 1}
+    assert parse_fields(" , ", CustomerOut) is None
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("name,search", CustomerOut)
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Unknown fields: search"
+
+
+@pytest.fixture
+def customers_client():
+    doc = new_customer_document(CustomerCreate(name="Acme Corp"))
+    doc["_id"] = ObjectId()
+    app.dependency_overrides[get_db] = lambda: FakeDB(customers=[doc])
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+def test_list_routes_only_project_response_model_fields(customers_client):
+    response = customers_client.get("/api/customers", params={"fields": "name"})
+    assert response.status_code == 200
+    assert [set(row) for row in response.json()] == [{"_id", "name"}]
+
+    for fields in ("name,search", "search.tokens", "$x"):
+        response = customers_client.get("/api/customers", params={"fields": fields})
+        assert response.status_code == 400
+
+
+def test_fast_response_matches_validated_engagement_page():
+    doc = {
+        "_id": ObjectId(), "customerId": "c1", "name": "Renewal", "type": "Other", "typeColorClass": "x",
+        "status": "active", "ryg_status": "green", "msa": None, "sow": {"reference": "S1", "value": 10.0,
+        "startDate": datetime(2026, 1, 1), "endDate": None, "documents": []}, "description": None,
+        "createdAt": datetime(2026, 1, 1, 9, 30, 0, 1500), "updatedAt": None,
+    }
+    projection = model_projection(EngagementOut)
+    assert set(projection) == set(doc)
+
+    page = TypeAdapter(List[EngagementOut])
+    validated = page.dump_python(page.validate_python([{**doc, "_id": str(doc["_id"])}]), mode="json", by_alias=True)
+    assert json.loads(FastJSONResponse([doc]).body) == validated
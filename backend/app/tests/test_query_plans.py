@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+import pytest
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+from app.init_collections import ensure_indexes
+from app.models.customer import Customer
+from app.models.user import User
+from app.utils.query_plans import QUERY_CHECKS, collection_scans, plan_stages
+
+# Needs a local mongod; the test is skipped when none answers
+TEST_MONGODB_URL = os.environ.get("TEST_MONGODB_URL", "mongodb://localhost:27017")
+TEST_DB_NAME = "apphelix_query_plan_test"
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {"stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}
+    assert plan_stages(plan) == ["FETCH", "OR", "IXSCAN", "COLLSCAN"]
+
+
+def test_router_queries_never_scan_a_collection():
+    async def run():
+        client = AsyncIOMotorClient(TEST_MONGODB_URL, serverSelectionTimeoutMS=500)
+        try:
+            await client.admin.command("ping")
+        except PyMongoError:
+            client.close()
+            pytest.skip(f"no mongod at {TEST_MONGODB_URL}")
+        try:
+            await client.drop_database(TEST_DB_NAME)
+            db = client[TEST_DB_NAME]
+            await init_beanie(database=db, document_models=[User, Customer])
+            await ensure_indexes(db)
+            # A second run must be a no-op
+            await ensure_indexes(db)
+            return await collection_scans(db, QUERY_CHECKS)
+        finally:
+            await client.drop_database(TEST_DB_NAME)
+            client.close()
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_db
+from app.main import app
+from app.services.search_service import MAX_SEARCH_RESULTS, global_search
+
+
+class FakeTextCursor:
+    def __init__(self, collection):
+        self.collection = collection
+        self.docs = list(collection.docs)
+
+    def sort(self, keys):
+        self.docs = sorted(self.docs, key=lambda doc: doc["score"], reverse=True)
+        return self
+
+    def limit(self, n):
+        self.collection.limits.append(n)
+        self.docs = self.docs[:n]
+        return self
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in self.docs:
+                yield doc
+        return iterate()
+
+
+class FakeTextCollection:
+    """Returns its documents as text matches, honouring sort and limit."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.limits = []
+
+    def find(self, query, projection):
+        assert query == {"$text": {"$search": "renewal"}}
+        return FakeTextCursor(self)
+
+
+class FakeDB(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, FakeTextCollection([]))
+
+
+ENGAGEMENT_ID = ObjectId()
+
+
+def _db():
+    return FakeDB(
+        customers=FakeTextCollection([
+            {"_id": ObjectId(), "name": "Renewal Partners", "industry": "Retail", "status": "active", "score": 3.0},
+            {"_id": ObjectId(), "name": "Acme", "industry": "Energy", "status": "active", "score": 0.5},
+        ]),
+        emails=FakeTextCollection([
+            {"_id": ObjectId(), "subject": "Renewal terms", "sender": "cfo@acme.test", "engagementId": ENGAGEMENT_ID, "score": 2.0},
+        ]),
+        documents=FakeTextCollection([
+            {"_id": ObjectId(), "originalName": "renewal.pdf", "fileType": "sow", "engagementId": ENGAGEMENT_ID, "score": 1.0},
+        ]),
+    )
+
+
+def test_hits_are_merged_by_score_and_typed():
+    db = _db()
+
+    hits = asyncio.run(global_search(db, "renewal"))
+
+    assert [(hit["type"], hit["score"]) for hit in hits] == [("customer", 3.0), ("email", 2.0), ("document", 1.0), ("customer", 0.5)]
+    email = hits[1]
+    assert email["id"] == str(db["emails"].docs[0]["_id"])
+    assert email["engagementId"] == str(ENGAGEMENT_ID)
+    assert set(email) == {"type", "id", "score", "subject", "sender", "engagementId", "receivedAt"}
+
+
+def test_pages_are_cut_from_the_merged_ranking():
+    db = _db()
+
+    page = asyncio.run(global_search(db, "renewal", offset=1, limit=2))
+
+    assert [hit["score"] for hit in page] == [2.0, 1.0]
+    # Each collection is asked for offset + limit hits at most
+    assert db["customers"].limits == [3]
+    assert [hit["type"] for hit in asyncio.run(global_search(_db(), "renewal", ["emails"]))] == ["email"]
+
+
+@pytest.mark.parametrize("params, status", [
+    ({"offset": 2, "limit": 2}, 200),
+    ({"offset": MAX_SEARCH_RESULTS - 50, "limit": 100}, 400),
+    ({"offset": MAX_SEARCH_RESULTS}, 422),
+    ({"type": "users"}, 400),
+])
+def test_pages_beyond_the_ranked_window_are_rejected(params, status):
+    app.dependency_overrides[get_db] = _db
+    try:
+        response = TestClient(app).get("/api/search", params={"q": "renewal", **params})
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert response.status_code == status
+    if status == 200:
+        assert [hit["type"] for hit in response.json()] == ["document", "customer"]
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from pymongo.errors import DuplicateKeyError
+
+from app.services.blob_store import BlobStore
+from app.utils import file_utils
+from app.utils.file_utils import FileTooLargeError, UploadSizeLimitMiddleware, safe_filename, stream_upload_to_temp
+
+
+def _upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="report.pdf")
+
+
+def test_uploads_are_hashed_while_streaming(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_utils, "UPLOAD_CHUNK_SIZE", 4)
+    content = b"quarterly report"
+
+    stored = asyncio.run(stream_upload_to_temp(_upload(content), str(tmp_path), max_size=len(content)))
+
+    assert stored["size"] == len(content)
+    assert stored["sha256"] == hashlib.sha256(content).hexdigest()
+    with open(stored["temp_path"], "rb") as f:
+        assert f.read() == content
+
+
+def test_oversized_uploads_are_rejected_and_leave_no_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_utils, "UPLOAD_CHUNK_SIZE", 4)
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(stream_upload_to_temp(_upload(b"x" * 10), str(tmp_path), max_size=9))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_client_file_names_are_made_safe():
+    assert safe_filename("../../etc/passwd") == "passwd"
+    assert safe_filename("Q3 report (final).pdf") == "Q3_report_final_.pdf"
+    assert safe_filename("..") == "upload"
+
+
+def test_upload_routes_refuse_oversized_bodies_before_parsing(monkeypatch):
+    monkeypatch.setattr(file_utils, "MULTIPART_OVERHEAD", 0)
+    app = FastAPI()
+    parsed = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        parsed.append(file.filename)
+        return {"ok": True}
+
+    app.add_middleware(UploadSizeLimitMiddleware, limits={"/upload": 1000})
+    client = TestClient(app)
+
+    assert client.post("/upload", files={"file": ("a.pdf", b"x" * 100)}).status_code == 200
+    assert client.post("/upload", files={"file": ("b.pdf", b"x" * 5000)}).status_code == 413
+
+    # Chunked bodies without a Content-Length are cut off as they arrive
+    def body():
+        for _ in range(10):
+            yield b"x" * 500
+
+    response = client.post("/upload", content=body(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert parsed == ["a.pdf"]
+
+
+class FakeBlobs:
+    """The subset of the `blobs` collection BlobStore uses, as a dict by _id."""
+
+    def __init__(self):
+        self.rows = {}
+
+    @staticmethod
+    def _matches(row, query):
+        for field, cond in query.items():
+            value = row.get(field)
+            if isinstance(cond, dict):
+                for op, arg in cond.items():
+                    if op == "$ne" and value == arg:
+                        return False
+                    if op == "$lt" and not (value is not None and value < arg):
+                        return False
+                    if op == "$lte" and not (value is not None and value <= arg):
+                        return False
+            elif value != cond:
+                return False
+        return True
+
+    def _find(self, query):
+        row = self.rows.get(query["_id"])
+        return row if row is not None and self._matches(row, query) else None
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False):
+        row = self._find(query)
+        if row is None:
+            if not upsert:
+                return None
+            if query["_id"] in self.rows:
+                raise DuplicateKeyError("E11000 duplicate key")
+            self.rows[query["_id"]] = {"_id": query["_id"], "deletingAt": None, "refs": update["$inc"]["refs"]}
+            return dict(self.rows[query["_id"]]) if return_document else None
+        before = dict(row)
+        row["refs"] = row.get("refs", 0) + update["$inc"]["refs"]
+        return dict(row) if return_document else before
+
+    async def update_one(self, query, update):
+        row = self._find(query)
+        if row is not None:
+            for field, value in update.get("$inc", {}).items():
+                row[field] = row.get(field, 0) + value
+            row.update(update.get("$set", {}))
+        return SimpleNamespace(modified_count=1 if row is not None else 0)
+
+    async def insert_one(self, row):
+        if row["_id"] in self.rows:
+            raise DuplicateKeyError("E11000 duplicate key")
+        self.rows[row["_id"]] = dict(row)
+
+    async def delete_one(self, query):
+        if self._find(query) is not None:
+            del self.rows[query["_id"]]
+
+
+class FakeDocuments:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    async def count_documents(self, query, limit=0):
+        return sum(all(row.get(k) == v for k, v in query.items()) for row in self.rows)
+
+
+def _blob_db(*documents):
+    return SimpleNamespace(blobs=FakeBlobs(), documents=FakeDocuments(documents))
+
+
+def test_identical_uploads_share_one_counted_blob(tmp_path):
+    store = BlobStore(str(tmp_path))
+    db = _blob_db()
+
+    async def scenario():
+        first = await store.put(db, _upload(b"same bytes"), max_size=100)
+        second = await store.put(db, _upload(b"same bytes"), max_size=100)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first["path"] == second["path"]
+    assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+    assert db.blobs.rows[first["sha256"]]["refs"] == 2
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_blob_is_unlinked_with_its_last_reference(tmp_path):
+    store = BlobStore(str(tmp_path))
+    db = _blob_db()
+
+    async def scenario():
+        stored = await store.put(db, _upload(b"contract"), max_size=100)
+        await store.put(db, _upload(b"contract"), max_size=100)
+        first = await store.release(db, stored["sha256"], stored["path"])
+        still_there = os.path.exists(stored["path"])
+        last = await store.release(db, stored["sha256"], stored["path"])
+        return stored, first, still_there, last
+
+    stored, first, still_there, last = asyncio.run(scenario())
+
+    assert (first, still_there, last) == (False, True, True)
+    assert not os.path.exists(stored["path"])
+    assert stored["sha256"] not in db.blobs.rows
+
+
+def test_blob_from_before_refcounting_stays_while_rows_point_at_it(tmp_path):
+    store = BlobStore(str(tmp_path))
+    sha = hashlib.sha256(b"legacy").hexdigest()
+    os.makedirs(os.path.dirname(store.path_for(sha)))
+    with open(store.path_for(sha), "wb") as f:
+        f.write(b"legacy")
+    db = _blob_db({"sha256": sha})
+
+    assert asyncio.run(store.release(db, sha, store.path_for(sha))) is False
+    assert os.path.exists(store.path_for(sha))
+    # The deletion marker is cleared again, so uploads can count references
+    assert sha not in db.blobs.rows
+
+
+def test_failed_upload_insert_gives_its_blob_reference_back(tmp_path, monkeypatch):
+    from app.dependencies import get_db
+    from app.main import app
+    from app.routers import documents
+
+    class FailingDocument(SimpleNamespace):
+        async def insert(self):
+            raise RuntimeError("insert failed")
+
+    store = BlobStore(str(tmp_path))
+    db = _blob_db()
+    monkeypatch.setattr(documents, "blob_store", store)
+    monkeypatch.setattr(documents, "DocumentInDB", FailingDocument)
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        client = TestClient(app, raise_server_exceptions=False)
+        files = {"file": ("report.pdf", b"%PDF-1.4 report", "application/pdf")}
+        invalid = client.post("/api/documents/upload", params={"engagementId": "not-an-id"}, files=files)
+        failed = client.post("/api/documents/upload", params={"engagementId": "6650f0c2a1b2c3d4e5f60718"}, files=files)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert invalid.status_code == 400
+    assert failed.status_code == 500
+    # Neither request leaves a counted reference or a stored file behind
+    assert db.blobs.rows == {}
+    assert not os.path.exists(store.path_for(hashlib.sha256(b"%PDF-1.4 report").hexdigest()))
@@ -1 +1,51 @@
+import re
+from typing import Iterable, List
 
+# Rough characters-per-token ratio for English prose with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; errs high enough to stay under context limits."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Split one block that exceeds max_tokens on paragraph, then line, then hard boundaries."""
+    for parts in (_PARAGRAPH_BREAK.split(text), text.split("\n")):
+        if len(parts) > 1:
+            return pack_chunks(parts, max_tokens)
+    max_chars = max(max_tokens - 1, 1) * CHARS_PER_TOKEN
+    return [text[start:start + max_chars] for start in range(0, len(text), max_chars)]
+
+
+def pack_chunks(blocks: Iterable[str], max_tokens: int) -> List[str]:
+    """
+    Greedily pack text blocks (pages, paragraph groups, row batches) into
+    windows of at most max_tokens, keeping block boundaries where possible.
+    A single block larger than the window is split on paragraph and line
+    breaks before falling back to a hard cut.
+    """
+    windows: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for block in blocks:
+        if not block.strip():
+            continue
+        tokens = estimate_tokens(block)
+        if tokens > max_tokens:
+            if current:
+                windows.append("\n".join(current))
+                current, current_tokens = [], 0
+            windows.extend(_split_oversized(block, max_tokens))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            windows.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += tokens
+    if current:
+        windows.append("\n".join(current))
+    return windows
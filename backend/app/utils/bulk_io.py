@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+
+# Rows validated and written per insert_many / bulk_write
+IMPORT_BATCH_SIZE = 1000
+# Per-row errors returned in an import report; the count is always exact
+MAX_REPORTED_ERRORS = 1000
+# Documents serialised per chunk written to an export stream
+EXPORT_CHUNK_DOCS = 200
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# A row as (1-based line/record number, parsed dict or parse error message)
+Row = Tuple[int, Any]
+
+
+def detect_format(upload: UploadFile, format: Optional[str]) -> str:
+    if format:
+        fmt = format.lower()
+    elif (upload.filename or "").lower().endswith(".csv") or "csv" in (upload.content_type or ""):
+        fmt = "csv"
+    else:
+        fmt = "ndjson"
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format: {fmt}")
+    return fmt
+
+
+def _unflatten(row: Dict[str, str]) -> Dict[str, Any]:
+    """Turn CSV columns like `location.city` into nested dicts; empty cells are omitted."""
+    nested: Dict[str, Any] = {}
+    for column, value in row.items():
+        if column is None or value is None or value == "":
+            continue
+        target = nested
+        *parents, leaf = column.strip().split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return nested
+
+
+class _RowReader:
+    """Incremental NDJSON/CSV reader over the spooled upload file."""
+
+    def __init__(self, upload: UploadFile, fmt: str):
+        upload.file.seek(0)
+        self._text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        self._fmt = fmt
+        self._csv = csv.DictReader(self._text) if fmt == "csv" else None
+        self._number = 0
+
+    def read(self, count: int) -> List[Row]:
+        rows: List[Row] = []
+        while len(rows) < count:
+            if self._csv is not None:
+                record = next(self._csv, None)
+                if record is None:
+                    break
+                self._number += 1
+                rows.append((self._number, _unflatten(record)))
+                continue
+            line = self._text.readline()
+            if not line:
+                break
+            self._number += 1
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except json.JSONDecodeError as e:
+                rows.append((self._number, f"Invalid JSON: {e.msg}"))
+                continue
+            rows.append((self._number, value if isinstance(value, dict) else "Expected a JSON object"))
+        return rows
+
+    def detach(self) -> None:
+        # Leave the upload's file open for FastAPI to close
+        try:
+            self._text.detach()
+        except ValueError:
+            pass  # already closed with the request
+
+
+async def iter_row_batches(upload: UploadFile, fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[List[Row]]:
+    """Yield parsed rows in batches; file reads and parsing run in the threadpool."""
+    reader = _RowReader(upload, fmt)
+    try:
+        while True:
+            rows = await run_in_threadpool(reader.read, batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        reader.detach()
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        errors = sorted(self.errors, key=lambda e: e["row"])
+        return {"inserted": self.inserted, "failed": self.failed, "errors": errors}
+
+
+async def insert_batch(collection, docs: List[dict], rows: List[int], report: ImportReport) -> List[dict]:
+    """
+    insert_many(ordered=False) and record per-row failures.
+    Returns the documents that were written, with their _id set.
+    """
+    if not docs:
+        return []
+    failed = set()
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            failed.add(write_error["index"])
+            report.error(rows[write_error["index"]], write_error.get("errmsg", "Write failed"))
+    written = [doc for index, doc in enumerate(docs) if index not in failed]
+    report.inserted += len(written)
+    return written
+
+
+async def run_import(
+    upload: UploadFile,
+    fmt: str,
+    prepare: Callable[[List[Tuple[int, dict]], ImportReport], Awaitable[Tuple[List[dict], List[int]]]],
+    collection,
+    after_insert: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Stream an upload through validation and batched inserts.
+    `prepare` turns a batch of parsed rows into documents (recording its own
+    rejections on the report); `after_insert` runs once per written batch for
+    follow-up bulk updates such as counters.
+    """
+    report = ImportReport()
+    async for batch in iter_row_batches(upload, fmt):
+        parsed = []
+        for number, value in batch:
+            if isinstance(value, str):
+                report.error(number, value)
+            else:
+                parsed.append((number, value))
+        docs, rows = await prepare(parsed, report)
+        written = await insert_batch(collection, docs, rows, report)
+        if written and after_insert:
+            await after_insert(written)
+    return report.as_dict()
+
+
+async def _ndjson_lines(cursor) -> AsyncIterator[bytes]:
+    lines: List[str] = []
+    async for doc in cursor:
+        lines.append(json.dumps(jsonable_encoder(doc, custom_encoder={ObjectId: str})))
+        if len(lines) >= EXPORT_CHUNK_DOCS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def ndjson_export(cursor, filename: str) -> StreamingResponse:
+    """Stream a Motor cursor as NDJSON without materialising the result."""
+    return StreamingResponse(
+        _ndjson_lines(cursor),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1 +1,123 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import Dict, Any
 
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+# Bytes read from the upload and written to disk per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Multipart boundaries and part headers allowed on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class FileTooLargeError(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f"File size exceeds maximum limit of {max_size / (1024*1024)} MB")
+        self.max_size = max_size
+
+
+def safe_filename(filename: str) -> str:
+    """Strip directories and unusual characters from a client supplied name."""
+    name = _UNSAFE_FILENAME_CHARS.sub("_", os.path.basename(filename or "")).strip("._")
+    return name or "upload"
+
+
+def _open_temp(dest_dir: str):
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    return os.fdopen(fd, "wb"), path
+
+
+def _write_chunk(f, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+def _close_synced(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+def _abort(f, temp_path: str) -> None:
+    f.close()
+    discard_file(temp_path)
+
+
+def discard_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def stream_upload_to_temp(upload: UploadFile, dest_dir: str, max_size: int) -> Dict[str, Any]:
+    """
+    Stream an upload into a temp file under `dest_dir` in fixed-size chunks.
+    SHA-256 and size are computed while streaming and the size limit is
+    enforced mid-stream. File I/O runs in the thread pool so the event loop
+    keeps serving other requests. The caller moves the temp file into place.
+    Starlette has already spooled the multipart body by the time a route
+    runs, so this check only guards the stored file; routes taking uploads
+    are also capped as the body arrives by UploadSizeLimitMiddleware.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    f, temp_path = await run_in_threadpool(_open_temp, dest_dir)
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError(max_size)
+            await run_in_threadpool(_write_chunk, f, hasher, chunk)
+        await run_in_threadpool(_close_synced, f)
+    except BaseException:
+        await run_in_threadpool(_abort, f, temp_path)
+        raise
+    return {"temp_path": temp_path, "size": size, "sha256": hasher.hexdigest()}
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware capping request bodies on upload routes, keyed by path,
+    before Starlette spools them. A larger Content-Length is refused up front;
+    otherwise the body is counted as it is received and the request fails
+    with 413 as soon as it passes the limit.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_size = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_size is None:
+            return await self.app(scope, receive, send)
+        limit = max_size + MULTIPART_OVERHEAD
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                response = JSONResponse({"detail": str(FileTooLargeError(max_size))}, status_code=413)
+                return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=str(FileTooLargeError(max_size)))
+            return message
+
+        await self.app(scope, limited_receive, send)
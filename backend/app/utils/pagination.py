@@ -0,0 +1,112 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.config import settings
+from app.utils.responses import FastJSONResponse, model_projection
+
+# Page size bounds shared by every list endpoint
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: Any) -> str:
+    """Encode the last _id of a page as an opaque, URL-safe cursor."""
+    payload = json.dumps({"id": str(last_id), "oid": isinstance(last_id, ObjectId)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return ObjectId(data["id"]) if data.get("oid") else data["id"]
+    except (ValueError, KeyError, TypeError, binascii.Error, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Dict[str, int]]:
+    """
+    Turn a comma separated `fields=` value into a Mongo projection.
+    Only top-level fields of the route's response model can be requested,
+    by name or alias, since projected pages skip response_model validation;
+    anything else is rejected with 400.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if not names:
+        return None
+    allowed = model_projection(model)
+    aliases = {name: field.alias or name for name, field in model.model_fields.items()}
+    projection: Dict[str, int] = {}
+    unknown = []
+    for name in names:
+        key = aliases.get(name, name)
+        if key in allowed:
+            projection[key] = 1
+        else:
+            unknown.append(name)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return projection
+
+
+def response_projection(fields: Optional[str], model: Type[BaseModel]) -> Optional[Dict[str, int]]:
+    """
+    Projection for a list endpoint: the requested `fields=`, or, when
+    TRUSTED_DB_RESPONSES is on, the top-level fields of the route's response
+    model. Either way the page is rendered straight from Mongo by
+    page_response; None means it goes through the response_model.
+    """
+    projection = parse_fields(fields, model)
+    if projection is None and settings.TRUSTED_DB_RESPONSES:
+        projection = model_projection(model)
+    return projection
+
+
+async def fetch_page(
+    collection,
+    query: Optional[dict] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    projection: Optional[Dict[str, int]] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Keyset-paginate `collection` on _id.
+    Reads at most limit + 1 documents and returns the page together with the
+    cursor for the next one, or None when this is the last page.
+    """
+    query = dict(query or {})
+    if cursor:
+        after = {"_id": {"$gt": decode_cursor(cursor)}}
+        query = {"$and": [query, after]} if query else after
+    docs = await collection.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["_id"])
+    return docs, next_cursor
+
+
+def page_response(response, docs: List[dict], next_cursor: Optional[str], projection: Optional[Dict[str, int]]):
+    """
+    Attach the next cursor header to the response.
+    Projected pages (partial documents, or trusted reads shaped by the
+    model's projection) skip the route's response_model and are rendered
+    with orjson directly.
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if projection is not None:
+        return FastJSONResponse(docs, headers=headers)
+    response.headers.update(headers)
+    return docs
@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+
+from app.services.dashboard_stats import CLOSED_ACTION_ITEM_STATUSES
+from app.services.job_queue import ACTIVE_STATES, QUEUED, RUNNING
+
+# Placeholder values; plans depend on the shape of a query, not its values
+_OID = ObjectId("000000000000000000000000")
+_ID = str(_OID)
+_NOW = datetime(2026, 1, 1)
+
+Sort = Optional[List[Tuple[str, int]]]
+
+
+class QueryCheck(NamedTuple):
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Sort = None
+
+
+# The filters and sorts issued by the routers and services, one per call
+# site. Dashboard $facet pipelines are left out: they aggregate whole
+# collections on purpose and are cached by DashboardStats.
+QUERY_CHECKS: List[QueryCheck] = [
+    QueryCheck("list_engagements by customer", "engagements", {"customerId": _ID}, [("_id", 1)]),
+    QueryCheck("engagement page after cursor", "engagements", {"_id": {"$gt": _OID}}, [("_id", 1)]),
+    QueryCheck("counter reconciliation", "engagements", {"customerId": {"$in": [_ID]}}),
+    QueryCheck("search_engagements", "engagements", {"$text": {"$search": "renewal"}}),
+    QueryCheck("active engagements", "engagements", {"status": "active"}),
+    QueryCheck("at-risk engagements", "engagements", {"ryg_status": "red"}, [("updatedAt", -1)]),
+    QueryCheck("contract documents of a page", "documents", {
+        "engagementId": {"$in": [_OID, _ID]}, "fileType": {"$in": ["msa", "sow"]},
+    }),
+    QueryCheck("documents of an engagement", "documents", {"engagementId": _OID}, [("_id", 1)]),
+    QueryCheck("documents by content hash", "documents", {"sha256": "0" * 64}),
+    QueryCheck("documents by file path", "documents", {"filePath": "uploads/file.pdf"}),
+    QueryCheck("documents processed this month", "documents", {"processedAt": {"$gte": _NOW}}),
+    QueryCheck("document search", "documents", {"$text": {"$search": "renewal"}}),
+    QueryCheck("action items of an engagement", "action_items", {"engagementId": _ID}, [("_id", 1)]),
+    QueryCheck("open action items for RYG rebuild", "action_items", {
+        "engagementId": {"$in": [_ID]}, "status": {"$nin": CLOSED_ACTION_ITEM_STATUSES},
+    }),
+    QueryCheck("overdue action items", "action_items", {
+        "dueDate": {"$lt": _NOW}, "status": {"$nin": CLOSED_ACTION_ITEM_STATUSES},
+    }),
+    QueryCheck("emails of an engagement", "emails", {"engagementId": _ID}),
+    QueryCheck("emails with sentiment for RYG rebuild", "emails", {
+        "engagementId": {"$in": [_ID]}, "sentiment.score": {"$ne": None},
+    }),
+    QueryCheck("email thread", "emails", {"threadId": "thread"}),
+    QueryCheck("email search", "emails", {"$text": {"$search": "renewal"}}),
+    QueryCheck("customers of an import batch", "customers", {"_id": {"$in": [_OID]}}),
+    QueryCheck("customer search by token", "customers", {"search.tokens": {"$all": ["acme"]}}),
+    QueryCheck("customer search by name prefix", "customers", {"search.name": {"$regex": "^acme"}}),
+    QueryCheck("customer search", "customers", {"$text": {"$search": "renewal"}}),
+    QueryCheck("user login", "users", {"azure_id": "sub"}),
+    QueryCheck("unfinished job with dedupe key", "jobs", {
+        "kind": "process_document", "dedupeKey": _ID, "status": {"$in": list(ACTIVE_STATES)},
+    }),
+    QueryCheck("job claim", "jobs", {
+        "kind": {"$in": ["process_document"]},
+        "$or": [{"status": QUEUED, "runAfter": {"$lte": _NOW}}, {"status": RUNNING, "lockedUntil": {"$lt": _NOW}}],
+    }),
+    QueryCheck("LLM cache eviction", "llm_cache", {}, [("lastUsedAt", 1)]),
+]
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """Every stage name in an explain() plan tree."""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+    return stages
+
+
+async def explain_stages(db, check: QueryCheck) -> List[str]:
+    cursor = db[check.collection].find(check.filter)
+    if check.sort:
+        cursor = cursor.sort(check.sort)
+    explained = await cursor.explain()
+    return plan_stages(explained["queryPlanner"]["winningPlan"])
+
+
+async def collection_scans(db, checks: List[QueryCheck] = QUERY_CHECKS) -> List[str]:
+    """Names of the checks whose winning plan scans a whole collection."""
+    return [check.name for check in checks if "COLLSCAN" in await explain_stages(db, check)]
+
+
+# Verify the indexes of a live database
+# Run with: python -m app.utils.query_plans
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    from app.database import close_db, get_database
+
+    async def main() -> int:
+        db = get_database()
+        failed = 0
+        for check in QUERY_CHECKS:
+            stages = await explain_stages(db, check)
+            collscan = "COLLSCAN" in stages
+            failed += collscan
+            print(f"{'FAIL' if collscan else 'ok  '} {check.collection}: {check.name} [{' > '.join(stages)}]")
+        return 1 if failed else 0
+
+    try:
+        status = asyncio.run(main())
+    finally:
+        close_db()
+    sys.exit(status)
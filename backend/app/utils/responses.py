@@ -0,0 +1,46 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def orjson_default(value: Any) -> Any:
+    """Types orjson does not know natively; datetimes and dates are handled by orjson."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson straight from Motor documents.
+    ObjectIds become strings and datetimes ISO 8601, as jsonable_encoder
+    would produce, without walking the documents in Python first.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    projection = {field.alias or name: 1 for name, field in model.model_fields.items()}
+    projection["_id"] = 1
+    return projection
+
+
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """Mongo projection of the top-level fields a response model declares."""
+    return dict(_model_projection(model))
@@ -0,0 +1,65 @@
+"""
+Document extraction throughput across extraction pool sizes.
+
+Generates synthetic XLSX and DOCX files, then extracts them all at once
+through DocumentProcessor.extract_chunks_async, the path uploads and jobs
+use, with EXTRACTION_WORKERS set to 1, 2, 4, ... (up to the CPU count) and
+prints documents per second for each size. Each file is parsed in a process
+of its own, so process start-up is part of what is measured.
+
+Run from the backend directory (app settings must be resolvable, e.g. via .env):
+    python -m benchmarks.bench_extraction --files 32 --rows 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.config import settings
+from app.services.document_processor import DocumentProcessor, shutdown_extraction_pool
+from benchmarks.samples import make_corpus
+
+
+async def _extract_all(paths):
+    processor = DocumentProcessor()
+    return await asyncio.gather(*(
+        processor.extract_chunks_async(path, max_chars=settings.EXTRACTION_MAX_CHARS) for path in paths
+    ))
+
+
+def run(paths, workers: int) -> float:
+    settings.EXTRACTION_WORKERS = workers
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(_extract_all(paths))
+        elapsed = time.perf_counter() - start
+    finally:
+        # The next size gets a pool built with its own worker count
+        shutdown_extraction_pool()
+    failed = [r["error"] for r in results if not r.get("valid")]
+    if failed:
+        raise RuntimeError(f"Extraction failed: {failed[0]}")
+    return len(paths) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    sizes = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n <= cpus], cpus})
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_corpus(directory, args.files, args.rows)
+        baseline = None
+        print(f"{'workers':>8} {'docs/s':>10} {'speedup':>8}")
+        for workers in sizes:
+            rate = run(paths, workers)
+            baseline = baseline or rate
+            print(f"{workers:>8} {rate:>10.2f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Serialisation cost of a list page: response_model validation vs the orjson
+fast path.
+
+"validated" is what FastAPI does for `response_model=List[EngagementOut]`:
+stringify ids, validate every document, dump it in JSON mode and json.dumps
+the result. "projected" is the previous partial-document path
+(jsonable_encoder + JSONResponse). "fast" renders the Motor documents with
+orjson, as page_response does for projected and TRUSTED_DB_RESPONSES pages.
+
+Run from the backend directory (app settings must be resolvable, e.g. via .env):
+    python -m benchmarks.bench_serialization --rows 1000 --repeat 20
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.engagement import EngagementOut
+from app.utils.responses import dumps, model_projection
+
+PAGE = TypeAdapter(List[EngagementOut])
+
+
+def make_engagements(rows: int) -> List[dict]:
+    start = datetime(2026, 1, 1)
+    projection = model_projection(EngagementOut)
+    docs = []
+    for i in range(rows):
+        doc = {
+            "_id": ObjectId(),
+            "customerId": str(ObjectId()),
+            "name": f"Engagement {i}",
+            "type": "Managed Services",
+            "typeColorClass": "default-type-color",
+            "status": "active",
+            "ryg_status": ("green", "yellow", "red")[i % 3],
+            "msa": {"reference": f"MSA-{i}", "value": 125000.0, "startDate": start, "endDate": start + timedelta(days=365), "documents": [f"uploads/msa-{i}.pdf"]},
+            "sow": {"reference": f"SOW-{i}", "value": 48000.0, "startDate": start, "endDate": start + timedelta(days=90), "documents": []},
+            "description": "Quarterly delivery review with the customer's operations team.",
+            "createdAt": start + timedelta(minutes=i),
+            "updatedAt": start + timedelta(minutes=2 * i),
+        }
+        docs.append({key: value for key, value in doc.items() if key in projection})
+    return docs
+
+
+def validated(docs: List[dict]) -> bytes:
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+    content = PAGE.dump_python(PAGE.validate_python(docs), mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def projected(docs: List[dict]) -> bytes:
+    content = jsonable_encoder(docs, custom_encoder={ObjectId: str})
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast(docs: List[dict]) -> bytes:
+    return dumps(docs)
+
+
+def best_time(fn, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Fresh documents each run: the validated path mutates them
+        docs = make_engagements(rows)
+        start = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    sample = make_engagements(3)
+    expected = json.loads(fast(sample))
+    assert expected == json.loads(projected(sample)) == json.loads(validated(sample))
+    per_1k = 1000 / args.rows
+    timings = {name: best_time(fn, args.rows, args.repeat) for name, fn in (("validated", validated), ("projected", projected), ("fast", fast))}
+    print(f"rows: {args.rows}")
+    for name, seconds in timings.items():
+        print(f"{name + ':':11s}{seconds * 1000 * per_1k:8.2f} ms per 1k rows")
+    print(f"speedup vs validated: {timings['validated'] / timings['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+CPU cost of PDF extraction: previous validate-then-extract path vs the
+single-parse pipeline.
+
+The previous path fully opened the PDF in validate_file, opened it again in
+extract_text and called page.extract_text() twice per page. The current
+path sniffs magic bytes to validate and parses once.
+
+Run from the backend directory (app settings must be resolvable, e.g. via .env):
+    python -m benchmarks.bench_single_parse --pages 200 --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from PyPDF2 import PdfReader
+
+from app.services.document_processor import DocumentProcessor
+from benchmarks.samples import make_pdf
+
+
+def previous_extract(file_path: str) -> str:
+    PdfReader(file_path)  # validate_file
+    reader = PdfReader(file_path)
+    return "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
+
+
+def current_extract(file_path: str) -> str:
+    result = DocumentProcessor().extract_text(file_path)
+    if not result["valid"]:
+        raise RuntimeError(result["error"])
+    return result["text"]
+
+
+def cpu_time(fn, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(path)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sample.pdf")
+        make_pdf(path, args.pages)
+        assert previous_extract(path) == current_extract(path)
+        before = cpu_time(previous_extract, path, args.repeat)
+        after = cpu_time(current_extract, path, args.repeat)
+    print(f"pages: {args.pages}")
+    print(f"previous: {before * 1000:.1f} ms CPU")
+    print(f"current:  {after * 1000:.1f} ms CPU")
+    print(f"speedup:  {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
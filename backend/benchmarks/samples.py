@@ -0,0 +1,72 @@
+"""Synthetic PDF, DOCX and XLSX files for the extraction benchmarks."""
+import os
+
+from docx import Document
+from openpyxl import Workbook
+
+
+def make_xlsx(path: str, rows: int) -> None:
+    wb = Workbook()
+    ws = wb.active
+    for i in range(rows):
+        ws.append([i, f"item {i}", "status open", i * 1.5, "owner@example.com"])
+    wb.save(path)
+
+
+def make_docx(path: str, paragraphs: int) -> None:
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Paragraph {i}: the customer raised a concern about delivery milestone {i}.")
+    doc.save(path)
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 45) -> None:
+    """Write a plain text PDF with a Helvetica text stream per page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page in range(pages):
+        lines = [
+            f"({'Page %d line %d: delivery milestone review and open action items' % (page, line)}) Tj 0 -14 Td"
+            for line in range(lines_per_page)
+        ]
+        stream = ("BT /F1 10 Tf 40 800 Td " + " ".join(lines) + " ET").encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_corpus(directory: str, files: int, rows: int):
+    """Alternate XLSX and DOCX files of roughly `rows` rows/paragraphs/5 each."""
+    paths = []
+    for i in range(files):
+        if i % 2:
+            path = os.path.join(directory, f"doc_{i}.docx")
+            make_docx(path, rows // 5)
+        else:
+            path = os.path.join(directory, f"sheet_{i}.xlsx")
+            make_xlsx(path, rows)
+        paths.append(path)
+    return paths